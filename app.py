@@ -1,21 +1,45 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
+import json
 import logging
 import os
 from kombu.exceptions import OperationalError
 from werkzeug.exceptions import NotFound
+import pandas as pd
 
 from config import Config
-from tasks import scrapear
+from tasks import scrapear, queue_for, encolar_scrape, encolar_lote, PRIORIDADES, INTERACTIVE, BATCH, SCRAPERS
+from scraper.snapshots import get_snapshot_store
 import logging_config
 
 # === NUEVO: Importar modelo predictivo ===
-from ml.predict import predict_dumping
+from ml.predict import predict_dumping, predict_dumping_batch, MODELOS, DEFAULT_MODEL
 
 app = Flask(__name__)
 app.config.from_object(Config)
 CORS(app, origins=app.config["ALLOWED_ORIGINS"])
 
+def _limites_paginacion(data: dict) -> dict:
+    """Valida `paginas`, `max_productos` (enteros > 0), `min_nuevos` (0-1) y `puntuar` del cuerpo."""
+    limites = {}
+    for campo in ("paginas", "max_productos"):
+        valor = data.get(campo)
+        if valor is None:
+            continue
+        if isinstance(valor, bool) or not isinstance(valor, int) or valor < 1:
+            raise ValueError(f"'{campo}' debe ser un entero mayor que 0.")
+        limites[campo] = valor
+    if data.get("min_nuevos") is not None:
+        valor = data["min_nuevos"]
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not 0 <= valor <= 1:
+            raise ValueError("'min_nuevos' debe ser un número entre 0 y 1.")
+        limites["min_nuevos"] = float(valor)
+    if data.get("puntuar") is not None:
+        if not isinstance(data["puntuar"], bool):
+            raise ValueError("'puntuar' debe ser true o false.")
+        limites["puntuar"] = data["puntuar"]
+    return limites
+
 # ==========================================================
 # 🧩 1. ENDPOINT EXISTENTE: SCRAPING
 # ==========================================================
@@ -24,6 +48,7 @@ def scrape():
     data = request.get_json() or {}
     producto = data.get("producto")
     plataforma = data.get("plataforma")
+    prioridad = data.get("prioridad", INTERACTIVE)
 
     if not producto or not plataforma:
         logging.warning("Parametros faltantes en solicitud de scraping")
@@ -32,9 +57,20 @@ def scrape():
             "message": "Los parámetros 'producto' y 'plataforma' son obligatorios."
         }), 400
 
-    logging.info("Iniciando scraping de %s en %s", producto, plataforma)
+    if prioridad not in PRIORIDADES:
+        return jsonify({
+            "success": False,
+            "message": f"'prioridad' debe ser uno de: {', '.join(PRIORIDADES)}."
+        }), 400
+
+    try:
+        limites = _limites_paginacion(data)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    logging.info("Iniciando scraping de %s en %s (%s)", producto, plataforma, prioridad)
     try:
-        task = scrapear.delay(producto, plataforma)
+        task = encolar_scrape(producto, plataforma, prioridad, **limites)
     except OperationalError:
         logging.exception("Error al enviar la tarea de scraping")
         return jsonify({
@@ -42,7 +78,60 @@ def scrape():
             "message": "El servicio de mensajería no está disponible."
         }), 503
 
-    return jsonify({"task_id": task.id}), 202
+    return jsonify({
+        "task_id": task.id,
+        "cola": queue_for(plataforma, prioridad),
+        "prioridad": prioridad,
+    }), 202
+
+# ==========================================================
+# 🧩 1b. LOTE DE BÚSQUEDAS EN UNA SOLA SESIÓN
+# ==========================================================
+@app.route("/api/scrape/lote", methods=["POST"])
+def scrape_lote():
+    data = request.get_json() or {}
+    productos = data.get("productos")
+    plataforma = data.get("plataforma")
+    prioridad = data.get("prioridad", BATCH)
+
+    if not isinstance(productos, list) or not productos or not all(isinstance(p, str) for p in productos):
+        return jsonify({
+            "success": False,
+            "message": "'productos' debe ser una lista no vacía de búsquedas."
+        }), 400
+    if len(productos) > Config.BATCH_MAX_TERMS:
+        return jsonify({
+            "success": False,
+            "message": f"Como máximo {Config.BATCH_MAX_TERMS} búsquedas por lote."
+        }), 400
+    if plataforma not in SCRAPERS:
+        return jsonify({"success": False, "message": "Plataforma no soportada."}), 400
+    if prioridad not in PRIORIDADES:
+        return jsonify({
+            "success": False,
+            "message": f"'prioridad' debe ser uno de: {', '.join(PRIORIDADES)}."
+        }), 400
+    try:
+        limites = _limites_paginacion(data)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    logging.info("Encolando lote de %s búsquedas en %s (%s)", len(productos), plataforma, prioridad)
+    try:
+        task = encolar_lote(productos, plataforma, prioridad, **limites)
+    except OperationalError:
+        logging.exception("Error al enviar el lote de scraping")
+        return jsonify({
+            "success": False,
+            "message": "El servicio de mensajería no está disponible."
+        }), 503
+
+    return jsonify({
+        "task_id": task.id,
+        "cola": queue_for(plataforma, prioridad),
+        "prioridad": prioridad,
+        "total": len(productos),
+    }), 202
 
 # ==========================================================
 # 🧩 2. ENDPOINT EXISTENTE: CONSULTAR RESULTADOS DE SCRAPE
@@ -54,11 +143,24 @@ def resultado(task_id):
         return jsonify({"state": task.state}), 200
     if task.state == "SUCCESS":
         return jsonify({"state": task.state, **task.result}), 200
+    if task.state == "PROGRESS":  # lotes: progreso por búsqueda
+        return jsonify({"state": task.state, **(task.info or {})}), 200
     response = {"state": task.state, "message": str(task.info)}
     if task.state == "FAILURE":
         response["traceback"] = task.traceback
     return jsonify(response), 200
 
+# ==========================================================
+# 🧩 2b. SNAPSHOTS HTML DE UNA TAREA
+# ==========================================================
+@app.route("/api/snapshots/<task_id>")
+def snapshots(task_id):
+    """Páginas archivadas por una tarea de scraping (metadatos; el HTML va por el CLI)."""
+    store = get_snapshot_store()
+    if store is None:
+        return jsonify({"success": False, "message": "Los snapshots están desactivados."}), 404
+    return jsonify({"success": True, "task_id": task_id, "snapshots": store.by_job(task_id)}), 200
+
 # ==========================================================
 # 🧩 3. NUEVO ENDPOINT: PREDICCIÓN DE DUMPING
 # ==========================================================
@@ -72,6 +174,7 @@ def predict():
         precio_importado = float(data.get("precio_importado", 0))
         precio_local = float(data.get("precio_local", 0))
         plataforma = data.get("plataforma", "AliExpress")
+        modelo = data.get("modelo", DEFAULT_MODEL)
 
         if not precio_importado or not precio_local:
             return jsonify({
@@ -79,7 +182,13 @@ def predict():
                 "message": "Debe enviar 'precio_importado' y 'precio_local'."
             }), 400
 
-        resultado = predict_dumping(precio_importado, precio_local, plataforma)
+        if modelo not in MODELOS:
+            return jsonify({
+                "success": False,
+                "message": f"'modelo' debe ser uno de: {', '.join(MODELOS)}."
+            }), 400
+
+        resultado = predict_dumping(precio_importado, precio_local, plataforma, modelo)
         return jsonify({"success": True, **resultado}), 200
 
     except FileNotFoundError:
@@ -91,6 +200,83 @@ def predict():
         logging.exception("Error al predecir dumping")
         return jsonify({"success": False, "message": str(e)}), 500
 
+# ==========================================================
+# 🧩 3b. PREDICCIÓN POR LOTES
+# ==========================================================
+def _leer_lote() -> pd.DataFrame:
+    """Filas a puntuar: archivo CSV/Parquet subido (`archivo`) o JSON con arrays o `filas`."""
+    archivo = request.files.get("archivo")
+    if archivo is not None:
+        nombre = (archivo.filename or "").lower()
+        if nombre.endswith(".parquet"):
+            try:
+                return pd.read_parquet(archivo)
+            except ImportError:
+                raise ValueError("Leer Parquet requiere pyarrow; envía un CSV.") from None
+        # Separador autodetectado (los CSV del proyecto usan ';')
+        return pd.read_csv(archivo, sep=None, engine="python", encoding="utf-8-sig")
+
+    data = request.get_json(silent=True) or {}
+    if "filas" in data:
+        if not isinstance(data["filas"], list):
+            raise ValueError("'filas' debe ser una lista de objetos.")
+        return pd.DataFrame(data["filas"])
+    columnas = {k: data[k] for k in ("precio_importado", "precio_local", "plataforma") if k in data}
+    if not all(isinstance(v, list) for k, v in columnas.items() if k != "plataforma"):
+        raise ValueError("'precio_importado' y 'precio_local' deben ser listas.")
+    return pd.DataFrame(columnas)
+
+
+_NDJSON_BLOQUE = 1000
+
+
+def _registros(df: pd.DataFrame) -> list:
+    """Filas como dicts, con NaN -> null en JSON."""
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+@app.route("/api/predict/lote", methods=["POST"])
+def predict_lote():
+    """Puntúa muchas filas con una sola llamada al modelo; respuesta en el orden de entrada.
+
+    `?formato=ndjson` responde una línea JSON por fila en lugar de un único
+    documento: la puntuación es una sola llamada, pero la salida se serializa
+    y se envía por bloques de `_NDJSON_BLOQUE` filas a medida que se genera.
+    """
+    modelo = (request.args.get("modelo") or request.form.get("modelo")
+              or (request.get_json(silent=True) or {}).get("modelo") or DEFAULT_MODEL)
+    if modelo not in MODELOS:
+        return jsonify({"success": False, "message": f"'modelo' debe ser uno de: {', '.join(MODELOS)}."}), 400
+    try:
+        df = _leer_lote()
+    except (ValueError, pd.errors.ParserError) as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    if "precio_importado" not in df.columns and "precio" in df.columns:
+        df = df.rename(columns={"precio": "precio_importado"})
+    faltan = [c for c in ("precio_importado", "precio_local") if c not in df.columns]
+    if faltan or df.empty:
+        return jsonify({"success": False, "message": "Se requieren 'precio_importado' y 'precio_local'."}), 400
+    if len(df) > Config.PREDICT_MAX_ROWS:
+        return jsonify({"success": False, "message": f"Como máximo {Config.PREDICT_MAX_ROWS} filas."}), 400
+
+    plataforma = df["plataforma"].fillna("AliExpress") if "plataforma" in df.columns else "AliExpress"
+    try:
+        salida = predict_dumping_batch(df["precio_importado"], df["precio_local"], plataforma, modelo)
+    except FileNotFoundError:
+        return jsonify({
+            "success": False,
+            "message": "Modelo no encontrado. Entrene el modelo primero con /ml/training.py."
+        }), 500
+    if request.args.get("formato") == "ndjson":
+        def generar():
+            for inicio in range(0, len(salida), _NDJSON_BLOQUE):
+                bloque = _registros(salida.iloc[inicio:inicio + _NDJSON_BLOQUE])
+                yield "".join(json.dumps(fila, ensure_ascii=False) + "\n" for fila in bloque)
+        return Response(generar(), mimetype="application/x-ndjson")
+    filas = _registros(salida)
+    return jsonify({"success": True, "modelo": modelo, "total": len(filas), "resultados": filas}), 200
+
 # ==========================================================
 # 🧩 4. DESCARGAR ARCHIVOS
 # ==========================================================
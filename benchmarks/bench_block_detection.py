@@ -0,0 +1,105 @@
+"""Coste por llamada de la detección de bloqueos: ruta completa vs ruta rápida.
+
+Uso:  python -m benchmarks.bench_block_detection [--repeticiones 50]
+
+El navegador se simula con un driver falso: la ruta completa recibe el HTML
+entero (``page_source``) y la rápida solo lo que devolvería el script
+(título + muestra de texto). Además del tiempo de CPU en el proceso Python se
+informa de los bytes que viajarían por el protocolo WebDriver en cada caso.
+"""
+import argparse
+import json
+import time
+
+from bs4 import BeautifulSoup
+
+from scraper import block_detection
+
+_CARD = (
+    '<div class="search-item-card-wrapper-gallery"><a href="//www.aliexpress.com/item/{i}.html">'
+    '<h3 class="multi--titleText--nXeOvyr">Auriculares inalámbricos modelo {i} bluetooth 5.3</h3>'
+    '<div class="multi--price-sale--U-S0jtj">US $7.{i:02d}</div>'
+    '<span class="multi--trade--Ktbl2jB">1,{i:03d}+ sold</span></a></div>'
+)
+
+
+def pagina_resultados(n_cards: int = 60, script_kb: int = 400) -> str:
+    """HTML de una página de resultados típica: tarjetas + scripts inline grandes."""
+    cards = "".join(_CARD.format(i=i) for i in range(n_cards))
+    script = "<script>window.__INIT_DATA__=" + json.dumps({"x": "a" * (script_kb * 1024)}) + "</script>"
+    return (
+        '<html><head><title>auriculares - AliExpress</title>'
+        '<meta name="robots" content="index,follow"></head>'
+        f"<body>{script}<div id='card-list'>{cards}</div></body></html>"
+    )
+
+
+def pagina_bloqueo() -> str:
+    return (
+        "<html><head><title>Security Verification</title></head><body>"
+        "<div>Please verify you are a human</div><div class='g-recaptcha'></div></body></html>"
+    )
+
+
+class _FakeDriver:
+    def __init__(self, html: str, title: str, texto: str, captcha: bool):
+        self.current_url = "https://www.aliexpress.com/w/wholesale-auriculares.html"
+        self.page_source = html
+        self._title = title
+        self._texto = texto
+        self._captcha = captcha
+        self.bytes_transferidos = 0
+
+    def execute_script(self, _js, limit):
+        head = self._texto[:limit]
+        tail = self._texto[-limit:] if len(self._texto) > limit else ""
+        self.bytes_transferidos += len(self._title) + len(head) + len(tail)
+        return {"title": self._title, "head": head, "tail": tail, "captcha": self._captcha}
+
+
+def _inner_text(html: str) -> str:
+    """Aproximación de ``document.body.innerText`` (sin scripts ni <head>)."""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "head"]):
+        tag.decompose()
+    return soup.get_text(" ", strip=True)
+
+
+def _medir(fn, driver, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        fn(driver)
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def run(repeticiones: int = 50) -> dict:
+    resultados = {}
+    casos = {
+        "resultados": (pagina_resultados(), "auriculares - AliExpress", False),
+        "bloqueo": (pagina_bloqueo(), "Security Verification", True),
+    }
+    for nombre, (html, title, captcha) in casos.items():
+        texto = _inner_text(html)
+        driver = _FakeDriver(html, title, texto, captcha)
+        completa = _medir(block_detection.full_dom_check, driver, repeticiones)
+        rapida = _medir(block_detection.is_blocked, driver, repeticiones)
+        resultados[nombre] = {
+            "bloqueado": block_detection.is_blocked(driver),
+            "completa_ms": round(completa * 1000, 3),
+            "rapida_ms": round(rapida * 1000, 3),
+            "aceleracion": round(completa / rapida, 1) if rapida else None,
+            "bytes_completa": len(html.encode("utf-8")),
+            "bytes_rapida": driver.bytes_transferidos // (repeticiones + 1),
+        }
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.repeticiones), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
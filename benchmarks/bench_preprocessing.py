@@ -0,0 +1,82 @@
+"""Cruce producto x artículo nacional vs referencia agregada por categoría.
+
+Uso:  python -m benchmarks.bench_preprocessing [--escala 4]
+
+Reproduce el ``pd.merge`` muchos-a-muchos que usaba ``ml/preprocessing.py``
+(cada producto internacional contra cada artículo nacional de su categoría) y
+lo compara con ``estadisticas_nacionales`` + unión muchos-a-uno sobre los
+mismos datos. ``--escala`` replica los productos internacionales para ver cómo
+crece cada variante. Informa filas, tiempo y pico de memoria (tracemalloc).
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from ml.preprocessing import estadisticas_nacionales
+
+
+def categorizar(titulos: pd.Series) -> pd.Series:
+    """Regla de dos categorías del preprocesamiento original (la que usaba el cruce)."""
+    return titulos.apply(lambda x: "camisa" if "shirt" in x or "camisa" in x else "pantalon")
+
+
+def cargar(escala: int = 1):
+    intl = pd.read_csv("data/productos_alibaba_FULL_MAESTRO.csv", sep=",")
+    intl["titulo"] = intl["titulo"].astype(str).str.lower()
+    intl["precio"] = pd.to_numeric(intl["precio"], errors="coerce")
+    intl = intl[intl["titulo"].str.contains("camisa|shirt|pantalon|pants|trouser", na=False)]
+    intl = pd.concat([intl] * escala, ignore_index=True)
+    intl["categoria"] = categorizar(intl["titulo"])
+
+    nacional = pd.read_excel("data/precios_nacionales.xls")
+    nacional["precio_local"] = nacional["Val_Act"] / nacional["St_Act"].replace(0, np.nan)
+    nacional["DESCRIPCION_ARTICULO"] = nacional["DESCRIPCION_ARTICULO"].astype(str).str.lower()
+    nacional = nacional[nacional["DESCRIPCION_ARTICULO"].str.contains("camisa|pantalon", na=False)]
+    nacional = nacional.assign(categoria=categorizar(nacional["DESCRIPCION_ARTICULO"]))
+    return intl, nacional
+
+
+def cruce(intl, nacional):
+    df = pd.merge(intl, nacional[["categoria", "precio_local"]], on="categoria", how="left")
+    df["ratio_precio"] = df["precio"] / df["precio_local"]
+    return df.dropna(subset=["precio", "precio_local", "ratio_precio"])
+
+
+def agregado(intl, nacional):
+    df = pd.merge(intl, estadisticas_nacionales(nacional), on="categoria", how="left", validate="many_to_one")
+    df["ratio_precio"] = df["precio"] / df["precio_local"]
+    return df.dropna(subset=["precio", "precio_local", "ratio_precio"])
+
+
+def medir(fn, *args) -> dict:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    df = fn(*args)
+    segundos = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"filas": len(df), "segundos": round(segundos, 4), "pico_mb": round(pico / 2**20, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escala", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    intl, nacional = cargar(args.escala)
+    resultado = {
+        "productos": len(intl),
+        "articulos_nacionales": len(nacional),
+        "cruce": medir(cruce, intl, nacional),
+        "agregado": medir(agregado, intl, nacional),
+    }
+    print(json.dumps(resultado, indent=2))
+    return resultado
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Throughput end-to-end de `scrapear` contra el stand-in local (Chrome real).
+
+Levanta ``benchmarks.marketplace_standin`` en segundo plano, apunta los
+scrapers a él con MARKETPLACE_BASE_URL y ejecuta la tarea en el propio
+proceso (``scrapear.apply``), sin broker. Requiere Chrome/chromedriver local o
+SELENIUM_REMOTE_URL; en ese caso usa ``--url-publica`` con una dirección del
+host accesible desde el contenedor de Selenium.
+
+    python -m benchmarks.bench_scrapear --plataformas temu aliexpress --tareas 3 \\
+        --latencia 0.2 --lazy 20 --captcha-cada 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from benchmarks.marketplace_standin import StandinConfig, iniciar_en_segundo_plano
+
+
+def run(plataformas, tareas: int, config: StandinConfig, url_publica: str = None, producto: str = "auriculares"):
+    servidor, base_url = iniciar_en_segundo_plano(config, host="0.0.0.0" if url_publica else "127.0.0.1")
+    if url_publica:
+        base_url = url_publica.rstrip("/") + f":{servidor.server_address[1]}"
+    os.environ["MARKETPLACE_BASE_URL"] = base_url
+    os.environ.setdefault("OUTPUT_DIR", "/tmp/dumping-detector-bench")
+
+    from tasks import scrapear  # después de fijar el entorno
+
+    resultados = {}
+    try:
+        for plataforma in plataformas:
+            inicio = time.perf_counter()
+            productos = exitos = 0
+            for _ in range(tareas):
+                res = scrapear.apply(args=[producto, plataforma]).result or {}
+                if res.get("success"):
+                    exitos += 1
+                    productos += len(res.get("productos") or [])
+            segundos = time.perf_counter() - inicio
+            resultados[plataforma] = {
+                "tareas": tareas,
+                "exitosas": exitos,
+                "productos": productos,
+                "segundos": round(segundos, 2),
+                "productos_por_segundo": round(productos / segundos, 2) if segundos else None,
+                "segundos_por_tarea": round(segundos / tareas, 2),
+            }
+        resultados["standin"] = dict(servidor.market.stats)
+    finally:
+        servidor.shutdown()
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end de scrapear contra el stand-in.")
+    parser.add_argument("--plataformas", nargs="+", default=["aliexpress", "temu", "alibaba", "madeinchina"])
+    parser.add_argument("--tareas", type=int, default=3)
+    parser.add_argument("--paginas", type=int, default=4)
+    parser.add_argument("--latencia", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--lazy", type=int, default=20)
+    parser.add_argument("--captcha-cada", type=int, default=0)
+    parser.add_argument("--url-publica", help="p. ej. http://host.docker.internal (el puerto se añade solo)")
+    args = parser.parse_args(argv)
+
+    config = StandinConfig(
+        latencia=args.latencia, jitter=args.jitter, paginas=args.paginas,
+        lazy=args.lazy, captcha_cada=args.captcha_cada, seed=0,
+    )
+    resultado = run(args.plataformas, args.tareas, config, args.url_publica)
+    sys.stdout.write(json.dumps(resultado, indent=2, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
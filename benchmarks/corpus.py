@@ -0,0 +1,304 @@
+"""Corpus versionado de páginas de resultados para pruebas y benchmarks offline.
+
+Las páginas viven en ``tests/fixtures/html/<plataforma>/`` y se describen en
+``manifest.json`` (sha256, número de cards esperado, origen). Hay dos formas
+de alimentarlo:
+
+  * ``generar``: reconstruye de forma determinista las páginas sintéticas de
+    60 cards con el mismo marcado que buscan los selectores de cada scraper,
+    títulos reales de ``data/productos_alibaba.csv`` y el "ruido" típico de una
+    página real (scripts inline grandes, navegación, pie).
+  * ``grabar``: guarda el ``page_source`` de una búsqueda real con Chrome.
+
+Las páginas versionadas hoy son todas sintéticas: siguen a los selectores
+por construcción, así que miden velocidad de extracción y cubren caminos de
+código, pero no detectan que un sitio real haya cambiado su marcado. Solo
+las páginas grabadas (``"origen"`` distinto de ``"sintetico"``) lo hacen.
+
+Uso:
+    python -m benchmarks.corpus generar
+    python -m benchmarks.corpus grabar aliexpress "https://es.aliexpress.com/..." busqueda_real
+    python -m benchmarks.corpus verificar
+"""
+import argparse
+import csv
+import hashlib
+import html
+import json
+import os
+import random
+from typing import Dict, List
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(_ROOT, "tests", "fixtures", "html")
+VERSION = 1
+PLATAFORMAS = ("aliexpress", "temu", "alibaba", "madeinchina")
+CARDS_POR_PAGINA = 60
+
+_TITULOS_CSV = os.path.join(_ROOT, "data", "productos_alibaba.csv")
+
+
+def _titulos(n: int) -> List[str]:
+    try:
+        with open(_TITULOS_CSV, encoding="utf-8-sig") as fh:
+            titulos = [r["titulo"].strip() for r in csv.DictReader(fh, delimiter=";") if r.get("titulo")]
+    except FileNotFoundError:
+        titulos = []
+    titulos = [t for t in titulos if t] or ["Producto de prueba"]
+    return [titulos[i % len(titulos)] for i in range(n)]
+
+
+def _envolver(titulo: str, cuerpo: str, rng: random.Random, script_kb: int = 300) -> str:
+    """Añade la estructura y el peso de una página real alrededor de las cards."""
+    nav = "".join(f'<li><a href="/category/{i}.html">Categoría {i}</a></li>' for i in range(120))
+    estado = json.dumps({"items": ["%032x" % rng.getrandbits(128) for _ in range(script_kb * 1024 // 40)]})
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>{html.escape(titulo)}</title>"
+        '<meta charset="utf-8"><meta name="robots" content="index,follow">'
+        "<style>.card{display:block}</style></head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header>"
+        f"<script>window.__INIT_DATA__={estado};</script>"
+        f"<main>{cuerpo}</main>"
+        "<footer><p>© Marketplace</p></footer></body></html>"
+    )
+
+
+# ----------------- plantillas por plataforma -----------------
+
+def _aliexpress(rng: random.Random, titulos: List[str]) -> str:
+    cards = []
+    for i, t in enumerate(titulos):
+        entero, dec = rng.randint(1, 80), rng.randint(0, 99)
+        original = entero * 2 + 3
+        cards.append(
+            '<div class="search-item-card-wrapper-gallery">'
+            f'<a class="search-card-item" href="//es.aliexpress.com/item/100500{i:07d}.html">'
+            f'<img src="//ae01.alicdn.com/kf/S{i}.jpg" alt="">'
+            f'<h3 class="kt_ki">{html.escape(t)}</h3>'
+            f'<div class="kt_lg"><span>US $</span><span>{entero}</span><span>.</span><span>{dec:02d}</span></div>'
+            f'<div class="kt_lh"><span style="text-decoration:line-through">US ${original:,}.00</span></div>'
+            f'<span class="kt_lj">-{rng.randint(5, 70)}%</span>'
+            f'<span class="kt_j7">{rng.choice(["1,000+", "5k+", "250", "3 mil"])} vendidos</span>'
+            "</a></div>"
+        )
+    return _envolver("auriculares - AliExpress", '<div id="card-list">' + "".join(cards) + "</div>", rng)
+
+
+def _temu(rng: random.Random, titulos: List[str]) -> str:
+    cards = []
+    for i, t in enumerate(titulos):
+        anuncio = '<div class="_2QlTgZaA">Anuncio</div>' if i % 12 == 11 else ""
+        cards.append(
+            '<div class="_6q6qVUF5 _1UrrHYym">'
+            f"{anuncio}"
+            f'<a class="_2Tl9qLr1" href="/pe/producto-g-60{i:07d}.html">'
+            f'<h2 class="_2BvQbnbN"><span class="_2D9RBAXL">{html.escape(t)}</span></h2></a>'
+            f'<div class="_2myxWHLi"><span class="_2de9ERAH">S/{rng.randint(5, 300)}</span>'
+            f'<span class="_3SrxhhHh">.{rng.randint(0, 99):02d}</span></div>'
+            f'<span class="_3TAPHDOX">S/{rng.randint(301, 900)}.00</span>'
+            f'<span class="_3vfo0XTx">{rng.choice(["8.3K+", "1.2K+", "950", "12K+"])} ventas</span>'
+            "</div>"
+        )
+    return _envolver("Temu | Resultados", "".join(cards), rng)
+
+
+def _alibaba(rng: random.Random, titulos: List[str]) -> str:
+    cards = []
+    for i, t in enumerate(titulos):
+        pid = 1600000000000 + i
+        p4p = "true" if i % 10 == 0 else "false"
+        lo = rng.randint(2, 40) + rng.randint(0, 99) / 100
+        cards.append(
+            f'<div class="fy26-product-card-wrapper" data-ctrdot="{pid}" '
+            f'data-aplus-auto-offer="productId={pid};rlt_rank:{i + 1};rank_id:{i + 1};item_type:normal;'
+            f'product_type:ggs;is_p4p={p4p};is_toprank=false">'
+            f'<h2 class="searchx-product-e-title"><a href="//www.alibaba.com/product-detail/p_{pid}.html">'
+            f"<span>{html.escape(t)}</span></a></h2>"
+            f'<img class="searchx-product-e-slider__img" src="//s.alicdn.com/@sc04/kf/H{pid}.jpg">'
+            f'<div class="searchx-product-price"><div class="searchx-product-price-price-main">'
+            f"US${lo:.2f}-{lo * 1.6:.2f}</div></div>"
+            f'<div class="searchx-moq">Pedido mín.: {rng.choice(["2", "100", "1,000", "500"])} piezas</div>'
+            f'<div class="searchx-sold-order">{rng.randint(0, 2000)} vendidos</div>'
+            f'<a class="searchx-product-e-company" href="//proveedor{i}.en.alibaba.com">Proveedor {i} Co., Ltd.</a>'
+            f'<a class="searchx-product-e-supplier__year"><span>{rng.randint(1, 15)} años</span>'
+            '<img alt="CN" src="//s.alicdn.com/flag/cn.png"></a>'
+            + ('<img class="searchx-verified-icon" src="v.png">' if i % 3 == 0 else "")
+            + f'<span class="searchx-product-e-review">4.{rng.randint(0, 9)}/5.0 ({rng.randint(1, 400)})</span>'
+            f'<div class="searchx-selling-point-text">Tasa de repetición {rng.randint(5, 60)}%</div>'
+            "</div>"
+        )
+    return _envolver("pantalones - Alibaba.com", "".join(cards), rng)
+
+
+def _madeinchina(rng: random.Random, titulos: List[str]) -> str:
+    cards = []
+    for i, t in enumerate(titulos):
+        lo = rng.randint(1, 30) + rng.randint(0, 99) / 100
+        cards.append(
+            '<div class="product-info">'
+            f'<div class="product-name"><a href="/co_proveedor{i}/product_{i}.html"><h3>{html.escape(t)}</h3></a></div>'
+            f'<div class="product-price"><span class="price">US$ {lo:.2f} - {lo + 2:.2f}</span> / Pieza</div>'
+            f'<div class="product-unit">{rng.choice(["100", "1,000", "50"])} Piezas (MOQ)</div>'
+            '<div class="prodcut-table">'
+            '<div class="product-table-item"><span class="product-table-description">Material:</span>'
+            '<span class="prodcut-table-content">Algodón</span></div>'
+            '<div class="product-table-item"><span class="product-table-description">Talla:</span>'
+            '<span class="prodcut-table-content">S-XXL</span></div></div>'
+            f'<a class="company-name">Proveedor {i} Trading Co., Ltd.</a>'
+            '<div class="company-address-detail">Guangdong, China</div>'
+            + ('<span class="diamond-member"></span>' if i % 4 == 0 else "")
+            + "</div>"
+        )
+    return _envolver("Made-in-China.com - Búsqueda", "".join(cards), rng)
+
+
+def _captcha(plataforma: str) -> str:
+    return (
+        "<!DOCTYPE html><html><head><title>Security Verification</title></head><body>"
+        f"<div id='{plataforma}-captcha'><p>Please verify you are a human</p>"
+        "<div class='g-recaptcha' data-sitekey='x'></div></div></body></html>"
+    )
+
+
+_PLANTILLAS = {
+    "aliexpress": _aliexpress,
+    "temu": _temu,
+    "alibaba": _alibaba,
+    "madeinchina": _madeinchina,
+}
+
+
+# ----------------- manifiesto -----------------
+
+def _sha256(path: str) -> str:
+    with open(path, "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def cargar_manifest(corpus_dir: str = CORPUS_DIR) -> Dict:
+    path = os.path.join(corpus_dir, "manifest.json")
+    if not os.path.exists(path):
+        return {"version": VERSION, "paginas": {}}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def guardar_manifest(manifest: Dict, corpus_dir: str = CORPUS_DIR):
+    with open(os.path.join(corpus_dir, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, ensure_ascii=False, sort_keys=True)
+        fh.write("\n")
+
+
+def paginas(corpus_dir: str = CORPUS_DIR, plataforma: str = None, bloqueadas: bool = False):
+    """Itera (ruta_relativa, metadatos) del manifiesto."""
+    for rel, meta in sorted(cargar_manifest(corpus_dir)["paginas"].items()):
+        if plataforma and meta["plataforma"] != plataforma:
+            continue
+        if meta.get("bloqueada", False) != bloqueadas:
+            continue
+        yield rel, meta
+
+
+def leer(rel: str, corpus_dir: str = CORPUS_DIR) -> str:
+    with open(os.path.join(corpus_dir, rel), encoding="utf-8") as fh:
+        return fh.read()
+
+
+def _registrar(manifest: Dict, corpus_dir: str, rel: str, contenido: str, **meta):
+    path = os.path.join(corpus_dir, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(contenido)
+    meta["sha256"] = _sha256(path)
+    manifest["paginas"][rel] = meta
+
+
+def scraper_cls(plataforma: str):
+    from scraper.offline import scraper_cls as _scraper_cls
+
+    return _scraper_cls(plataforma)
+
+
+def _contar_cards(plataforma: str, contenido: str) -> int:
+    from scraper.offline import extract_offline, new_scraper
+
+    return len(extract_offline(new_scraper(scraper_cls(plataforma)), contenido))
+
+
+def generar(corpus_dir: str = CORPUS_DIR, seed: int = 2025) -> Dict:
+    manifest = cargar_manifest(corpus_dir)
+    manifest["version"] = VERSION
+    titulos = _titulos(CARDS_POR_PAGINA)
+    for plataforma in PLATAFORMAS:
+        rng = random.Random(f"{seed}:{plataforma}")
+        contenido = _PLANTILLAS[plataforma](rng, titulos)
+        _registrar(
+            manifest, corpus_dir, f"{plataforma}/busqueda_p1.html", contenido,
+            plataforma=plataforma, origen="sintetico", cards=_contar_cards(plataforma, contenido),
+        )
+        _registrar(
+            manifest, corpus_dir, f"{plataforma}/captcha.html", _captcha(plataforma),
+            plataforma=plataforma, origen="sintetico", cards=0, bloqueada=True,
+        )
+    guardar_manifest(manifest, corpus_dir)
+    return manifest
+
+
+def grabar(plataforma: str, url: str, nombre: str, corpus_dir: str = CORPUS_DIR) -> Dict:
+    """Guarda el HTML renderizado de `url` (tras el scroll de lazy-load) en el corpus."""
+    scraper = scraper_cls(plataforma)()
+    try:
+        scraper.driver.get(url)
+        scraper.wait_ready(20)
+        scraper.scroll(times=8, delay=1.0)
+        contenido = scraper.driver.page_source
+    finally:
+        scraper.close()
+    manifest = cargar_manifest(corpus_dir)
+    _registrar(
+        manifest, corpus_dir, f"{plataforma}/{nombre}.html", contenido,
+        plataforma=plataforma, origen=url, cards=_contar_cards(plataforma, contenido),
+    )
+    guardar_manifest(manifest, corpus_dir)
+    return manifest
+
+
+def verificar(corpus_dir: str = CORPUS_DIR) -> List[str]:
+    """Devuelve las páginas cuyo contenido ya no coincide con el manifiesto."""
+    errores = []
+    for rel, meta in sorted(cargar_manifest(corpus_dir)["paginas"].items()):
+        path = os.path.join(corpus_dir, rel)
+        if not os.path.exists(path) or _sha256(path) != meta["sha256"]:
+            errores.append(rel)
+    return errores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gestiona el corpus HTML offline.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("generar")
+    g = sub.add_parser("grabar")
+    g.add_argument("plataforma", choices=PLATAFORMAS)
+    g.add_argument("url")
+    g.add_argument("nombre")
+    sub.add_parser("verificar")
+    args = parser.parse_args(argv)
+
+    if args.comando == "generar":
+        manifest = generar()
+        print(f"✅ {len(manifest['paginas'])} páginas en {CORPUS_DIR}")
+    elif args.comando == "grabar":
+        grabar(args.plataforma, args.url, args.nombre)
+        print(f"✅ {args.plataforma}/{args.nombre}.html guardada")
+    else:
+        errores = verificar()
+        for rel in errores:
+            print(f"❌ {rel} no coincide con el manifiesto")
+        if errores:
+            raise SystemExit(1)
+        print("✅ Corpus íntegro")
+
+
+if __name__ == "__main__":
+    main()
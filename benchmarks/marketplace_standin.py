@@ -0,0 +1,244 @@
+"""Stand-in local de los marketplaces para pruebas de carga end-to-end.
+
+Sirve las páginas grabadas del corpus (``tests/fixtures/html``) imitando las
+rutas de búsqueda de cada plataforma bajo un prefijo propio:
+
+    /aliexpress/wholesale?SearchText=…&page=N     (y /aliexpress/m/search.htm)
+    /temu/pe/search.html?search_key=…&page=N
+    /alibaba/trade/search?SearchText=…&page=N
+    /madeinchina/productSearch?keyword=…&currentPage=N
+
+Los scrapers apuntan aquí con ``MARKETPLACE_BASE_URL=http://localhost:8765``
+o con ``parse(..., base_url="http://localhost:8765/temu")``.
+
+Comportamientos configurables:
+  * ``latencia`` / ``jitter``: segundos de espera antes de responder.
+  * ``paginas``: a partir de esa página se devuelve un listado vacío.
+  * ``lazy``: solo las primeras N cards están en el DOM inicial; el resto se
+    inserta por tandas al hacer scroll (como el lazy-load real).
+  * ``captcha_cada`` / ``captcha_prob``: inyecta la página de captcha cada N
+    peticiones o con cierta probabilidad.
+
+Uso:
+    python -m benchmarks.marketplace_standin --puerto 8765 --latencia 0.3 --lazy 20 --captcha-cada 25
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from bs4 import BeautifulSoup
+
+from benchmarks import corpus
+
+# Campo de la query string con el número de página en cada plataforma
+_PARAM_PAGINA = {
+    "aliexpress": "page",
+    "temu": "page",
+    "alibaba": "page",
+    "madeinchina": "currentPage",
+}
+_ID_EN_HREF = re.compile(r'(href="[^"]*?)(\d{6,})')
+_LAZY_JS = """
+<script>
+(function () {
+  var tpl = document.getElementById("standin-lazy");
+  if (!tpl) return;
+  var pendientes = Array.prototype.slice.call(tpl.content.children);
+  var destino = tpl.parentNode;
+  function cargar() {
+    if (!pendientes.length) return;
+    if (window.innerHeight + window.scrollY < document.body.scrollHeight - 200) return;
+    pendientes.splice(0, %(tanda)d).forEach(function (n) { destino.insertBefore(n, tpl); });
+  }
+  window.addEventListener("scroll", cargar);
+})();
+</script>
+"""
+
+
+class StandinConfig:
+    def __init__(
+        self,
+        latencia: float = 0.0,
+        jitter: float = 0.0,
+        paginas: int = 5,
+        lazy: int = 0,
+        tanda: int = 12,
+        captcha_cada: int = 0,
+        captcha_prob: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latencia = latencia
+        self.jitter = jitter
+        self.paginas = paginas
+        self.lazy = lazy
+        self.tanda = tanda
+        self.captcha_cada = captcha_cada
+        self.captcha_prob = captcha_prob
+        self.rng = random.Random(seed)
+
+
+class Marketplace:
+    """Estado compartido del servidor: páginas precargadas y contadores."""
+
+    def __init__(self, config: StandinConfig, corpus_dir: str = corpus.CORPUS_DIR):
+        self.config = config
+        self.resultados: Dict[str, list] = {}
+        self.captcha: Dict[str, str] = {}
+        for plataforma in corpus.PLATAFORMAS:
+            self.resultados[plataforma] = [
+                corpus.leer(rel, corpus_dir) for rel, _ in corpus.paginas(corpus_dir, plataforma)
+            ]
+            bloqueadas = list(corpus.paginas(corpus_dir, plataforma, bloqueadas=True))
+            if bloqueadas:
+                self.captcha[plataforma] = corpus.leer(bloqueadas[0][0], corpus_dir)
+        self._lock = threading.Lock()
+        self.stats = {"peticiones": 0, "captchas": 0, "vacias": 0}
+        self._lazy_cache: Dict[tuple, str] = {}
+
+    def _contar(self, clave: str):
+        with self._lock:
+            self.stats[clave] = self.stats.get(clave, 0) + 1
+            return self.stats[clave]
+
+    def _toca_captcha(self, n: int) -> bool:
+        cfg = self.config
+        if cfg.captcha_cada and n % cfg.captcha_cada == 0:
+            return True
+        return bool(cfg.captcha_prob) and cfg.rng.random() < cfg.captcha_prob
+
+    def _lazy(self, plataforma: str, indice: int, html: str) -> str:
+        """Deja `lazy` cards en el DOM y mueve el resto a un <template> que se vuelca al hacer scroll."""
+        clave = (plataforma, indice)
+        if clave in self._lazy_cache:
+            return self._lazy_cache[clave]
+        scraper = corpus.scraper_cls(plataforma)
+        soup = BeautifulSoup(html, "html.parser")
+        cards = []
+        for css in scraper.CARD_CONTAINERS:
+            cards = soup.select(css)
+            if cards:
+                break
+        if len(cards) > self.config.lazy:
+            template = soup.new_tag("template", id="standin-lazy")
+            cards[self.config.lazy - 1].insert_after(template)
+            for card in cards[self.config.lazy:]:
+                template.append(card.extract())
+            soup.body.append(BeautifulSoup(_LAZY_JS % {"tanda": self.config.tanda}, "html.parser"))
+        self._lazy_cache[clave] = str(soup)
+        return self._lazy_cache[clave]
+
+    def pagina(self, plataforma: str, pagina: int):
+        """Devuelve (status, html) para una búsqueda."""
+        n = self._contar("peticiones")
+        if plataforma in self.captcha and self._toca_captcha(n):
+            self._contar("captchas")
+            return 200, self.captcha[plataforma]
+        paginas = self.resultados.get(plataforma) or []
+        if not paginas or pagina > self.config.paginas:
+            self._contar("vacias")
+            return 200, "<html><head><title>Sin resultados</title></head><body><main></main></body></html>"
+        indice = (pagina - 1) % len(paginas)
+        html = paginas[indice]
+        if self.config.lazy:
+            html = self._lazy(plataforma, indice, html)
+        # Cada página con productos distintos: desplaza los ids de los enlaces
+        desplazamiento = (pagina - 1) * 1_000_000
+        if desplazamiento:
+            html = _ID_EN_HREF.sub(lambda m: m.group(1) + str(int(m.group(2)) + desplazamiento), html)
+        return 200, html
+
+
+def _handler(market: Marketplace):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            partes = [p for p in url.path.split("/") if p]
+            if url.path == "/health":
+                return self._responder(200, "ok", "text/plain")
+            if url.path == "/stats":
+                return self._responder(200, json.dumps(market.stats), "application/json")
+            if not partes or partes[0] not in _PARAM_PAGINA:
+                return self._responder(404, "<html><body>404</body></html>")
+
+            plataforma = partes[0]
+            query = parse_qs(url.query)
+            try:
+                pagina = int(query.get(_PARAM_PAGINA[plataforma], ["1"])[0])
+            except ValueError:
+                pagina = 1
+
+            cfg = market.config
+            espera = cfg.latencia + (cfg.rng.uniform(0, cfg.jitter) if cfg.jitter else 0.0)
+            if espera > 0:
+                time.sleep(espera)
+            status, html = market.pagina(plataforma, max(pagina, 1))
+            self._responder(status, html)
+
+        def _responder(self, status: int, cuerpo: str, tipo: str = "text/html; charset=utf-8"):
+            data = cuerpo.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def crear_servidor(config: Optional[StandinConfig] = None, host: str = "127.0.0.1", puerto: int = 0):
+    """Crea el servidor (puerto 0 = uno libre); `servidor.market` expone los contadores."""
+    market = Marketplace(config or StandinConfig())
+    servidor = ThreadingHTTPServer((host, puerto), _handler(market))
+    servidor.daemon_threads = True
+    servidor.market = market
+    return servidor
+
+
+def iniciar_en_segundo_plano(config: Optional[StandinConfig] = None, host: str = "127.0.0.1", puerto: int = 0):
+    """Arranca el servidor en un hilo y devuelve (servidor, base_url)."""
+    servidor = crear_servidor(config, host, puerto)
+    threading.Thread(target=servidor.serve_forever, name="standin", daemon=True).start()
+    h, p = servidor.server_address[:2]
+    return servidor, f"http://{h}:{p}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stand-in local de marketplaces.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--paginas", type=int, default=5)
+    parser.add_argument("--lazy", type=int, default=0, help="Cards visibles antes del primer scroll (0 = todas)")
+    parser.add_argument("--tanda", type=int, default=12, help="Cards añadidas por scroll")
+    parser.add_argument("--captcha-cada", type=int, default=0)
+    parser.add_argument("--captcha-prob", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    config = StandinConfig(
+        latencia=args.latencia, jitter=args.jitter, paginas=args.paginas, lazy=args.lazy,
+        tanda=args.tanda, captcha_cada=args.captcha_cada, captcha_prob=args.captcha_prob, seed=args.seed,
+    )
+    servidor = crear_servidor(config, args.host, args.puerto)
+    print(f"🛒 Stand-in escuchando en http://{args.host}:{args.puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
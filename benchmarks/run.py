@@ -0,0 +1,171 @@
+"""Suite de benchmarks offline sobre el corpus de ``tests/fixtures/html``.
+
+Mide, por plataforma:
+  * extracción BS4/offline de una página completa: cards/segundo y memoria
+    pico asignada (``tracemalloc``) durante una extracción;
+  * parsers de precio/cantidad (escalares y en bloque) con textos
+    representativos de cada plataforma;
+  * detección de bloqueos (ruta completa frente a ruta rápida).
+
+El resultado es JSON para poder guardarlo por commit y compararlo:
+
+    python -m benchmarks.run -o bench_actual.json
+    python -m benchmarks.run --comparar bench_base.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List
+
+from benchmarks import bench_block_detection, corpus
+from scraper import normalization
+from scraper.offline import extract_offline, new_scraper
+
+# Campos de texto crudo que alimentan el benchmark de parsers
+_CAMPOS_PRECIO = {
+    "aliexpress": ["US $7.99", "US $1,299.50", "€1.299,50", "S/ 18,24", "7.99 - 15.99"],
+    "temu": ["S/270.98", "S/ 1,299.50", "US$ 1,499", "12"],
+    "alibaba": ["US$23.14-37.02", "US$1,234.56", "$0.85 - 1.20", "1.234.56"],
+    "madeinchina": ["US$ 3.60 - 5.60", "US$ 12.00", "1,200.50 - 1,500"],
+}
+_CAMPOS_CANTIDAD = {
+    "aliexpress": ["1,000+ vendidos", "5k+", "3 mil", "250"],
+    "temu": ["8.3K+ ventas", "1.2K+", "950", "12K+"],
+    "alibaba": ["1160 vendidos", "1,000", "2"],
+    "madeinchina": ["1,000 Piezas (MOQ)", "100 Pieces", "50"],
+}
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "desconocido"
+
+
+def _cronometrar(fn, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        fn()
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def bench_extraccion(repeticiones: int) -> Dict:
+    resultados = {}
+    for plataforma in corpus.PLATAFORMAS:
+        scraper = new_scraper(corpus.scraper_cls(plataforma))
+        for rel, meta in corpus.paginas(plataforma=plataforma):
+            html = corpus.leer(rel)
+            cards = len(extract_offline(scraper, html))
+
+            tracemalloc.start()
+            extract_offline(scraper, html)
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            segundos = _cronometrar(lambda: extract_offline(scraper, html), repeticiones)
+            resultados[rel] = {
+                "plataforma": plataforma,
+                "cards": cards,
+                "cards_esperadas": meta["cards"],
+                "ms_por_pagina": round(segundos * 1000, 3),
+                "cards_por_segundo": round(cards / segundos, 1) if segundos else None,
+                "memoria_pico_kb": round(pico / 1024, 1),
+            }
+    return resultados
+
+
+def bench_parsers(repeticiones: int, filas: int = 100_000) -> Dict:
+    resultados = {}
+    for plataforma in corpus.PLATAFORMAS:
+        precios = _CAMPOS_PRECIO[plataforma]
+        cantidades = _CAMPOS_CANTIDAD[plataforma]
+        n = repeticiones * 200
+
+        t_precio = _cronometrar(
+            lambda: [normalization.limpiar_precio(p, plataforma) for p in precios], n
+        ) / len(precios)
+        t_cantidad = _cronometrar(
+            lambda: [normalization.limpiar_cantidad(c, plataforma) for c in cantidades], n
+        ) / len(cantidades)
+
+        columna = [precios[i % len(precios)] for i in range(filas)]
+        t_bloque = _cronometrar(lambda: normalization.limpiar_precios(columna, plataforma), 3)
+
+        resultados[plataforma] = {
+            "limpiar_precio_us": round(t_precio * 1e6, 3),
+            "limpiar_cantidad_us": round(t_cantidad * 1e6, 3),
+            "limpiar_precios_filas_por_segundo": round(filas / t_bloque, 1),
+        }
+    return resultados
+
+
+def run(repeticiones: int = 10) -> Dict:
+    return {
+        "meta": {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "repeticiones": repeticiones,
+            "corpus_version": corpus.cargar_manifest()["version"],
+        },
+        "extraccion": bench_extraccion(repeticiones),
+        "parsers": bench_parsers(repeticiones),
+        "bloqueos": bench_block_detection.run(repeticiones),
+    }
+
+
+def _metricas(resultado: Dict, prefijo: str = "") -> Dict[str, float]:
+    """Aplana el JSON a {"extraccion.<pagina>.ms_por_pagina": valor}."""
+    planas = {}
+    for clave, valor in resultado.items():
+        if clave == "meta":
+            continue
+        nombre = f"{prefijo}{clave}"
+        if isinstance(valor, dict):
+            planas.update(_metricas(valor, nombre + "."))
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            planas[nombre] = valor
+    return planas
+
+
+def comparar(base: Dict, actual: Dict) -> List[Dict]:
+    """Cociente actual/base de cada métrica común (>1 en *_ms/_us/_kb = más lento o más memoria)."""
+    b, a = _metricas(base), _metricas(actual)
+    filas = []
+    for nombre in sorted(set(b) & set(a)):
+        if b[nombre]:
+            filas.append({"metrica": nombre, "base": b[nombre], "actual": a[nombre],
+                          "ratio": round(a[nombre] / b[nombre], 3)})
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline de extracción y parsers.")
+    parser.add_argument("-r", "--repeticiones", type=int, default=10)
+    parser.add_argument("-o", "--salida", help="Archivo JSON de salida (por defecto stdout)")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para calcular ratios")
+    args = parser.parse_args(argv)
+
+    resultado = run(args.repeticiones)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as fh:
+            resultado["comparacion"] = comparar(json.load(fh), resultado)
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as fh:
+            fh.write(texto + "\n")
+    else:
+        sys.stdout.write(texto + "\n")
+
+
+if __name__ == "__main__":
+    main()
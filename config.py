@@ -17,3 +17,75 @@ class Config:
         ALLOWED_ORIGINS = "*"
     else:
         ALLOWED_ORIGINS = [origin.strip() for origin in _origins.split(",") if origin.strip()]
+
+    # Estado compartido entre workers (circuit breaker, etc.)
+    STATE_REDIS_URL = os.environ.get("STATE_REDIS_URL", CELERY_BROKER_URL)
+
+    # Circuit breaker por plataforma
+    CIRCUIT_BREAKER_THRESHOLD = int(os.environ.get("CIRCUIT_BREAKER_THRESHOLD", "3"))
+    CIRCUIT_BREAKER_COOLDOWN = float(os.environ.get("CIRCUIT_BREAKER_COOLDOWN", "300"))
+    CIRCUIT_BREAKER_MAX_COOLDOWN = float(os.environ.get("CIRCUIT_BREAKER_MAX_COOLDOWN", "3600"))
+    CIRCUIT_BREAKER_MAX_RETRIES = int(os.environ.get("CIRCUIT_BREAKER_MAX_RETRIES", "5"))
+
+    # Pool de proxies (lista separada por comas); si está vacío se usa PROXY_URL
+    PROXY_POOL = [p.strip() for p in os.environ.get("PROXY_POOL", "").split(",") if p.strip()]
+    PROXY_QUARANTINE = float(os.environ.get("PROXY_QUARANTINE", "600"))
+    PROXY_MAX_QUARANTINE = float(os.environ.get("PROXY_MAX_QUARANTINE", "7200"))
+
+    # Precalentamiento de workers (navegador, modelos y tablas de selectores)
+    WARM_BROWSER = os.environ.get("WARM_BROWSER", "true").lower() in {"1", "true", "t", "yes"}
+    WARM_MODELS = os.environ.get("WARM_MODELS", "true").lower() in {"1", "true", "t", "yes"}
+    WORKER_READY_DIR = os.environ.get("WORKER_READY_DIR", "/tmp/worker-ready")
+
+    # Snapshots HTML de cada página de resultados (ver scraper/snapshots.py)
+    SNAPSHOTS_ENABLED = os.environ.get("SNAPSHOTS_ENABLED", "true").lower() in {"1", "true", "t", "yes"}
+    SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join("data", "snapshots"))
+    SNAPSHOT_RETENTION_DAYS = float(os.environ.get("SNAPSHOT_RETENTION_DAYS", "30"))
+    SNAPSHOT_MAX_MB = float(os.environ.get("SNAPSHOT_MAX_MB", "0"))  # 0 = sin límite
+    SNAPSHOT_COMPRESSION_LEVEL = int(os.environ.get("SNAPSHOT_COMPRESSION_LEVEL", "3"))
+    SNAPSHOT_DICT_SAMPLES = int(os.environ.get("SNAPSHOT_DICT_SAMPLES", "20"))
+
+    # Paginación adaptativa: proporción mínima de productos nuevos para seguir (ver scraper/pagination.py)
+    PAGINATION_MIN_NEW_RATIO = float(os.environ.get("PAGINATION_MIN_NEW_RATIO", "0.2"))
+
+    # Lotes de búsquedas en una sola sesión de navegador (tasks.scrapear_lote)
+    BATCH_MAX_TERMS = int(os.environ.get("BATCH_MAX_TERMS", "500"))
+
+    # Barrido nocturno de categorías (ver scraper/crawl.py)
+    CRAWL_DIR = os.environ.get("CRAWL_DIR", os.path.join("data", "crawl"))
+    CRAWL_CATEGORIAS = [
+        c.strip()
+        for c in os.environ.get("CRAWL_CATEGORIAS", "camisa,pantalón,polo,chompa,vestido,casaca").split(",")
+        if c.strip()
+    ]
+    CRAWL_DELAY = float(os.environ.get("CRAWL_DELAY", "5"))  # segundos entre peticiones a un host
+    CRAWL_BLOCK_BACKOFF = float(os.environ.get("CRAWL_BLOCK_BACKOFF", "300"))
+    CRAWL_MAX_PAGES = int(os.environ.get("CRAWL_MAX_PAGES", "60"))  # páginas por categoría
+    CRAWL_MAX_HOURS = float(os.environ.get("CRAWL_MAX_HOURS", "6"))
+    CRAWL_BLOOM_CAPACITY = int(os.environ.get("CRAWL_BLOOM_CAPACITY", "2000000"))
+    CRAWL_BLOOM_ERROR = float(os.environ.get("CRAWL_BLOOM_ERROR", "0.001"))
+    CRAWL_HORA = int(os.environ.get("CRAWL_HORA", "2"))  # hora del barrido nocturno (-1 lo desactiva)
+
+    # Predicción por lotes (/api/predict/lote)
+    PREDICT_MAX_ROWS = int(os.environ.get("PREDICT_MAX_ROWS", "100000"))
+
+    # Núcleos para ml/training.py (0 = todos los disponibles)
+    TRAIN_CORES = int(os.environ.get("TRAIN_CORES", "0"))
+
+    # Actualización incremental con las particiones del crawl (ver ml/incremental.py)
+    TRAINING_PARTITIONS_DIR = os.environ.get("TRAINING_PARTITIONS_DIR", "")  # vacío = OUTPUT_DIR/crawl
+    INCREMENTAL_ROUNDS = int(os.environ.get("INCREMENTAL_ROUNDS", "50"))  # árboles XGBoost por actualización
+    INCREMENTAL_TREES = int(os.environ.get("INCREMENTAL_TREES", "50"))  # árboles RandomForest por actualización
+
+    # Caché columnar de los datos de entrenamiento (ver ml/data_cache.py)
+    ML_CACHE_DIR = os.environ.get("ML_CACHE_DIR", os.path.join("data", "cache"))
+
+    # Puntuación de dumping tras cada scrape (ver ml/referencias.py)
+    SCORE_AFTER_SCRAPE = os.environ.get("SCORE_AFTER_SCRAPE", "false").lower() in {"1", "true", "t", "yes"}
+    SCORE_MODEL = os.environ.get("SCORE_MODEL", "xgboost")
+    NATIONAL_PRICES_PATH = os.environ.get("NATIONAL_PRICES_PATH", os.path.join("data", "precios_nacionales.xls"))
+    # Índice TF-IDF título -> artículo nacional (ver ml/matching.py)
+    MATCHING_INDEX_PATH = os.environ.get("MATCHING_INDEX_PATH", os.path.join("data", "indice_catalogo.joblib"))
+    REFERENCE_MATCHING = os.environ.get("REFERENCE_MATCHING", "clase")  # "clase" o "indice"
+    MATCHING_TOP_K = int(os.environ.get("MATCHING_TOP_K", "5"))
+    MATCHING_MIN_SIMILARITY = float(os.environ.get("MATCHING_MIN_SIMILARITY", "0.3"))
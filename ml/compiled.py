@@ -0,0 +1,80 @@
+# /ml/compiled.py
+"""Ruta de inferencia de una sola fila sin pandas ni validación de sklearn.
+
+Para 4 features, construir el DataFrame, pasar por el ``ColumnTransformer``
+(StandardScaler + OneHotEncoder) y las comprobaciones de sklearn cuesta mucho
+más que el propio modelo. ``CompiledPipeline`` lee del pipeline entrenado las
+medias/escalas y el mapeo one-hot de plataformas una vez, arma la fila como
+array de NumPy y llama directamente al booster nativo de XGBoost
+(``inplace_predict``) o al producto escalar de la regresión logística.
+
+Solo se compila la forma de pipeline que escribe ``ml/training.py``; cualquier
+otra cosa lanza ``NotCompilable`` y ``ml.predict`` usa el pipeline completo.
+"""
+import math
+
+import numpy as np
+
+
+class NotCompilable(ValueError):
+    pass
+
+
+class CompiledPipeline:
+    def __init__(self, pipeline, numericas, categorica: str = "plataforma"):
+        try:
+            prep = pipeline.named_steps["prep"]
+            clf = pipeline.named_steps["clf"]
+        except (AttributeError, KeyError):
+            raise NotCompilable("No es un Pipeline prep + clf") from None
+        if getattr(prep, "sparse_output_", False):
+            # XGBoost trata los ceros de una matriz dispersa como ausentes
+            raise NotCompilable("Salida dispersa del ColumnTransformer")
+
+        transformers = {name: (t, cols) for name, t, cols in prep.transformers_ if name != "remainder"}
+        scaler, cols_num = transformers.get("num", (None, None))
+        encoder, cols_cat = transformers.get("cat", (None, None))
+        if scaler is None or encoder is None or list(cols_num) != list(numericas) or list(cols_cat) != [categorica]:
+            raise NotCompilable("Columnas distintas a las de ml/training.py")
+        if encoder.drop is not None or encoder.handle_unknown != "ignore":
+            raise NotCompilable("OneHotEncoder con drop o sin handle_unknown='ignore'")
+
+        self.n_num = len(numericas)
+        self.mean = np.asarray(scaler.mean_ if scaler.with_mean else np.zeros(self.n_num), dtype=np.float64)
+        self.scale = np.asarray(scaler.scale_ if scaler.with_std else np.ones(self.n_num), dtype=np.float64)
+        self.one_hot = {cat: self.n_num + i for i, cat in enumerate(encoder.categories_[0])}
+        self.n_features = self.n_num + len(self.one_hot)
+
+        if hasattr(clf, "get_booster"):
+            if getattr(clf, "objective", None) != "binary:logistic":
+                raise NotCompilable(f"Objetivo XGBoost no soportado: {clf.objective}")
+            self._booster = clf.get_booster()
+            self._predict = self._predict_xgb
+        elif hasattr(clf, "coef_") and clf.coef_.shape == (1, self.n_features):
+            self._coef = clf.coef_[0].astype(np.float64)
+            self._intercept = float(clf.intercept_[0])
+            self._predict = self._predict_lineal
+        else:
+            raise NotCompilable(f"Clasificador no soportado: {type(clf).__name__}")
+
+    def fila(self, numericos, categoria) -> np.ndarray:
+        x = np.zeros((1, self.n_features), dtype=np.float64)
+        x[0, :self.n_num] = (np.asarray(numericos, dtype=np.float64) - self.mean) / self.scale
+        idx = self.one_hot.get(categoria)
+        if idx is not None:  # categoría desconocida: todo a cero (handle_unknown="ignore")
+            x[0, idx] = 1.0
+        return x
+
+    def _predict_xgb(self, x: np.ndarray) -> float:
+        return float(self._booster.inplace_predict(x.astype(np.float32))[0])
+
+    def _predict_lineal(self, x: np.ndarray) -> float:
+        z = float(x[0] @ self._coef) + self._intercept
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)  # forma estable para z muy negativos
+        return e / (1.0 + e)
+
+    def predict_proba_one(self, numericos, categoria) -> float:
+        """Probabilidad de la clase positiva para una fila."""
+        return self._predict(self.fila(numericos, categoria))
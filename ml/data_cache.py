@@ -0,0 +1,161 @@
+# /ml/data_cache.py
+"""Caché columnar de los datos de entrada del entrenamiento.
+
+Leer ``precios_nacionales.xls`` con xlrd y los CSV de plataformas en cada
+entrenamiento cuesta más que el resto del preprocesamiento. Cada fuente se
+convierte una vez a un artefacto con tipos explícitos (texto, float64 y
+categorías) guardado en ``ML_CACHE_DIR``. El nombre lleva un hash de la ruta
+absoluta de la fuente y el sha256 de su contenido: si el contenido no cambia
+se carga el artefacto; si cambia, la clave es otra, se vuelve a convertir y
+se borran las versiones anteriores de esa misma ruta (dos fuentes con el
+mismo nombre en carpetas distintas no se pisan).
+
+El formato es Parquet (``pyarrow``, en requirements.txt). Solo si ``pyarrow``
+no está instalado se recurre a pickle de pandas, que también conserva dtypes
+y categorías pero no es columnar ni legible fuera de Python.
+"""
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # pragma: no cover - depende del entorno
+    pyarrow = None
+
+# Sube si cambia la conversión: invalida todos los artefactos existentes
+VERSION = 1
+
+TIPOS_NACIONAL = {
+    "DESCRIPCION_ARTICULO": "object", "CLASE": "category", "GENERO": "category", "MARCA": "category",
+    "Cant_Act": "float64", "Vta_Act": "float64", "Vta_Uni": "float64", "Mrg_Act": "float64",
+    "Cost_Act": "float64", "St_Act": "float64", "Val_Act": "float64",
+}
+TIPOS_PLATAFORMA = {
+    "titulo": "object", "precio": "float64", "precio_original": "float64", "ventas": "float64",
+    "link": "object", "pagina": "float64", "plataforma": "category", "moneda": "category",
+}
+
+
+def sha256_archivo(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for bloque in iter(lambda: fh.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def aplicar_tipos(df: pd.DataFrame, tipos: dict) -> pd.DataFrame:
+    """Convierte las columnas presentes en `tipos`; los numéricos no parseables quedan NaN."""
+    df = df.copy()
+    for col, tipo in tipos.items():
+        if col not in df.columns:
+            continue
+        if tipo == "float64":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float64)
+        elif tipo == "category":
+            df[col] = df[col].astype("category")
+        else:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+class DataCache:
+    def __init__(self, directorio: str = None):
+        self.directorio = directorio or Config.ML_CACHE_DIR
+        self.extension = ".parquet" if pyarrow is not None else ".pkl"
+        if pyarrow is None:
+            logging.warning("pyarrow no instalado: la caché de datos usa pickle en lugar de Parquet")
+
+    @staticmethod
+    def _prefijo(fuente: str, nombre: str) -> str:
+        """Común a todas las versiones de una fuente concreta (por ruta absoluta)."""
+        ruta = hashlib.sha256(os.path.abspath(fuente).encode("utf-8")).hexdigest()[:12]
+        return f"{nombre}-{os.path.basename(fuente)}-{ruta}-"
+
+    def _path(self, fuente: str, nombre: str, sha: str) -> str:
+        return os.path.join(self.directorio, f"{self._prefijo(fuente, nombre)}v{VERSION}-{sha[:16]}{self.extension}")
+
+    def _escribir(self, df: pd.DataFrame, path: str):
+        # Temporal único: otro entrenamiento puede estar escribiendo el mismo artefacto
+        fd, tmp = tempfile.mkstemp(dir=self.directorio, prefix=".tmp-", suffix=self.extension)
+        os.close(fd)
+        try:
+            if self.extension == ".parquet":
+                df.to_parquet(tmp, index=False)
+            else:
+                df.to_pickle(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _leer(self, path: str) -> pd.DataFrame:
+        return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+
+    def _borrar_anteriores(self, fuente: str, nombre: str, path: str):
+        for viejo in glob.glob(os.path.join(self.directorio, glob.escape(self._prefijo(fuente, nombre)) + "*")):
+            if viejo == path or viejo.endswith(".tmp"):
+                continue
+            try:
+                os.remove(viejo)
+            except FileNotFoundError:
+                pass  # lo borró otro proceso que entrena a la vez
+
+    def leer(self, fuente: str, lector, nombre: str) -> pd.DataFrame:
+        """`lector(fuente)` cacheado por el contenido de `fuente`."""
+        sha = sha256_archivo(fuente)
+        path = self._path(fuente, nombre, sha)
+        if os.path.exists(path):
+            try:
+                return self._leer(path)
+            except Exception:
+                logging.warning("Artefacto %s ilegible; se regenera", path, exc_info=True)
+
+        df = lector(fuente)
+        os.makedirs(self.directorio, exist_ok=True)
+        self._borrar_anteriores(fuente, nombre, path)
+        try:
+            self._escribir(df, path)
+            logging.info("Caché de %s: %s filas -> %s", fuente, len(df), path)
+        except OSError:
+            logging.warning("No se pudo escribir el artefacto %s", path, exc_info=True)
+        return df
+
+
+def _leer_nacional(path: str) -> pd.DataFrame:
+    df = pd.read_excel(path)
+    df = df.loc[:, ~df.columns.astype(str).str.startswith("Unnamed")]
+    return aplicar_tipos(df, TIPOS_NACIONAL)
+
+
+def _leer_plataforma(path: str) -> pd.DataFrame:
+    return aplicar_tipos(pd.read_csv(path, sep=";"), TIPOS_PLATAFORMA)
+
+
+_cache = None
+
+
+def get_data_cache() -> DataCache:
+    global _cache
+    if _cache is None:
+        _cache = DataCache()
+    return _cache
+
+
+def leer_nacional(path: str = None) -> pd.DataFrame:
+    """``precios_nacionales.xls`` con tipos explícitos, desde la caché si no cambió."""
+    return get_data_cache().leer(path or Config.NATIONAL_PRICES_PATH, _leer_nacional, "nacional")
+
+
+def leer_plataforma(path: str) -> pd.DataFrame:
+    """CSV de productos de una plataforma (delimitador ';') desde la caché."""
+    return get_data_cache().leer(path, _leer_plataforma, "plataforma")
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Actualización incremental de los modelos con los datos nuevos del crawl.
+
+El barrido nocturno deja una partición por plataforma y día en
+``OUTPUT_DIR/crawl/<plataforma>_<AAAA-MM-DD>.csv``. Cada artefacto guarda a su
+lado (``model_<nombre>.pkl.meta.json``) la marca de agua: la última ronda que
+ya vio. En modo incremental solo se leen las particiones posteriores a esa
+marca (y anteriores a hoy, que el crawl aún está escribiendo), se etiquetan
+con el mismo preprocesamiento que el entrenamiento y:
+
+- XGBoost sigue el boosting desde el booster actual (``INCREMENTAL_ROUNDS``
+  árboles más);
+- RandomForest añade ``INCREMENTAL_TREES`` árboles con ``warm_start``.
+
+El preprocesador no se reajusta: las columnas deben significar lo mismo para
+los árboles viejos y los nuevos. Si el lote nuevo no trae ambas clases no se
+actualiza y la marca no avanza, así esas particiones se suman a las próximas.
+
+``--completo`` es la consolidación periódica: reentrena los cuatro modelos
+desde cero con los datos base y todas las particiones (ver ml/training.py).
+
+Uso:  python -m ml.incremental [--completo] [--modelos xgboost randomforest]
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+import joblib
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score
+from sklearn.utils.class_weight import compute_sample_weight
+
+from config import Config
+from ml.data_cache import leer_nacional, leer_plataforma
+from ml.preprocessing import load_and_clean_data, preparar_dataset
+from ml.training import FEATURES, MODELOS, guardar_modelo, train_all_models
+
+INCREMENTALES = ("xgboost", "randomforest")
+_PARTICION = re.compile(r"^(?P<plataforma>.+)_(?P<ronda>\d{4}-\d{2}-\d{2})\.csv$")
+
+
+def directorio_particiones() -> str:
+    return Config.TRAINING_PARTITIONS_DIR or os.path.join(os.environ.get("OUTPUT_DIR", "/app/data"), "crawl")
+
+
+def particiones(directorio: str = None, desde: str = None, hasta: str = None) -> list:
+    """(ronda, ruta) de las particiones con ``desde < ronda < hasta``, en orden."""
+    encontradas = []
+    for path in glob.glob(os.path.join(directorio or directorio_particiones(), "*.csv")):
+        m = _PARTICION.match(os.path.basename(path))
+        if not m:
+            continue
+        ronda = m.group("ronda")
+        if (desde is None or ronda > desde) and (hasta is None or ronda < hasta):
+            encontradas.append((ronda, path))
+    return sorted(encontradas)
+
+
+def _meta_path(model_dir: str, nombre: str) -> str:
+    return os.path.join(model_dir, MODELOS[nombre][2] + ".meta.json")
+
+
+def leer_marca(model_dir: str, nombre: str) -> dict:
+    try:
+        with open(_meta_path(model_dir, nombre), encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def guardar_marca(model_dir: str, nombre: str, **meta):
+    path = _meta_path(model_dir, nombre)
+    meta["actualizado"] = datetime.now().isoformat(timespec="seconds")
+    with open(path + ".tmp", "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _continuar(nombre: str, pipeline, Xt, y):
+    """Nuevo clasificador que extiende al actual con los datos de `Xt`."""
+    clf = pipeline.named_steps["clf"]
+    if nombre == "xgboost":
+        params = clf.get_params()
+        params["n_estimators"] = Config.INCREMENTAL_ROUNDS
+        nuevo = xgb.XGBClassifier(**params)
+        return nuevo.fit(Xt, y, xgb_model=clf.get_booster())
+    # Los pesos de clase se calculan sobre cada lote y se pasan como sample_weight:
+    # class_weight queda como estaba ("balanced") para el próximo lote
+    base = clf.class_weight
+    peso = None
+    if base is not None:
+        peso = compute_sample_weight("balanced" if base == "balanced_subsample" else base, y)
+    clf.set_params(warm_start=True, n_estimators=clf.n_estimators + Config.INCREMENTAL_TREES, class_weight=None)
+    try:
+        clf.fit(Xt, y, sample_weight=peso)
+    finally:
+        clf.set_params(class_weight=base)
+    return clf
+
+
+def actualizar(modelos=INCREMENTALES, model_dir: str = "ml", directorio: str = None, hasta: str = None) -> dict:
+    """Extiende cada modelo con las particiones posteriores a su marca de agua."""
+    hasta = hasta or datetime.now().strftime("%Y-%m-%d")
+    resumen = {}
+    for nombre in modelos:
+        if nombre not in INCREMENTALES:
+            raise ValueError(f"{nombre} no admite actualización incremental; use --completo.")
+        marca = leer_marca(model_dir, nombre)
+        nuevas = particiones(directorio, desde=marca.get("watermark"), hasta=hasta)
+        if not nuevas:
+            resumen[nombre] = {"estado": "al_dia", "watermark": marca.get("watermark")}
+            continue
+
+        df = preparar_dataset([leer_plataforma(p) for _, p in nuevas], leer_nacional())
+        y = df["dumping_flag"].to_numpy()
+        if len(np.unique(y)) < 2:
+            logging.warning("[%s] %s filas nuevas con una sola clase; se espera a más datos", nombre, len(df))
+            resumen[nombre] = {"estado": "sin_ambas_clases", "filas": len(df), "watermark": marca.get("watermark")}
+            continue
+
+        path = os.path.join(model_dir, MODELOS[nombre][2])
+        pipeline = joblib.load(path)
+        X = df[FEATURES]
+        # AUC del modelo actual sobre datos que aún no vio, antes de actualizarlo
+        auc_antes = roc_auc_score(y, pipeline.predict_proba(X)[:, 1])
+        pipeline.steps[-1] = ("clf", _continuar(nombre, pipeline, pipeline.named_steps["prep"].transform(X), y))
+        guardar_modelo(pipeline, path)
+
+        watermark = nuevas[-1][0]
+        guardar_marca(model_dir, nombre, watermark=watermark, modo="incremental",
+                      particiones=[os.path.basename(p) for _, p in nuevas], filas=len(df),
+                      auc_antes=round(float(auc_antes), 5),
+                      ultimo_completo=marca.get("ultimo_completo"))
+        resumen[nombre] = {"estado": "actualizado", "particiones": len(nuevas), "filas": len(df),
+                           "auc_antes": round(float(auc_antes), 5), "watermark": watermark}
+        print(f"➕ {MODELOS[nombre][0]}: {len(df)} filas de {len(nuevas)} particiones "
+              f"(AUC previo sobre ellas {auc_antes:.3f}); marca de agua {watermark}")
+    return resumen
+
+
+def consolidar(model_dir: str = "ml", directorio: str = None, hasta: str = None, nucleos: int = None) -> dict:
+    """Reentrenamiento completo con los datos base y todas las particiones cerradas."""
+    hasta = hasta or datetime.now().strftime("%Y-%m-%d")
+    todas = particiones(directorio, hasta=hasta)
+    df = load_and_clean_data(extra=[p for _, p in todas])
+    train_all_models(df, nucleos=nucleos, model_dir=model_dir)
+    watermark = todas[-1][0] if todas else None
+    for nombre in MODELOS:
+        guardar_marca(model_dir, nombre, watermark=watermark, modo="completo", particiones=len(todas),
+                      filas=len(df), ultimo_completo=datetime.now().isoformat(timespec="seconds"))
+    return {"estado": "completo", "particiones": len(todas), "filas": len(df), "watermark": watermark}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Actualiza los modelos con las particiones nuevas del crawl")
+    parser.add_argument("--completo", action="store_true", help="reentrenar desde cero (consolidación)")
+    parser.add_argument("--modelos", nargs="+", choices=INCREMENTALES, default=list(INCREMENTALES))
+    parser.add_argument("--directorio", default=None, help="particiones (por defecto OUTPUT_DIR/crawl)")
+    parser.add_argument("--nucleos", type=int, default=None)
+    args = parser.parse_args(argv)
+    if args.completo:
+        resumen = consolidar(directorio=args.directorio, nucleos=args.nucleos)
+    else:
+        resumen = actualizar(args.modelos, directorio=args.directorio)
+    print(json.dumps(resumen, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# /ml/matching.py
+"""Índice de similitud entre títulos scrapeados y el catálogo nacional.
+
+Vectoriza ``DESCRIPCION_ARTICULO`` de ``precios_nacionales.xls`` con TF-IDF de
+n-gramas de caracteres (3-5, dentro de cada palabra) sobre texto normalizado:
+minúsculas, sin tildes, sin códigos de modelo y con el vocabulario inglés de
+prendas traducido al español ("men slim shirt" -> "hombre slim camisa"). Las
+consultas se resuelven por lotes con un producto de matrices dispersas
+``Q @ M.T``; como las filas están normalizadas (L2) el resultado es la
+similitud coseno y de cada fila solo se ordenan sus entradas no nulas.
+
+Las descripciones del catálogo son cortas y llenas de marcas, así que una
+palabra rara ("algodón") puede pesar más que la prenda; por eso la búsqueda
+admite restringir cada título a la clase que le asigna
+``ml.referencias.clases_de``.
+
+El índice se guarda con joblib junto al sha256 del catálogo: se construye una
+vez y se reconstruye solo si el Excel cambia.
+
+Uso:
+    python -m ml.matching "men slim fit shirt" "pantalon jean hombre"
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from config import Config
+from ml.data_cache import leer_nacional, sha256_archivo
+from ml.referencias import clases_de, normalizar
+
+VERSION = 1
+
+# Inglés (y variantes) -> término del catálogo nacional
+TRADUCCIONES = {
+    "shirt": "camisa", "shirts": "camisa", "blouse": "blusa",
+    "tshirt": "polo", "tee": "polo", "tees": "polo", "polos": "polo",
+    "pants": "pantalon", "trousers": "pantalon", "jeans": "pantalon jean", "jean": "jean",
+    "pantalones": "pantalon", "chinos": "pantalon chino", "shorts": "bermuda",
+    "suit": "terno", "suits": "terno", "blazer": "saco", "jacket": "casaca",
+    "coat": "abrigo", "sweater": "chompa", "pullover": "chompa", "cardigan": "chompa",
+    "hoodie": "polera", "sweatshirt": "polera", "vest": "chaleco", "tie": "corbata",
+    "necktie": "corbata", "belt": "correa", "shoes": "zapato", "shoe": "zapato",
+    "sneakers": "zapatilla", "boots": "botin", "socks": "calcetin", "sock": "calcetin",
+    "pajamas": "pijama", "pyjamas": "pijama", "underwear": "boxer", "briefs": "boxer",
+    "men": "hombre", "mens": "hombre", "man": "hombre", "male": "hombre",
+    "women": "mujer", "womens": "mujer", "woman": "mujer", "female": "mujer",
+    "kids": "infantil", "boys": "infantil", "boy": "infantil",
+    "long": "larga", "sleeve": "manga", "short": "corta", "cotton": "algodon",
+    "linen": "lino", "wool": "lana", "leather": "cuero", "silk": "seda",
+}
+_PALABRA = re.compile(r"[a-z]+")
+# Palabras de 1 letra y tokens con dígitos (tallas, SKUs como "1lso84") no aportan
+_RUIDO = re.compile(r"\b(?:\w*\d\w*|\w)\b")
+
+
+def normalizar_titulo(texto) -> str:
+    texto = _RUIDO.sub(" ", normalizar(texto).replace("t-shirt", "tshirt"))
+    palabras = []
+    for palabra in _PALABRA.findall(texto):
+        palabras.append(TRADUCCIONES.get(palabra, palabra))
+    return " ".join(palabras)
+
+
+def leer_catalogo(path: str) -> pd.DataFrame:
+    """Artículos nacionales con descripción, clase y precio unitario (``Val_Act / St_Act``)."""
+    nacional = leer_nacional(path)
+    return pd.DataFrame({
+        "descripcion": nacional["DESCRIPCION_ARTICULO"].astype(str).str.strip(),
+        "clase": nacional["CLASE"].astype(str).str.strip().str.upper(),
+        "precio_local": nacional["Val_Act"] / nacional["St_Act"].replace(0, np.nan),
+    })
+
+
+class IndiceCatalogo:
+    def __init__(self, vectorizer, matriz, articulos: pd.DataFrame, fuente_sha256: str = None):
+        self.vectorizer = vectorizer
+        self.matriz = matriz            # CSR (n_articulos x n_ngramas), filas con norma L2
+        self.articulos = articulos.reset_index(drop=True)
+        self.fuente_sha256 = fuente_sha256
+        self._clase = self.articulos["clase"].to_numpy(dtype=object)
+
+    @classmethod
+    def construir(cls, articulos: pd.DataFrame, fuente_sha256: str = None) -> "IndiceCatalogo":
+        vectorizer = TfidfVectorizer(
+            analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True,
+            preprocessor=normalizar_titulo, dtype=np.float32,
+        )
+        matriz = vectorizer.fit_transform(articulos["descripcion"]).tocsr()
+        logging.info("Índice del catálogo: %s artículos x %s n-gramas", *matriz.shape)
+        return cls(vectorizer, matriz, articulos, fuente_sha256)
+
+    def __len__(self):
+        return self.matriz.shape[0]
+
+    def vecinos(self, titulos, k: int = 5, min_similitud: float = 0.0, clases=None, lote: int = 2048):
+        """Los ``k`` artículos más parecidos a cada título.
+
+        ``clases`` (opcional, alineado con ``titulos``) limita cada título a los
+        artículos de esa clase; None en una posición no restringe. Devuelve dos
+        arrays (n_titulos x k): índices de artículo (-1 si no hay candidato) y
+        similitud coseno (0 en ese caso), de mayor a menor.
+        """
+        titulos = list(titulos)
+        clases = list(clases) if clases is not None else [None] * len(titulos)
+        indices = np.full((len(titulos), k), -1, dtype=np.int64)
+        similitud = np.zeros((len(titulos), k), dtype=np.float32)
+        for inicio in range(0, len(titulos), lote):
+            consulta = self.vectorizer.transform(titulos[inicio:inicio + lote])
+            sim = (consulta @ self.matriz.T).tocsr()
+            for i in range(sim.shape[0]):
+                desde, hasta = sim.indptr[i], sim.indptr[i + 1]
+                datos, cols = sim.data[desde:hasta], sim.indices[desde:hasta]
+                clase = clases[inicio + i]
+                if clase is not None:
+                    misma = self._clase[cols] == clase
+                    datos, cols = datos[misma], cols[misma]
+                if len(datos) > k:
+                    top = np.argpartition(-datos, k - 1)[:k]
+                    datos, cols = datos[top], cols[top]
+                orden = np.argsort(-datos, kind="stable")
+                datos, cols = datos[orden], cols[orden]
+                validos = datos >= max(min_similitud, 1e-9)
+                n = int(validos.sum())
+                indices[inicio + i, :n] = cols[validos]
+                similitud[inicio + i, :n] = datos[validos]
+        return indices, similitud
+
+    def buscar(self, titulos, k: int = 5, min_similitud: float = 0.0, clases=None) -> pd.DataFrame:
+        """Vecinos en formato largo: una fila por (título, rango) con los datos del artículo."""
+        indices, similitud = self.vecinos(titulos, k=k, min_similitud=min_similitud, clases=clases)
+        fila, rango = np.nonzero(indices >= 0)
+        articulos = self.articulos.iloc[indices[fila, rango]].reset_index(drop=True)
+        return pd.concat([
+            pd.DataFrame({"consulta": fila, "rango": rango + 1, "similitud": similitud[fila, rango]}),
+            articulos,
+        ], axis=1)
+
+    def guardar(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        joblib.dump({
+            "version": VERSION, "fuente_sha256": self.fuente_sha256,
+            "vectorizer": self.vectorizer, "matriz": self.matriz, "articulos": self.articulos,
+        }, tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def cargar(cls, path: str) -> "IndiceCatalogo":
+        datos = joblib.load(path)
+        if datos.get("version") != VERSION:
+            raise ValueError(f"Índice {path} con versión {datos.get('version')}, se esperaba {VERSION}")
+        return cls(datos["vectorizer"], datos["matriz"], datos["articulos"], datos["fuente_sha256"])
+
+
+def cargar_o_construir(fuente: str = None, path: str = None) -> IndiceCatalogo:
+    """Índice persistido en ``path``; se reconstruye si falta o si ``fuente`` cambió."""
+    fuente = fuente or Config.NATIONAL_PRICES_PATH
+    path = path or Config.MATCHING_INDEX_PATH
+    sha = sha256_archivo(fuente)
+    if os.path.exists(path):
+        try:
+            indice = IndiceCatalogo.cargar(path)
+            if indice.fuente_sha256 == sha:
+                return indice
+            logging.info("El catálogo %s cambió; se reconstruye el índice", fuente)
+        except Exception:
+            logging.warning("Índice %s ilegible; se reconstruye", path, exc_info=True)
+    indice = IndiceCatalogo.construir(leer_catalogo(fuente), fuente_sha256=sha)
+    try:
+        indice.guardar(path)
+    except OSError:
+        logging.warning("No se pudo guardar el índice en %s; se usa solo en memoria", path, exc_info=True)
+    return indice
+
+
+_indice = None
+
+
+def get_indice() -> IndiceCatalogo:
+    global _indice
+    if _indice is None:
+        _indice = cargar_o_construir()
+    return _indice
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("titulos", nargs="+")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--sin-clase", action="store_true", help="no restringir por clase de prenda")
+    args = parser.parse_args(argv)
+    clases = None if args.sin_clase else clases_de(args.titulos).tolist()
+    resultado = get_indice().buscar(args.titulos, k=args.k, clases=clases)
+    resultado["consulta"] = [args.titulos[i] for i in resultado["consulta"]]
+    print(resultado.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    # Desde el módulo importado: el vectorizador guarda una referencia a
+    # normalizar_titulo y debe apuntar a ml.matching, no a __main__
+    from ml.matching import main as _main
+    sys.exit(_main())
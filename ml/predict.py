@@ -1,18 +1,197 @@
 # /ml/predict.py
+import glob
+import hashlib
+import io
+import logging
+import threading
 import joblib
+import numpy as np
 import pandas as pd
 import os
 
-MODEL_PATH = os.path.join("ml", "model_xgboost.pkl")
+from ml.compiled import CompiledPipeline, NotCompilable
 
-def load_model():
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError("El modelo predictivo no está entrenado aún.")
-    return joblib.load(MODEL_PATH)
+MODEL_DIR = "ml"
+MODEL_PATH = os.path.join(MODEL_DIR, "model_xgboost.pkl")
 
-def predict_dumping(precio_importado: float, precio_local: float, plataforma: str):
-    model = load_model()
+# Nombre público -> artefacto que escribe ml/training.py
+MODELOS = {
+    "logistica": "model_logistica.pkl",
+    "randomforest": "model_randomforest.pkl",
+    "xgboost": "model_xgboost.pkl",
+    "isolation": "model_isolation.pkl",
+}
+DEFAULT_MODEL = "xgboost"
+UMBRAL_DUMPING = 0.7
+FEATURES = ["precio", "precio_local", "ratio_precio", "plataforma"]
+NUMERICAS = ["precio", "precio_local", "ratio_precio"]
+
+
+class _Entrada:
+    __slots__ = ("firma", "sha256", "modelo", "compilado")
+
+    def __init__(self, firma, sha256, modelo, compilado=None):
+        self.firma = firma
+        self.sha256 = sha256
+        self.modelo = modelo
+        self.compilado = compilado
+
+
+class ModelRegistry:
+    """Modelos deserializados una sola vez por proceso, por nombre o ruta.
+
+    Cada acceso compara (mtime, tamaño) del archivo con los de la carga; si
+    cambiaron se recalcula el sha256 y solo se vuelve a deserializar si el
+    contenido es distinto. Es seguro entre hilos: una recarga bloquea solo ese
+    artefacto y, si el archivo nuevo no se puede leer (p. ej. a medio
+    escribir), se sigue sirviendo el modelo anterior.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR):
+        self.model_dir = model_dir
+        self._cache = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def path(self, nombre: str) -> str:
+        if nombre not in MODELOS:
+            raise ValueError(f"Modelo desconocido: {nombre}. Opciones: {', '.join(MODELOS)}.")
+        return os.path.join(self.model_dir, MODELOS[nombre])
+
+    @staticmethod
+    def _firma(path: str):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def _lock_de(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def get(self, nombre: str = DEFAULT_MODEL):
+        return self.load_path(self.path(nombre))
+
+    def load_path(self, path: str):
+        try:
+            firma = self._firma(path)
+        except FileNotFoundError:
+            raise FileNotFoundError("El modelo predictivo no está entrenado aún.") from None
+        entrada = self._cache.get(path)
+        if entrada is not None and entrada.firma == firma:
+            return entrada.modelo
+
+        with self._lock_de(path):
+            entrada = self._cache.get(path)
+            if entrada is not None and entrada.firma == firma:
+                return entrada.modelo  # otro hilo ya lo recargó
+            with open(path, "rb") as fh:
+                data = fh.read()
+            sha = hashlib.sha256(data).hexdigest()
+            if entrada is not None and entrada.sha256 == sha:
+                # Reescrito con el mismo contenido: no hace falta deserializar
+                self._cache[path] = _Entrada(firma, sha, entrada.modelo, entrada.compilado)
+                return entrada.modelo
+            try:
+                modelo = joblib.load(io.BytesIO(data))
+            except Exception:
+                if entrada is None:
+                    raise
+                logging.warning("No se pudo recargar %s; se mantiene la versión anterior", path)
+                return entrada.modelo
+            self._cache[path] = _Entrada(firma, sha, modelo, _compilar(modelo))
+            logging.info("Modelo %s cargado (sha256 %s)", path, sha[:12])
+            return modelo
+
+    def compiled(self, nombre: str = DEFAULT_MODEL):
+        """Versión compilada del modelo para una sola fila, o None si no aplica.
+
+        Se recompila junto con el modelo en cada recarga en caliente.
+        """
+        path = self.path(nombre)
+        self.load_path(path)
+        entrada = self._cache.get(path)
+        return entrada.compilado if entrada is not None else None
+
+    def info(self) -> dict:
+        """Artefactos cargados y su sha256 (útil para saber qué versión se sirve)."""
+        return {path: e.sha256 for path, e in self._cache.items()}
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+def _compilar(modelo):
+    try:
+        return CompiledPipeline(modelo, NUMERICAS)
+    except NotCompilable as e:
+        logging.debug("Modelo sin ruta compilada: %s", e)
+        return None
+
+
+_registry = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    return _registry
+
+
+def load_model(path: str = MODEL_PATH):
+    return _registry.load_path(path)
+
+
+def preload_models(model_dir: str = MODEL_DIR):
+    """Deserializa de antemano todos los artefactos ml/model_*.pkl."""
+    cargados = []
+    for path in sorted(glob.glob(os.path.join(model_dir, "model_*.pkl"))):
+        load_model(path)
+        cargados.append(path)
+    return cargados
+
+
+def predict_dumping_batch(precio_importado, precio_local, plataforma="AliExpress",
+                          modelo: str = DEFAULT_MODEL) -> pd.DataFrame:
+    """Puntúa muchas filas con una sola llamada al modelo.
+
+    Acepta listas/arrays (o un escalar para `plataforma`) y devuelve un
+    DataFrame en el orden de entrada. Las filas con precios no positivos o no
+    numéricos quedan con probabilidad NaN y decisión "Datos inválidos".
+    """
+    model = _registry.get(modelo)
+    X = pd.DataFrame({
+        "precio": pd.to_numeric(pd.Series(precio_importado), errors="coerce").to_numpy(dtype=float),
+        "precio_local": pd.to_numeric(pd.Series(precio_local), errors="coerce").to_numpy(dtype=float),
+    })
+    X["ratio_precio"] = X["precio"] / X["precio_local"]
+    X["plataforma"] = plataforma if isinstance(plataforma, str) else pd.Series(plataforma).to_numpy()
+    validos = (X["precio"] > 0) & (X["precio_local"] > 0) & np.isfinite(X["ratio_precio"])
+
+    salida = pd.DataFrame(index=X.index)
+    if modelo == "isolation":
+        score = np.full(len(X), np.nan)
+        if validos.any():
+            score[validos.to_numpy()] = model.decision_function(X.loc[validos, NUMERICAS])
+        salida["puntuacion_anomalia"] = np.round(-score, 3)
+        salida["decision"] = np.where(score < 0, "Precio anómalo", "Precio normal")
+    else:
+        proba = np.full(len(X), np.nan)
+        if validos.any():
+            proba[validos.to_numpy()] = model.predict_proba(X.loc[validos, FEATURES])[:, 1]
+        salida["probabilidad_dumping"] = np.round(proba, 3)
+        salida["decision"] = np.where(proba >= UMBRAL_DUMPING, "Dumping probable", "Precio competitivo")
+    salida.loc[~validos, "decision"] = "Datos inválidos"
+    return salida
+
+
+def predict_dumping(precio_importado: float, precio_local: float, plataforma: str,
+                    modelo: str = DEFAULT_MODEL):
     ratio = precio_importado / precio_local
+    rapido = _registry.compiled(modelo)
+    if rapido is not None:
+        # Sin DataFrame ni ColumnTransformer: ver ml/compiled.py
+        proba = rapido.predict_proba_one((precio_importado, precio_local, ratio), plataforma)
+        return _resultado_proba(modelo, proba)
+
+    model = _registry.get(modelo)
 
     X = pd.DataFrame([{
         "precio": precio_importado,
@@ -21,9 +200,47 @@ def predict_dumping(precio_importado: float, precio_local: float, plataforma: st
         "plataforma": plataforma
     }])
 
-    proba = model.predict_proba(X)[0, 1]
-    resultado = {
+    if modelo == "isolation":
+        # No supervisado: entrenado solo con las columnas numéricas
+        score = model.decision_function(X[NUMERICAS])[0]
+        return {
+            "modelo": modelo,
+            "puntuacion_anomalia": round(float(-score), 3),
+            "decision": "Precio anómalo" if score < 0 else "Precio normal",
+        }
+
+    return _resultado_proba(modelo, model.predict_proba(X)[0, 1])
+
+
+def _resultado_proba(modelo: str, proba: float) -> dict:
+    return {
+        "modelo": modelo,
         "probabilidad_dumping": round(float(proba), 3),
-        "decision": "Dumping probable" if proba >= 0.7 else "Precio competitivo"
+        "decision": "Dumping probable" if proba >= UMBRAL_DUMPING else "Precio competitivo"
     }
-    return resultado
+
+
+def puntuar_productos(productos: list, consulta: str = None, modelo: str = DEFAULT_MODEL,
+                      catalogo=None) -> list:
+    """Añade a cada producto scrapeado su referencia nacional y la predicción.
+
+    Busca el precio nacional de cada título (ver ml/referencias.py) y puntúa
+    todo el lote con una sola llamada a `predict_dumping_batch`. Devuelve
+    copias de los dicts con `clase_nacional`, `precio_local`,
+    `probabilidad_dumping` (o `puntuacion_anomalia`) y `decision`.
+    """
+    if not productos:
+        return []
+    if catalogo is None:
+        from ml.referencias import get_catalogo
+        catalogo = get_catalogo()
+    df = pd.DataFrame(productos)
+    ref = catalogo.referencias(df.get("titulo", pd.Series([""] * len(df))), consulta=consulta)
+    plataforma = df["plataforma"].fillna("Desconocida") if "plataforma" in df else "Desconocida"
+    pred = predict_dumping_batch(df.get("precio"), ref["precio_local"], plataforma, modelo=modelo)
+    pred.loc[ref["precio_local"].isna().to_numpy(), "decision"] = "Sin referencia nacional"
+
+    extra = pd.concat([ref, pred], axis=1)
+    extra["precio_local"] = extra["precio_local"].round(2)
+    extra = extra.astype(object).where(extra.notna(), None)
+    return [{**p, **e} for p, e in zip(productos, extra.to_dict("records"))]
@@ -7,39 +7,82 @@ con precios nacionales y generar dataset de entrenamiento limpio.
 import pandas as pd
 import numpy as np
 import re
+import time
 
+from ml.data_cache import leer_nacional, leer_plataforma
+from ml.referencias import catalogo_de
 
-def load_and_clean_data():
-    # === Cargar datos ===
-    ali_baba = pd.read_csv("data/productos_alibaba.csv", sep=";")
-    ali_express = pd.read_csv("data/productos_aliexpress.csv", sep=";")
-    nacional = pd.read_excel("data/precios_nacionales.xls")
 
+def estadisticas_nacionales(nacional: pd.DataFrame, clave: str = "categoria") -> pd.DataFrame:
+    """Una fila por `clave` con mediana, cuartiles y número de artículos nacionales.
+
+    Sustituye al cruce producto x artículo nacional: el dataset queda con una
+    fila por producto internacional, sin importar el tamaño del catálogo.
+    """
+    validos = nacional[nacional["precio_local"] > 0]
+    g = validos.groupby(clave)["precio_local"]
+    return pd.DataFrame({
+        "precio_local": g.median(),
+        "precio_local_p25": g.quantile(0.25),
+        "precio_local_p75": g.quantile(0.75),
+        "n_articulos": g.size(),
+    }).reset_index()
+
+
+def load_and_clean_data(extra=()):
+    """Dataset de entrenamiento; `extra` son CSV adicionales (p. ej. particiones del crawl)."""
+    # === Cargar datos (caché por contenido, ver ml/data_cache.py) ===
+    ali_baba = leer_plataforma("data/productos_alibaba.csv")
+    ali_express = leer_plataforma("data/productos_aliexpress.csv")
+    nacional = leer_nacional("data/precios_nacionales.xls")
+    return preparar_dataset([ali_baba, ali_express] + [leer_plataforma(p) for p in extra], nacional)
+
+
+def preparar_dataset(internacionales: list, nacional: pd.DataFrame, catalogo=None) -> pd.DataFrame:
+    """Dataset etiquetado: una fila por producto internacional con su referencia nacional.
+
+    ``precio_local`` sale de ``catalogo`` (por defecto ``catalogo_de(nacional)``),
+    el mismo cálculo que aplica ``ml.predict.puntuar_productos`` a los scrapes:
+    clase del título por palabras clave y mediana de esa clase, o la de los
+    artículos más parecidos con ``REFERENCE_MATCHING=indice``.
+    """
     # === Limpieza mínima ===
-    for df in [ali_baba, ali_express]:
+    for df in internacionales:
         df["titulo"] = df["titulo"].astype(str).str.lower()
         df["precio"] = pd.to_numeric(df["precio"], errors="coerce")
-        df["plataforma"] = df["plataforma"].fillna("Desconocida")
+        df["plataforma"] = df["plataforma"].astype(object).fillna("Desconocida")
 
     # Calcular precio local promedio (soles)
-    nacional["precio_local"] = nacional["Val_Act"] / nacional["St_Act"].replace(0, np.nan)
-    nacional["DESCRIPCION_ARTICULO"] = nacional["DESCRIPCION_ARTICULO"].astype(str).str.lower()
-
-    # === Filtrar solo camisas/pantalones (ejemplo textil) ===
-    filtro = "camisa|shirt|pantalon|pants|trouser"
-    ali_baba = ali_baba[ali_baba["titulo"].str.contains(filtro, na=False)]
-    ali_express = ali_express[ali_express["titulo"].str.contains(filtro, na=False)]
-    nacional = nacional[nacional["DESCRIPCION_ARTICULO"].str.contains("camisa|pantalon", na=False)]
+    nacional = nacional.assign(
+        precio_local=nacional["Val_Act"] / nacional["St_Act"].replace(0, np.nan),
+        clase=nacional["CLASE"].astype(str).str.strip().str.upper(),
+    )
 
     # === Unir ambos internacionales ===
-    intl = pd.concat([ali_baba, ali_express], ignore_index=True)
-
-    # === Categorizar tipo de prenda ===
-    intl["categoria"] = intl["titulo"].apply(lambda x: "camisa" if "shirt" in x or "camisa" in x else "pantalon")
-    nacional["categoria"] = nacional["DESCRIPCION_ARTICULO"].apply(lambda x: "camisa" if "camisa" in x else "pantalon")
-
-    # === Merge por categoría ===
-    df = pd.merge(intl, nacional[["categoria", "precio_local"]], on="categoria", how="left")
+    intl = pd.concat(internacionales, ignore_index=True)
+
+    # === Referencia nacional, la misma que al puntuar (ver ml/referencias.py) ===
+    inicio = time.perf_counter()
+    catalogo = catalogo if catalogo is not None else catalogo_de(nacional)
+    ref = catalogo.referencias(intl["titulo"])
+    intl = pd.concat([intl, ref.set_index(intl.index)], axis=1)
+    # Solo prendas con clase nacional (antes: camisas y pantalones)
+    intl = intl[intl["clase_nacional"].notna()]
+
+    # Dispersión y tamaño de la clase: una fila por clase, unión muchos-a-uno
+    stats = estadisticas_nacionales(nacional, clave="clase").drop(columns="precio_local")
+    df = pd.merge(intl, stats.rename(columns={"clase": "clase_nacional"}), on="clase_nacional",
+                  how="left", validate="many_to_one")
+    segundos = time.perf_counter() - inicio
+    filas_cruce = int((intl["clase_nacional"].value_counts() * nacional["clase"].value_counts()).fillna(0).sum())
+    # Cada fila del cruce llevaría el producto y el artículo nacional completos
+    bytes_fila_cruce = (intl.memory_usage(deep=True).sum() / max(len(intl), 1)
+                        + nacional.memory_usage(deep=True).sum() / max(len(nacional), 1))
+    mb = df.memory_usage(deep=True).sum() / 2**20
+    mb_cruce = filas_cruce * bytes_fila_cruce / 2**20
+    print(f"ℹ️ Referencia nacional: {df['clase_nacional'].nunique()} clases; {len(df)} filas, "
+          f"{mb:.2f} MB en {segundos:.2f} s (el cruce por clase habría generado {filas_cruce} "
+          f"filas, ~{mb_cruce:.2f} MB).")
 
     # === Calcular ratio_precio de forma segura ===
     df["ratio_precio"] = df["precio"] / df["precio_local"]
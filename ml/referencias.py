@@ -0,0 +1,169 @@
+# /ml/referencias.py
+"""Precio nacional de referencia para productos scrapeados.
+
+Cada título (o, si no dice nada, la búsqueda que lo trajo) se asigna a una
+``CLASE`` de ``data/precios_nacionales.xls`` por palabras clave en español e
+inglés, y toma la mediana del precio unitario nacional (``Val_Act / St_Act``)
+de esa clase. El catálogo se lee una vez por proceso.
+
+Con ``REFERENCE_MATCHING=indice`` la referencia se afina con el índice TF-IDF
+de ``ml/matching.py``: mediana de los ``k`` artículos nacionales más parecidos
+al título (dentro de su clase), con la de la clase como respaldo.
+"""
+import logging
+import re
+import threading
+import unicodedata
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from ml.data_cache import leer_nacional
+
+# Orden = prioridad: "t-shirt" o "sweatshirt" antes que "shirt", "traje de baño" antes que "traje"
+CLAVES = [
+    ("POLOS", r"polos?|t-?shirts?|tees?|playeras?"),
+    ("CAMISETA", r"camisetas?|undershirts?|tank tops?"),
+    ("POLERA", r"poleras?|hoodies?|sudaderas?|sweatshirts?"),
+    ("CAMISA", r"camisas?|shirts?|blusas?|blouses?"),
+    ("PANTALON", r"pantalon(?:es)?|pants|trousers|jeans|chinos?"),
+    ("BERMUDA", r"bermudas?|shorts"),
+    ("ROPA DE BAÑO", r"traje de bano|ropa de bano|swimsuits?|swimwear|swim trunks"),
+    ("BIKINI", r"bikinis?"),
+    ("TERNO", r"ternos?|suits?|trajes?"),
+    ("SACO", r"sacos?|blazers?"),
+    ("CASACA", r"casacas?|jackets?|chaquetas?|chamarras?"),
+    ("ABRIGO", r"abrigos?|overcoats?|coats?"),
+    ("CHOMPA", r"chompas?|sweaters?|sueteres?|pullovers?|cardigans?"),
+    ("CHALECO", r"chalecos?|vests?"),
+    ("CORBATA", r"corbatas?|neckties?|ties?"),
+    ("CORREA", r"correas?|cinturon(?:es)?|belts?"),
+    ("ZAPATILLAS", r"zapatillas?|sneakers?"),
+    ("CALZADO", r"calzado|zapatos?|shoes?|botas?|boots?|loafers?"),
+    ("BOXER", r"boxers?|calzoncillos?|briefs|underwear"),
+    ("CALCETIN", r"calcetin(?:es)?|medias|socks?"),
+    ("PIJAMA", r"pijamas?|pajamas?|pyjamas?"),
+]
+_PATRONES = [(clase, re.compile(rf"\b(?:{rx})\b")) for clase, rx in CLAVES]
+
+
+def normalizar(texto) -> str:
+    """Minúsculas y sin tildes ('Pantalón' -> 'pantalon')."""
+    texto = unicodedata.normalize("NFKD", str(texto).lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def clases_de(textos) -> pd.Series:
+    """Clase nacional de cada texto (None si ninguna palabra clave aparece)."""
+    s = pd.Series(list(textos), dtype=object).fillna("").map(normalizar)
+    condiciones = [s.str.contains(patron) for _, patron in _PATRONES]
+    clases = np.select(condiciones, [clase for clase, _ in _PATRONES], default=None)
+    return pd.Series(clases, index=s.index, dtype=object)
+
+
+class CatalogoNacional:
+    """Mediana del precio unitario nacional por clase de prenda.
+
+    Las clases con menos de ``min_articulos`` artículos con precio válido se
+    descartan: su mediana no es una referencia fiable.
+    """
+
+    def __init__(self, path: str = None, min_articulos: int = 5, indice=None, nacional: pd.DataFrame = None):
+        self.path = path or Config.NATIONAL_PRICES_PATH
+        self.min_articulos = min_articulos
+        self.indice = indice  # IndiceCatalogo opcional (ver ml/matching.py)
+        self._nacional = nacional  # catálogo ya leído (entrenamiento); si no, se lee `path`
+        self._precios = None
+        self._lock = threading.Lock()
+
+    @property
+    def precios(self) -> pd.Series:
+        if self._precios is None:
+            with self._lock:
+                if self._precios is None:
+                    self._precios = self._cargar()
+        return self._precios
+
+    def _cargar(self) -> pd.Series:
+        nacional = self._nacional if self._nacional is not None else leer_nacional(self.path)
+        precio = nacional["Val_Act"] / nacional["St_Act"].replace(0, np.nan)
+        nacional = nacional.assign(precio_local=precio, clase=nacional["CLASE"].astype(str).str.strip().str.upper())
+        nacional = nacional[nacional["precio_local"] > 0]
+        stats = nacional.groupby("clase")["precio_local"].agg(["median", "count"])
+        stats = stats[stats["count"] >= self.min_articulos]
+        logging.info("Catálogo nacional: %s clases con referencia (%s)", len(stats),
+                     "DataFrame" if self._nacional is not None else self.path)
+        return stats["median"]
+
+    def referencias(self, titulos, consulta: str = None) -> pd.DataFrame:
+        """``clase_nacional`` y ``precio_local`` para cada título, en el mismo orden.
+
+        Si el título no permite deducir la clase se usa la de ``consulta``; sin
+        clase (o sin referencia para ella) ``precio_local`` queda NaN.
+        """
+        clases = clases_de(titulos)
+        if consulta:
+            clase_consulta = clases_de([consulta]).iloc[0]
+            if clase_consulta is not None:
+                clases = clases.fillna(clase_consulta)
+        ref = pd.DataFrame({
+            "clase_nacional": clases,
+            "precio_local": clases.map(self.precios).astype(float),
+        })
+        if self.indice is not None:
+            ref = self._afinar(ref, titulos)
+        return ref
+
+    def _afinar(self, ref: pd.DataFrame, titulos) -> pd.DataFrame:
+        """Sustituye la mediana de la clase por la de los artículos más parecidos."""
+        clases = ref["clase_nacional"].where(ref["clase_nacional"].notna(), None).tolist()
+        indices, similitud = self.indice.vecinos(
+            pd.Series(list(titulos), dtype=object).fillna("").astype(str),
+            k=Config.MATCHING_TOP_K, min_similitud=Config.MATCHING_MIN_SIMILARITY, clases=clases,
+        )
+        articulos = self.indice.articulos
+        hay = indices >= 0
+        precios = np.where(hay, articulos["precio_local"].to_numpy(dtype=float)[indices], np.nan)
+        precios[~(precios > 0)] = np.nan
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # filas sin vecinos: mediana NaN
+            mediana = np.nanmedian(precios, axis=1)
+
+        mejor = np.where(hay[:, 0], indices[:, 0], 0)
+        ref = ref.assign(
+            articulo_nacional=np.where(hay[:, 0], articulos["descripcion"].to_numpy(dtype=object)[mejor], None),
+            similitud=np.where(hay[:, 0], np.round(similitud[:, 0].astype(float), 3), np.nan),
+        )
+        sin_clase = ref["clase_nacional"].isna().to_numpy() & hay[:, 0]
+        ref.loc[sin_clase, "clase_nacional"] = articulos["clase"].to_numpy(dtype=object)[mejor[sin_clase]]
+        ref["precio_local"] = np.where(np.isfinite(mediana), mediana, ref["precio_local"])
+        return ref
+
+
+_catalogo = None
+
+
+def _indice_configurado():
+    """Índice TF-IDF si ``REFERENCE_MATCHING=indice``; None con la referencia por clase."""
+    if Config.REFERENCE_MATCHING != "indice":
+        return None
+    from ml.matching import get_indice
+    return get_indice()
+
+
+def catalogo_de(nacional: pd.DataFrame) -> CatalogoNacional:
+    """Catálogo sobre un ``precios_nacionales`` ya leído, con la referencia de la puntuación.
+
+    Lo usa el entrenamiento para que ``precio_local`` signifique lo mismo al
+    ajustar el modelo que al puntuar un scrape.
+    """
+    return CatalogoNacional(nacional=nacional, indice=_indice_configurado())
+
+
+def get_catalogo() -> CatalogoNacional:
+    global _catalogo
+    if _catalogo is None:
+        _catalogo = CatalogoNacional(indice=_indice_configurado())
+    return _catalogo
@@ -1,8 +1,23 @@
 # -*- coding: utf-8 -*-
 """
 Entrenamiento de modelos predictivos: Logística, RandomForest, XGBoost, IsolationForest
+
+El ColumnTransformer se ajusta y aplica una sola vez; los cuatro modelos se
+entrenan a la vez en un pool de procesos sobre las matrices ya transformadas
+y se reensamblan como Pipeline (prep + clf), así que los artefactos son los
+mismos que sirve ml/predict.py. `nucleos` (o TRAIN_CORES) limita los núcleos
+en total: procesos simultáneos x hilos de RandomForest/XGBoost.
+
+Uso:  python -m ml.training [--nucleos 4]
 """
 
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import joblib
 from sklearn.model_selection import train_test_split
@@ -13,107 +28,171 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier, IsolationForest
 from sklearn.metrics import classification_report, roc_auc_score
 import xgboost as xgb
+
+from config import Config
 from ml.preprocessing import load_and_clean_data
 
-def train_all_models():
-    df = load_and_clean_data()
+FEATURES = ["precio", "precio_local", "ratio_precio", "plataforma"]
+NUMERIC = ["precio", "precio_local", "ratio_precio"]
+CATEGORICAL = ["plataforma"]
 
-    # ====================== VARIABLES ======================
-    features = ["precio", "precio_local", "ratio_precio", "plataforma"]
-    X = df[features]
-    y = df["dumping_flag"]
-
-    # División entrenamiento / prueba
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.25, random_state=42
-    )
-
-    # Preprocesamiento
-    numeric = ["precio", "precio_local", "ratio_precio"]
-    categorical = ["plataforma"]
-
-    preproc = ColumnTransformer([
-        ("num", StandardScaler(), numeric),
-        ("cat", OneHotEncoder(handle_unknown="ignore"), categorical)
+
+def guardar_modelo(model, path):
+    """Escritura atómica: ml.predict recarga el artefacto en cuanto cambia."""
+    tmp = path + ".tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, path)
+
+
+def crear_preprocesador():
+    return ColumnTransformer([
+        ("num", StandardScaler(), NUMERIC),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL)
     ])
 
-    results = []
 
-    # ====================== 1. REGRESIÓN LOGÍSTICA ======================
-    try:
-        model_lr = Pipeline([
-            ("prep", preproc),
-            ("clf", LogisticRegression(max_iter=1000))
-        ])
-        model_lr.fit(X_train, y_train)
-        y_pred_lr = model_lr.predict(X_test)
-        auc_lr = roc_auc_score(y_test, model_lr.predict_proba(X_test)[:, 1])
-        results.append(["Regresión Logística", auc_lr])
-        joblib.dump(model_lr, "ml/model_logistica.pkl")
-        print("\n📊 Regresión Logística:\n", classification_report(y_test, y_pred_lr))
-        print("AUC:", round(auc_lr, 3))
-    except Exception as e:
-        print(f"⚠️ Error en Regresión Logística: {e}")
-        results.append(["Regresión Logística (error)", None])
+# Nombre -> (etiqueta en model_results.csv, emoji, artefacto, constructor(n_jobs, ajustados))
+# `ajustados` son los mejores parámetros de ml/tuning.py (TUNED_PARAMS) y
+# pisan a los valores por defecto; n_jobs siempre lo decide el entrenamiento.
+MODELOS = {
+    "logistica": ("Regresión Logística", "📊", "model_logistica.pkl",
+                  lambda n_jobs, ajustados: LogisticRegression(**{"max_iter": 1000, **ajustados})),
+    "randomforest": ("Random Forest", "🌲", "model_randomforest.pkl",
+                     lambda n_jobs, ajustados: RandomForestClassifier(**{
+                         "n_estimators": 200, "max_depth": 6, "random_state": 42, "class_weight": "balanced",
+                         **ajustados, "n_jobs": n_jobs})),
+    "xgboost": ("XGBoost", "⚡", "model_xgboost.pkl",
+                lambda n_jobs, ajustados: xgb.XGBClassifier(**{
+                    "n_estimators": 300, "learning_rate": 0.1, "max_depth": 5,
+                    "subsample": 0.8, "colsample_bytree": 0.8,
+                    "eval_metric": "logloss", **ajustados, "n_jobs": n_jobs})),
+    "isolation": ("Isolation Forest (no supervisado)", "🧩", "model_isolation.pkl",
+                  lambda n_jobs, ajustados: IsolationForest(**{
+                      "contamination": 0.05, "random_state": 42, **ajustados, "n_jobs": n_jobs})),
+}
 
-    # ====================== 2. RANDOM FOREST ======================
-    try:
-        model_rf = Pipeline([
-            ("prep", preproc),
-            ("clf", RandomForestClassifier(
-                n_estimators=200, max_depth=6, random_state=42, class_weight="balanced"))
-        ])
-        model_rf.fit(X_train, y_train)
-        y_pred_rf = model_rf.predict(X_test)
-        auc_rf = roc_auc_score(y_test, model_rf.predict_proba(X_test)[:, 1])
-        results.append(["Random Forest", auc_rf])
-        joblib.dump(model_rf, "ml/model_randomforest.pkl")
-        print("\n🌲 Random Forest:\n", classification_report(y_test, y_pred_rf))
-        print("AUC:", round(auc_rf, 3))
-    except Exception as e:
-        print(f"⚠️ Error en Random Forest: {e}")
-        results.append(["Random Forest (error)", None])
+TUNED_PARAMS = "tuned_params.json"
 
-    # ====================== 3. XGBOOST ======================
-    try:
-        model_xgb = Pipeline([
-            ("prep", preproc),
-            ("clf", xgb.XGBClassifier(
-                n_estimators=300, learning_rate=0.1, max_depth=5,
-                subsample=0.8, colsample_bytree=0.8,
-                eval_metric="logloss"))
-        ])
-        model_xgb.fit(X_train, y_train)
-        y_pred_xgb = model_xgb.predict(X_test)
-        auc_xgb = roc_auc_score(y_test, model_xgb.predict_proba(X_test)[:, 1])
-        results.append(["XGBoost", auc_xgb])
-        joblib.dump(model_xgb, "ml/model_xgboost.pkl")
-        print("\n⚡ XGBoost:\n", classification_report(y_test, y_pred_xgb))
-        print("AUC:", round(auc_xgb, 3))
-    except Exception as e:
-        print(f"⚠️ Error en XGBoost: {e}")
-        results.append(["XGBoost (error)", None])
 
-    # ====================== 4. ISOLATION FOREST ======================
+def parametros_ajustados(model_dir="ml") -> dict:
+    """Nombre -> mejores parámetros promovidos por ml/tuning.py ({} si no hay búsqueda)."""
     try:
-        iso = IsolationForest(contamination=0.05, random_state=42)
-        iso.fit(df[numeric])  # ✅ aplicar sobre todo el dataset
-        df["anomalia"] = iso.predict(df[numeric])
-        joblib.dump(iso, "ml/model_isolation.pkl")
-        results.append(["Isolation Forest (no supervisado)", None])
-        print("\n🧩 Isolation Forest entrenado (sin etiquetas supervisadas).")
-    except Exception as e:
-        print(f"⚠️ Error en IsolationForest: {e}")
-        results.append(["Isolation Forest (error)", None])
+        with open(os.path.join(model_dir, TUNED_PARAMS), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def guardar_parametros(nombre, params, model_dir="ml"):
+    """Registra los parámetros de `nombre` conservando los de los demás modelos."""
+    todos = parametros_ajustados(model_dir)
+    todos[nombre] = params
+    path = os.path.join(model_dir, TUNED_PARAMS)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(todos, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def dividir(df):
+    """Partición entrenamiento / prueba común a training y tuning."""
+    return train_test_split(df[FEATURES], df["dumping_flag"], test_size=0.25, random_state=42)
+
+
+def reparto_nucleos(nucleos: int, n_modelos: int):
+    """(procesos, hilos por modelo) sin pasar de `nucleos` en total."""
+    procesos = max(1, min(nucleos, n_modelos))
+    return procesos, max(1, nucleos // procesos)
+
+
+def _entrenar(nombre, n_jobs, ajustados, X_train, y_train, X_test, y_test, X_todo):
+    """Ajusta un modelo sobre datos ya transformados; se ejecuta en un proceso del pool."""
+    t0 = time.perf_counter()
+    modelo = MODELOS[nombre][3](n_jobs, ajustados)
+    if nombre == "isolation":
+        # No supervisado: columnas numéricas sin escalar de todo el dataset
+        modelo.fit(X_todo)
+        return modelo, None, None, time.perf_counter() - t0
+    modelo.fit(X_train, y_train)
+    auc = roc_auc_score(y_test, modelo.predict_proba(X_test)[:, 1])
+    reporte = classification_report(y_test, modelo.predict(X_test))
+    return modelo, auc, reporte, time.perf_counter() - t0
+
+
+def train_all_models(df=None, nucleos=None, model_dir="ml"):
+    if df is None:
+        df = load_and_clean_data()
+    nucleos = nucleos or Config.TRAIN_CORES or os.cpu_count() or 1
+
+    # ====================== VARIABLES ======================
+    X_train, X_test, y_train, y_test = dividir(df)
+
+    # Preprocesamiento: se ajusta y transforma una sola vez para todos los modelos
+    preproc = crear_preprocesador().fit(X_train)
+    Xt_train, Xt_test = preproc.transform(X_train), preproc.transform(X_test)
+    datos = (Xt_train, y_train.to_numpy(), Xt_test, y_test.to_numpy(), df[NUMERIC])
+    ajustados = parametros_ajustados(model_dir)
+    if ajustados:
+        print(f"🔧 Parámetros de {os.path.join(model_dir, TUNED_PARAMS)} para: {', '.join(sorted(ajustados))}")
+
+    procesos, hilos = reparto_nucleos(nucleos, len(MODELOS))
+    print(f"🧵 Entrenando {len(MODELOS)} modelos: {procesos} procesos x {hilos} hilos ({nucleos} núcleos)")
+
+    if procesos > 1:
+        # spawn: los hilos de OpenMP de XGBoost no sobreviven bien a un fork
+        with ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futuros = {nombre: pool.submit(_entrenar, nombre, hilos, ajustados.get(nombre, {}), *datos) for nombre in MODELOS}
+            salidas = {}
+            for nombre, futuro in futuros.items():
+                try:
+                    salidas[nombre] = futuro.result()
+                except Exception as e:
+                    salidas[nombre] = e
+    else:
+        salidas = {}
+        for nombre in MODELOS:
+            try:
+                salidas[nombre] = _entrenar(nombre, hilos, ajustados.get(nombre, {}), *datos)
+            except Exception as e:
+                salidas[nombre] = e
+
+    # ====================== GUARDAR MODELOS ======================
+    results = []
+    for nombre, (etiqueta, emoji, artefacto, _) in MODELOS.items():
+        salida = salidas[nombre]
+        if isinstance(salida, Exception):
+            print(f"⚠️ Error en {etiqueta}: {salida}")
+            results.append([f"{etiqueta.split(' (')[0]} (error)", None])
+            continue
+        modelo, auc, reporte, segundos = salida
+        if nombre != "isolation":
+            # Mismo artefacto que antes: Pipeline con el preprocesador ya ajustado
+            modelo = Pipeline([("prep", preproc), ("clf", modelo)])
+        guardar_modelo(modelo, os.path.join(model_dir, artefacto))
+        results.append([etiqueta, auc])
+        if reporte is None:
+            print(f"\n{emoji} {etiqueta} entrenado (sin etiquetas supervisadas) en {segundos:.1f}s.")
+        else:
+            print(f"\n{emoji} {etiqueta}:\n", reporte)
+            print("AUC:", round(auc, 3), f"({segundos:.1f}s)")
 
     # ====================== GUARDAR RESULTADOS ======================
     try:
         results_df = pd.DataFrame(results, columns=["Modelo", "AUC"])
-        results_df.to_csv("ml/model_results.csv", index=False)
-        print("\n✅ Resultados guardados en ml/model_results.csv")
+        results_df.to_csv(os.path.join(model_dir, "model_results.csv"), index=False)
+        print(f"\n✅ Resultados guardados en {os.path.join(model_dir, 'model_results.csv')}")
         print(results_df)
     except Exception as e:
         print(f"❌ Error al guardar resultados: {e}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrena y guarda los modelos de ml/")
+    parser.add_argument("--nucleos", type=int, default=None,
+                        help="núcleos en total (por defecto TRAIN_CORES o todos)")
+    args = parser.parse_args(argv)
+    train_all_models(nucleos=args.nucleos)
+
 
 if __name__ == "__main__":
-    train_all_models()
+    main()
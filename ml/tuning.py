@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Búsqueda de hiperparámetros por successive halving para RandomForest y XGBoost.
+
+Cada ronda evalúa muchas configuraciones con pocos árboles (el recurso es
+``n_estimators``), con validación cruzada estratificada en paralelo, y solo
+el tercio mejor pasa a la siguiente ronda con el triple de árboles: las
+configuraciones malas se abandonan pronto. Como RandomForest y XGBoost no
+dependen del escalado, el preprocesador se ajusta una vez y la búsqueda
+trabaja sobre la matriz ya transformada.
+
+Todas las pruebas (ronda, árboles, parámetros, AUC de CV y segundos) se
+registran en el log y en ``ml/tuning_results.csv``. El ganador de cada modelo
+se evalúa en la misma partición de prueba que ``ml/training.py`` y sustituye
+al artefacto que sirve ``ml/predict.py`` solo si no empeora su AUC; en ese
+caso sus parámetros se guardan en ``ml/tuned_params.json`` y los siguientes
+``ml.training`` (y consolidaciones de ``ml.incremental``) parten de ellos.
+
+Uso:  python -m ml.tuning [--modelos xgboost] [--candidatos 48] [--nucleos 8] [--no-promover]
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy.stats import loguniform, randint, uniform
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import HalvingRandomSearchCV, StratifiedKFold
+from sklearn.pipeline import Pipeline
+import xgboost as xgb
+
+from config import Config
+from ml.preprocessing import load_and_clean_data
+from ml.training import MODELOS, crear_preprocesador, dividir, guardar_modelo, guardar_parametros
+
+# Nombre -> (estimador base, espacio de búsqueda, árboles mínimos, árboles máximos)
+ESPACIOS = {
+    "randomforest": (
+        lambda: RandomForestClassifier(random_state=42, n_jobs=1),
+        {
+            "max_depth": [4, 6, 8, 12, None],
+            "min_samples_leaf": randint(1, 10),
+            "max_features": ["sqrt", 0.5, None],
+            "class_weight": [None, "balanced"],
+        },
+        25, 400,
+    ),
+    "xgboost": (
+        lambda: xgb.XGBClassifier(eval_metric="logloss", n_jobs=1, random_state=42),
+        {
+            "max_depth": randint(2, 9),
+            "learning_rate": loguniform(0.01, 0.3),
+            "subsample": uniform(0.6, 0.4),
+            "colsample_bytree": uniform(0.6, 0.4),
+            "min_child_weight": loguniform(0.5, 10),
+            "reg_lambda": loguniform(0.1, 10),
+        },
+        25, 600,
+    ),
+}
+
+
+def buscar(nombre, X, y, candidatos=48, cv=3, nucleos=1, max_arboles=None, semilla=42):
+    """Ejecuta la búsqueda de un modelo; devuelve el HalvingRandomSearchCV ajustado."""
+    base, espacio, min_arboles, tope = ESPACIOS[nombre]
+    busqueda = HalvingRandomSearchCV(
+        base(), espacio,
+        n_candidates=candidatos,
+        resource="n_estimators", min_resources=min_arboles, max_resources=max_arboles or tope,
+        factor=3, scoring="roc_auc",
+        cv=StratifiedKFold(cv, shuffle=True, random_state=semilla),
+        n_jobs=nucleos, random_state=semilla, refit=True,
+    )
+    return busqueda.fit(X, y)
+
+
+def pruebas(nombre, busqueda) -> pd.DataFrame:
+    """Una fila por configuración evaluada en cada ronda."""
+    res = busqueda.cv_results_
+    n_splits = busqueda.n_splits_
+    return pd.DataFrame({
+        "modelo": nombre,
+        "ronda": res["iter"],
+        "n_estimators": res["n_resources"],
+        "params": [json.dumps(p, sort_keys=True, default=str) for p in res["params"]],
+        "auc_cv": np.round(res["mean_test_score"], 5),
+        "auc_cv_std": np.round(res["std_test_score"], 5),
+        # Tiempo de cómputo de todas las particiones de la prueba
+        "segundos": np.round((res["mean_fit_time"] + res["mean_score_time"]) * n_splits, 3),
+    })
+
+
+def _nativos(params: dict) -> dict:
+    """Parámetros serializables en JSON (los muestreos de scipy dan escalares numpy)."""
+    return {k: v.item() if isinstance(v, np.generic) else v for k, v in params.items()}
+
+
+def _auc_actual(path, X_test, y_test):
+    try:
+        return roc_auc_score(y_test, joblib.load(path).predict_proba(X_test)[:, 1])
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logging.warning("No se pudo evaluar el artefacto actual %s", path, exc_info=True)
+        return None
+
+
+def tune(df=None, modelos=("randomforest", "xgboost"), candidatos=48, cv=3, nucleos=None,
+         max_arboles=None, promover=True, model_dir="ml"):
+    if df is None:
+        df = load_and_clean_data()
+    nucleos = nucleos or Config.TRAIN_CORES or os.cpu_count() or 1
+
+    X_train, X_test, y_train, y_test = dividir(df)
+    preproc = crear_preprocesador().fit(X_train)
+    Xt_train, Xt_test = preproc.transform(X_train), preproc.transform(X_test)
+
+    resumen, tablas = {}, []
+    for nombre in modelos:
+        t0 = time.perf_counter()
+        busqueda = buscar(nombre, Xt_train, y_train.to_numpy(), candidatos=candidatos, cv=cv,
+                          nucleos=nucleos, max_arboles=max_arboles)
+        tabla = pruebas(nombre, busqueda)
+        for fila in tabla.itertuples(index=False):
+            logging.info("[%s] ronda %s, %s árboles, AUC CV %.4f ± %.4f, %.2fs: %s", nombre, fila.ronda,
+                         fila.n_estimators, fila.auc_cv, fila.auc_cv_std, fila.segundos, fila.params)
+        tablas.append(tabla)
+
+        auc_nuevo = roc_auc_score(y_test, busqueda.best_estimator_.predict_proba(Xt_test)[:, 1])
+        path = os.path.join(model_dir, MODELOS[nombre][2])
+        auc_actual = _auc_actual(path, X_test, y_test)
+        promovido = promover and (auc_actual is None or auc_nuevo >= auc_actual)
+        if promovido:
+            guardar_modelo(Pipeline([("prep", preproc), ("clf", busqueda.best_estimator_)]), path)
+            guardar_parametros(nombre, _nativos(busqueda.best_params_), model_dir)
+        resumen[nombre] = {
+            "mejores_params": _nativos(busqueda.best_params_),
+            "auc_cv": round(float(busqueda.best_score_), 5),
+            "auc_prueba": round(float(auc_nuevo), 5),
+            "auc_prueba_actual": None if auc_actual is None else round(float(auc_actual), 5),
+            "pruebas": len(tabla),
+            "segundos": round(time.perf_counter() - t0, 2),
+            "promovido": promovido,
+        }
+        print(f"🔎 {MODELOS[nombre][0]}: AUC prueba {auc_nuevo:.4f} (actual {auc_actual}) "
+              f"-> {'promovido a ' + path if promovido else 'se mantiene el artefacto actual'}")
+
+    pd.concat(tablas, ignore_index=True).to_csv(os.path.join(model_dir, "tuning_results.csv"), index=False)
+    return resumen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Búsqueda de hiperparámetros por successive halving")
+    parser.add_argument("--modelos", nargs="+", choices=sorted(ESPACIOS), default=["randomforest", "xgboost"])
+    parser.add_argument("--candidatos", type=int, default=48, help="configuraciones en la primera ronda")
+    parser.add_argument("--cv", type=int, default=3, help="particiones de validación cruzada")
+    parser.add_argument("--nucleos", type=int, default=None, help="por defecto TRAIN_CORES o todos")
+    parser.add_argument("--no-promover", action="store_true", help="no sustituir los artefactos servidos")
+    args = parser.parse_args(argv)
+    resumen = tune(modelos=args.modelos, candidatos=args.candidatos, cv=args.cv,
+                   nucleos=args.nucleos, promover=not args.no_promover)
+    print(json.dumps(resumen, indent=2, ensure_ascii=False, default=str))
+
+
+if __name__ == "__main__":
+    main()
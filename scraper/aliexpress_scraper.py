@@ -3,112 +3,54 @@ import logging
 import re
 import time
 from datetime import datetime
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional
 from urllib.parse import urlencode, quote_plus, urlparse
 
-from bs4 import BeautifulSoup
-from selenium.common.exceptions import (
-    TimeoutException,
-    NoSuchElementException,
-    StaleElementReferenceException,
-)
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+from . import normalization
 from .base import BaseScraper
-
-BLOCK_PATTERNS = (
-    "punish",
-    "unusual traffic",
-    "error:gvs",
-    "robot check",
-    "are you a robot",
-    "are you human",
-    "please verify you are a human",
-    "verify you are human",
-    "security verification",
-    "complete the captcha",
-    "captcha verification",
-    "please complete the captcha",
-)
-
-_RANGE_SPLIT_PATTERN = re.compile(r"(?<=\d)\s*[-–—]\s*(?=\d)")
+from .extraction import PIEZAS, Campo, Spec, attr
 
 def limpiar_precio(texto: Optional[str]) -> Optional[float]:
-    def _normalizar(texto_unitario: str) -> Optional[float]:
-        cleaned = re.sub(r"[^0-9.,]", "", texto_unitario)
-        if not cleaned:
-            return None
-        decimal_sep: Optional[str] = None
-        has_dot = "." in cleaned
-        has_comma = "," in cleaned
-        if has_dot and has_comma:
-            decimal_sep = "," if cleaned.rfind(",") > cleaned.rfind(".") else "."
-        elif has_dot:
-            head, _, tail = cleaned.rpartition(".")
-            if len(tail) in (1, 2):
-                decimal_sep = "."
-        elif has_comma:
-            head, _, tail = cleaned.rpartition(",")
-            if len(tail) in (1, 2):
-                decimal_sep = ","
-        if decimal_sep:
-            int_part, dec_part = cleaned.rsplit(decimal_sep, 1)
-            int_digits = re.sub(r"[^0-9]", "", int_part)
-            dec_digits = re.sub(r"[^0-9]", "", dec_part)
-            if not int_digits and not dec_digits:
-                return None
-            number_str = f"{int_digits}.{dec_digits or '0'}"
-        else:
-            number_str = re.sub(r"[^0-9]", "", cleaned)
-            if not number_str:
-                return None
-        try:
-            return float(number_str)
-        except ValueError:
-            return None
-
-    if texto is None:
-        return None
-    texto = texto.strip()
-    if not texto:
-        return None
-    if _RANGE_SPLIT_PATTERN.search(texto):
-        candidatos = []
-        partes = [p.strip() for p in _RANGE_SPLIT_PATTERN.split(texto) if p.strip()]
-        for parte in partes:
-            valor = _normalizar(parte)
-            if valor is not None:
-                candidatos.append((valor, parte))
-        if candidatos:
-            texto = min(candidatos, key=lambda item: item[0])[1]
-        elif partes:
-            texto = partes[0]
-    return _normalizar(texto)
+    return normalization.limpiar_precio(texto, "aliexpress")
 
 def limpiar_cantidad(texto: Optional[str]) -> int:
-    if texto is None:
-        return 0
-    texto_normalizado = texto.strip().lower()
-    if not texto_normalizado:
-        return 0
-    texto_normalizado = texto_normalizado.replace("+", "")
-    multiplicador = 1
-    if re.search(r"k\b", texto_normalizado):
-        multiplicador = 1000
-        texto_normalizado = re.sub(r"k\b", "", texto_normalizado)
-    if "mil" in texto_normalizado:
-        multiplicador = max(multiplicador, 1000)
-        texto_normalizado = texto_normalizado.replace("mil", "")
-    numero = limpiar_precio(texto_normalizado)
-    if numero is None:
-        numero = 0.0
-    return int(round(numero * multiplicador))
+    return normalization.limpiar_cantidad(texto, "aliexpress")
+
+_VENTAS_EN_TEXTO = re.compile(r"([\d\.\,]+)\s*(?:vendidos?|sold)", re.IGNORECASE)
+
+
+def _abs_link(link: Optional[str]) -> str:
+    link = link or ""
+    return "https:" + link if link.startswith("//") else link
+
+
+def _finalizar_card(d: Dict) -> Dict:
+    """Título con fallbacks (title / texto del enlace) y ventas desde el texto de la card."""
+    titulo = d["titulo"] or d["_a_title"]
+    if not titulo:
+        inner = d["_a_texto"] or ""
+        titulo = inner if 0 < len(inner) <= 140 else "Sin título"
+    d["titulo"] = titulo
+
+    ventas_txt = d["ventas"]
+    if not ventas_txt:
+        m = _VENTAS_EN_TEXTO.search(d["_texto"] or "")
+        ventas_txt = m.group(1) if m else ""
+    d["ventas"] = limpiar_cantidad(ventas_txt.replace("+", ""))
+    return d
 
 class AliExpressScraper(BaseScraper):
     """Scraper AliExpress con selectores robustos y fallback móvil."""
 
+    PLATAFORMA = "aliexpress"
+    BASE_URL = "https://es.aliexpress.com"
+    MOBILE_BASE_URL = "https://m.aliexpress.com"
+
     # Contenedores de cards (desktop)
     CARD_CONTAINERS: List[str] = [
         "div.search-item-card-wrapper-gallery",
@@ -191,15 +133,24 @@ class AliExpressScraper(BaseScraper):
         ".product-info-sold",
     ]
 
-    # Contenedores que debemos “unir” spans para construir el número/precio
-    PRICE_CONTAINER_CLASSES: Set[str] = {
-        "kt_lg",  
-        "ks_kn",
-        "ks_le",
-        "ks_cv",
-        "ks_kw",
-        "ks_kv",
-    }
+    # Spec declarativo de la card (ver scraper.extraction)
+    SPEC = Spec(
+        "aliexpress",
+        CARD_CONTAINERS,
+        [
+            Campo("titulo", TITLE),
+            Campo("_a_title", attr(A_CARD, "title") + ["@title"]),
+            Campo("_a_texto", A_CARD + [""]),
+            Campo("precio", ["[data-price]@data-price"] + PRICE, tipo=PIEZAS, post=limpiar_precio),
+            Campo("precio_original", ["[data-original-price]@data-original-price"] + PRICE_ORIGINAL,
+                  tipo=PIEZAS, post=limpiar_precio),
+            Campo("descuento", ["[data-discount]@data-discount"] + DISCOUNT),
+            Campo("ventas", ["[data-sold]@data-sold"] + SOLD),
+            Campo("link", attr(A_CARD, "href") + ["@href"], post=_abs_link),
+            Campo("_texto", [""]),
+        ],
+        finalizar=_finalizar_card,
+    )
 
     # ----------------- utilidades privadas -----------------
 
@@ -239,16 +190,6 @@ class AliExpressScraper(BaseScraper):
             except Exception:
                 break
 
-    def _first_match(self, root, selectors: List[str]):
-        for css in selectors:
-            try:
-                el = root.find_element(By.CSS_SELECTOR, css)
-                if el:
-                    return el
-            except Exception:
-                continue
-        return None
-
     def _find_all_any(self, selectors: List[str], timeout: int = 10) -> List:
         for css in selectors:
             try:
@@ -262,154 +203,6 @@ class AliExpressScraper(BaseScraper):
                 continue
         return []
 
-    @staticmethod
-    def _to_float(text: Optional[str]) -> Optional[float]:
-        return limpiar_precio(text)
-
-    @staticmethod
-    def _to_int(text: Optional[str]) -> int:
-        return limpiar_cantidad(text)
-
-    @classmethod
-    def _resolve_price_text(cls, node, data_attribute: Optional[str] = None) -> Optional[str]:
-        if node is None:
-            return None
-
-        get_attribute = getattr(node, "get_attribute", None)
-        if callable(get_attribute):
-            if data_attribute:
-                value = get_attribute(data_attribute)
-                if value:
-                    return value.strip()
-
-            class_attr = get_attribute("class") or ""
-            classes = class_attr.split()
-            if any(class_name in cls.PRICE_CONTAINER_CLASSES for class_name in classes):
-                try:
-                    spans = node.find_elements(By.CSS_SELECTOR, "span")
-                    fragments = [
-                        (span.text or "").strip()
-                        for span in spans
-                        if (span.text or "").strip()
-                    ]
-                    if fragments:
-                        return "".join(fragments)
-                except Exception:
-                    pass
-
-            inner = get_attribute("innerText")
-            if inner:
-                return inner.strip()
-
-            text_content = getattr(node, "text", "")
-            return text_content.strip() or None
-
-        if data_attribute:
-            value = node.get(data_attribute)
-            if value:
-                return value.strip()
-
-        classes = node.get("class", [])
-        if isinstance(classes, str):
-            classes = classes.split()
-        if any(cls_name in cls.PRICE_CONTAINER_CLASSES for cls_name in classes):
-            spans = node.select("span")
-            fragments = [
-                span.get_text(strip=True)
-                for span in spans
-                if span.get_text(strip=True)
-            ]
-            if fragments:
-                return "".join(fragments)
-
-        text_content = node.get_text(" ", strip=True)
-        return text_content or None
-
-    def _extract_card(self, card) -> Optional[Dict]:
-        try:
-            a = self._first_match(card, self.A_CARD) or card
-            link = a.get_attribute("href") or ""
-            if link.startswith("//"):
-                link = "https:" + link
-
-            # ---------- TÍTULO preciso ----------
-            titulo_el = self._first_match(card, self.TITLE)
-            if titulo_el:
-                titulo = (titulo_el.get_attribute("innerText") or titulo_el.text or "").strip()
-            else:
-                titulo = (a.get_attribute("title") or "").strip()
-            if not titulo:
-                inner = (a.get_attribute("innerText") or "").strip()
-                titulo = inner if 0 < len(inner) <= 140 else "Sin título"
-
-            # ---------- PRECIO(S) / DESCUENTO ----------
-            price_el = self._first_match(card, self.PRICE)
-            price_text = self._resolve_price_text(price_el, "data-price")
-            precio = self._to_float(price_text)
-
-            pori_el = self._first_match(card, self.PRICE_ORIGINAL)
-            pori_text = self._resolve_price_text(pori_el, "data-original-price")
-            precio_original = self._to_float(pori_text)
-
-            desc_el = self._first_match(card, self.DISCOUNT)
-            descuento = None
-            if desc_el:
-                descuento = (desc_el.get_attribute("data-discount") or desc_el.text or "").strip() or None
-
-            # ---------- VENTAS ----------
-            sold_el = self._first_match(card, self.SOLD)
-            if sold_el:
-                ventas_txt = (sold_el.get_attribute("data-sold") or sold_el.text or "").strip()
-            else:
-                txt = card.text
-                m = re.search(r"([\d\.\,]+)\s*(?:vendidos?|sold)", txt, re.IGNORECASE)
-                ventas_txt = m.group(1) if m else ""
-            ventas = self._to_int((ventas_txt or "").replace("+", ""))
-
-            return {
-                "titulo": titulo,
-                "precio": precio,
-                "precio_original": precio_original,
-                "descuento": descuento,
-                "ventas": ventas,
-                "link": link,
-            }
-        except (NoSuchElementException, StaleElementReferenceException):
-            return None
-        except Exception as e:
-            logging.error("Error extrayendo card: %s", e)
-            return None
-
-    @staticmethod
-    def _is_blocked(driver) -> bool:
-        url = getattr(driver, "current_url", "") or ""
-        if isinstance(url, bytes):
-            url = url.decode("utf-8", "ignore")
-        url = url.lower()
-        if any(p in url for p in BLOCK_PATTERNS):
-            return True
-
-        html = getattr(driver, "page_source", "") or ""
-        if isinstance(html, bytes):
-            html = html.decode("utf-8", "ignore")
-
-        text_content = ""
-        try:
-            soup = BeautifulSoup(html, "html.parser")
-            for meta in soup.find_all("meta", attrs={"name": re.compile(r"^robots$", re.IGNORECASE)}):
-                meta.decompose()
-            text_content = soup.get_text(separator=" ", strip=True).lower()
-        except Exception:
-            cleaned_html = re.sub(r"<meta[^>]+name=['\"]robots['\"][^>]*>", " ", html, flags=re.IGNORECASE)
-            text_content = cleaned_html.lower()
-
-        if any(p in text_content for p in BLOCK_PATTERNS):
-            return True
-
-        verification_markers = ("g-recaptcha", "h-captcha", "cf-chl-captcha")
-        lowered_html = html.lower()
-        return any(marker in lowered_html for marker in verification_markers)
-
     @staticmethod
     def _apply_mobile_ua(driver):
         mobile_ua = (
@@ -425,12 +218,55 @@ class AliExpressScraper(BaseScraper):
         except Exception:
             pass
 
-    def parse(self, producto: str, paginas: int = 4):
+    def _extract_from_html(self, page_source: str, page: int = 1, containers: Optional[List[str]] = None) -> List[Dict]:
+        """Fallback sin driver: extrae las cards del HTML con el spec (lxml)."""
+        fecha = datetime.now().strftime("%Y-%m-%d")
+        resultados = self._extract_html(page_source, containers or self.CARD_CONTAINERS)
+        for data in resultados:
+            data.update({"pagina": page, "plataforma": "AliExpress", "fecha_scraping": fecha})
+        return resultados
+
+    def _extract_por_elementos(self, containers: List[str], page: int):
+        """Ruta Selenium (sin extractor JS): localiza las cards y extrae una a una."""
+        bloques = self._find_all_any(containers, timeout=12)
+        if not bloques:
+            self._human_scroll_until_growth(max_scrolls=4, pause=0.8)
+            bloques = self._find_all_any(containers, timeout=6)
+
+        nuevos_bloques = self._find_all_any(containers, timeout=4)
+        if nuevos_bloques:
+            if bloques:
+                for bloque in nuevos_bloques:
+                    if bloque not in bloques:
+                        bloques.append(bloque)
+            else:
+                bloques = nuevos_bloques
+        logging.info("Página %s: %s productos (candidatos)", page, len(bloques))
+        return (self._extract_card(card) for card in bloques)
+
+    def search_url(self, producto: str, page: int = 1) -> str:
+        return f"{self._search_base()}/wholesale?SearchText={quote_plus(producto)}&page={page}"
+
+    def parse(
+        self,
+        producto: str,
+        paginas: int = 4,
+        base_url: Optional[str] = None,
+        max_productos: Optional[int] = None,
+        min_nuevos: Optional[float] = None,
+    ):
+        if base_url:
+            self.base_url = base_url
+        paginacion = self._start_pagination(max_productos, min_nuevos)
+        base = self._search_base()
+        # Con un stand-in/base propia la versión móvil cuelga de "<base>/m"
+        m_base = self.MOBILE_BASE_URL if base == self.BASE_URL else base + "/m"
         try:
             resultados: List[Dict] = []
             for page in range(1, paginas + 1):
-                q = quote_plus(producto)
-                url = f"https://es.aliexpress.com/wholesale?SearchText={q}&page={page}"
+                if self._circuit_open():
+                    break
+                url = self.search_url(producto, page)
                 logging.info("Cargando AliExpress: Página %s -> %s", page, url)
                 self.driver.get(url)
                 try:
@@ -439,39 +275,37 @@ class AliExpressScraper(BaseScraper):
                 except Exception:
                     pass
 
+                bloqueada = False
                 if self._is_blocked(self.driver):
                     logging.warning("Bloqueo detectado en desktop. Cambiando a versión móvil...")
                     self._apply_mobile_ua(self.driver)
-                    m_url = "https://m.aliexpress.com/search.htm?" + urlencode(
+                    m_url = f"{m_base}/search.htm?" + urlencode(
                         {"keywords": producto, "page": page}, quote_via=quote_plus
                     )
                     self.driver.get(m_url)
                     time.sleep(2)
+                    bloqueada = self._is_blocked(self.driver)
+                    if bloqueada:
+                        self._report_block()
+                    else:
+                        self._report_page_ok()
+                else:
+                    self._report_page_ok()
 
                 current_url = getattr(self.driver, "current_url", "") or ""
                 parsed_url = urlparse(current_url)
                 host = (parsed_url.netloc or "").lower()
                 containers = self.MOBILE_CARD_CONTAINERS if host.startswith(("m.", "h5.")) else self.CARD_CONTAINERS
 
-                bloques = self._find_all_any(containers, timeout=12)
-                if not bloques:
-                    self._human_scroll_until_growth(max_scrolls=4, pause=0.8)
-                    bloques = self._find_all_any(containers, timeout=6)
-
                 self._human_scroll_until_growth(max_scrolls=10, pause=1.0)
-                nuevos_bloques = self._find_all_any(containers, timeout=4)
-                if nuevos_bloques:
-                    if bloques:
-                        for bloque in nuevos_bloques:
-                            if bloque not in bloques:
-                                bloques.append(bloque)
-                    else:
-                        bloques = nuevos_bloques
-                logging.info("Página %s: %s productos (candidatos)", page, len(bloques))
+                # Ruta rápida: todas las cards en un solo execute_script
+                fichas = self._extract_in_browser(containers)
+                if not fichas:
+                    fichas = self._extract_por_elementos(containers, page)
 
+                inicio = len(resultados)
                 count_page = 0
-                for card in bloques:
-                    data = self._extract_card(card)
+                for data in fichas:
                     if not data:
                         continue
                     data.update({
@@ -484,73 +318,13 @@ class AliExpressScraper(BaseScraper):
 
                 logging.info("Página %s: %s productos válidos", page, count_page)
 
+                page_source = None
                 if count_page == 0:
                     page_source = getattr(self.driver, "page_source", "") or ""
-                    soup = BeautifulSoup(page_source, "html.parser")
-                    for sel in containers:
-                        bs_cards = soup.select(sel)
-                        if not bs_cards:
-                            continue
-                        for bloque in bs_cards:
-                            try:
-                                a = bloque.select_one("a[href]")
-                                link = (a.get("href", "") if a else "") or ""
-                                if link.startswith("//"):
-                                    link = "https:" + link
-
-                                # Título (BS4)
-                                titulo_tag = None
-                                for tsel in self.TITLE:
-                                    titulo_tag = bloque.select_one(tsel)
-                                    if titulo_tag:
-                                        break
-                                if titulo_tag:
-                                    titulo = (titulo_tag.get_text(" ", strip=True) or "").strip()
-                                else:
-                                    titulo = (a.get("title") if a else "") or ""
-                                if not titulo:
-                                    inner = (a.get_text(" ", strip=True) if a else "") or ""
-                                    titulo = inner if 0 < len(inner) <= 140 else "Sin título"
-
-                                # Precios / descuento
-                                price_tag = bloque.select_one(", ".join(self.PRICE))
-                                ptxt = self._resolve_price_text(price_tag, "data-price")
-                                precio = self._to_float(ptxt)
-
-                                pori_tag = bloque.select_one(", ".join(self.PRICE_ORIGINAL))
-                                potxt = self._resolve_price_text(pori_tag, "data-original-price")
-                                precio_original = self._to_float(potxt)
-
-                                desc_tag = bloque.select_one(", ".join(self.DISCOUNT))
-                                descuento = (desc_tag.get("data-discount") if desc_tag else None) or (desc_tag.get_text(" ", strip=True) if desc_tag else None)
-
-                                # Ventas
-                                ventas_txt = ""
-                                for sold_selector in self.SOLD:
-                                    sold_tag = bloque.select_one(sold_selector)
-                                    if sold_tag:
-                                        ventas_txt = (sold_tag.get("data-sold") or sold_tag.get_text(" ", strip=True) or "").strip()
-                                        if ventas_txt:
-                                            break
-                                if not ventas_txt:
-                                    m = re.search(r"([\d\.\,]+)\s*(?:vendidos?|sold)", bloque.get_text(" ", strip=True), re.IGNORECASE)
-                                    ventas_txt = m.group(1) if m else ""
-                                ventas = self._to_int((ventas_txt or "").replace("+", ""))
-
-                                resultados.append({
-                                    "pagina": page,
-                                    "titulo": titulo,
-                                    "precio": precio,
-                                    "precio_original": precio_original,
-                                    "descuento": descuento,
-                                    "ventas": ventas,
-                                    "link": link,
-                                    "plataforma": "AliExpress",
-                                    "fecha_scraping": datetime.now().strftime("%Y-%m-%d"),
-                                })
-                            except Exception:
-                                continue
-                        break
-            return resultados
+                    resultados.extend(self._extract_from_html(page_source, page, containers))
+                self._snapshot(producto, page, resultados[inicio:], page_source)
+                if not paginacion.registrar(page, resultados[inicio:], bloqueada):
+                    break
+            return paginacion.recortar(resultados)
         finally:
-            self.close()
+            self._end_parse()
@@ -1,16 +1,58 @@
 # base.py
+import logging
 import os
 import shutil
 import tempfile
+import threading
+import time
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.common.exceptions import TimeoutException, SessionNotCreatedException
+from selenium.common.exceptions import TimeoutException, SessionNotCreatedException, WebDriverException
+
+from . import block_detection
+from .extraction import compile_spec
+from .pagination import Paginacion
+from .proxy_pool import get_proxy_pool
 
 
 class BaseScraper:
     """Common setup for Selenium-based scrapers (visible o headless)."""
 
+    # Breaker de la plataforma (lo asigna la tarea; ver scraper.circuit_breaker)
+    circuit_breaker = None
+    # Pool de proxies y proxy elegido para este driver (ver scraper.proxy_pool)
+    proxy_pool = None
+    proxy = None
+    # Almacén de snapshots HTML e id de la tarea (los asigna la tarea; ver scraper.snapshots)
+    snapshots = None
+    job_id = None
+    # Estado de la paginación adaptativa del último parse() (ver scraper.pagination)
+    paginacion = None
+    # True en los lotes (tasks.scrapear_lote): parse() no cierra el navegador
+    keep_session = False
+
+    # Clave de la plataforma y raíz real de sus URLs de búsqueda; `base_url`
+    # la sustituye (p. ej. por el stand-in local de benchmarks/marketplace_standin.py)
+    PLATAFORMA = ""
+    BASE_URL = ""
+    base_url = None
+
+    # Spec declarativo de las cards (ver scraper.extraction); lo define cada scraper
+    SPEC = None
+
+    # Resultado de cargar una página de resultados (ver _load_results_page)
+    PAGINA_OK = "ok"
+    PAGINA_VACIA = "vacia"
+    PAGINA_BLOQUEADA = "bloqueada"
+    PAGINA_FALLIDA = "fallida"
+
+    # Navegador precreado por el worker (ver warmup.py) y sincronización
+    _warm_session = None
+    _warm_lock = threading.Lock()
+    _warm_idle = threading.Event()
+    _warm_idle.set()  # set = no hay un precalentamiento en curso
+
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
         os.makedirs(self.data_dir, exist_ok=True)
@@ -18,8 +60,14 @@ class BaseScraper:
         self._tmp_profile = None
         self._temp_dir = None
 
+        if not self._adopt_warm_session():
+            self._start_driver()
+
+    def _start_driver(self):
         remote_url = os.getenv("SELENIUM_REMOTE_URL")  # ej: http://selenium:4444
-        proxy = os.getenv("PROXY_URL")
+        self.proxy_pool = get_proxy_pool()
+        proxy = self.proxy_pool.select() if self.proxy_pool else os.getenv("PROXY_URL")
+        self.proxy = proxy
         use_custom_profile = os.getenv("USE_CUSTOM_PROFILE", "").lower() in {"1", "true", "yes"}
 
         def build_options(use_profile: bool, profile_dir: str | None) -> webdriver.ChromeOptions:
@@ -107,6 +155,49 @@ class BaseScraper:
         except Exception:
             pass
 
+    # ----------------- navegador precalentado -----------------
+
+    @classmethod
+    def prewarm(cls, data_dir: str = "data"):
+        """Crea un navegador y lo deja listo para el próximo scraper del proceso."""
+        # Comprobar y reservar bajo el cerrojo: dos precalentamientos a la vez
+        # (arranque y tras una tarea) crearían dos Chrome y uno quedaría huérfano
+        with BaseScraper._warm_lock:
+            if BaseScraper._warm_session is not None or not BaseScraper._warm_idle.is_set():
+                return
+            BaseScraper._warm_idle.clear()
+        try:
+            session = BaseScraper.__new__(BaseScraper)
+            session.data_dir = data_dir
+            session._tmp_profile = None
+            session._temp_dir = None
+            session._start_driver()
+            with BaseScraper._warm_lock:
+                BaseScraper._warm_session = session
+        finally:
+            BaseScraper._warm_idle.set()
+        logging.info("Navegador precalentado listo")
+
+    def _adopt_warm_session(self, wait: float = 30.0) -> bool:
+        """Toma el navegador precalentado si existe y sigue vivo."""
+        BaseScraper._warm_idle.wait(wait)
+        with BaseScraper._warm_lock:
+            warm, BaseScraper._warm_session = BaseScraper._warm_session, None
+        if warm is None:
+            return False
+        try:
+            # El grid cierra sesiones inactivas; comprobar antes de usarla
+            warm.driver.execute_script("return 1")
+        except Exception:
+            logging.info("Navegador precalentado caducado; se crea uno nuevo")
+            warm.close()
+            return False
+        self.driver = warm.driver
+        self.proxy_pool, self.proxy = warm.proxy_pool, warm.proxy
+        self._tmp_profile, self._temp_dir = warm._tmp_profile, warm._temp_dir
+        warm.driver = warm._tmp_profile = warm._temp_dir = None
+        return True
+
     def __enter__(self):
         return self
 
@@ -133,6 +224,174 @@ class BaseScraper:
                 if current <= prev:
                     break
 
+    # ----------------- incidencias (circuit breaker / proxies) -----------------
+
+    def _report_block(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure("bloqueo")
+        if self.proxy_pool is not None and self.proxy:
+            self.proxy_pool.record_block(self.proxy)
+
+    def _report_load_failure(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure("fallo_carga")
+        if self.proxy_pool is not None and self.proxy:
+            self.proxy_pool.record_failure(self.proxy)
+
+    def _report_page_ok(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success()
+        if self.proxy_pool is not None and self.proxy:
+            self.proxy_pool.record_success(self.proxy, self._page_load_seconds())
+
+    def _page_load_seconds(self):
+        """Duración de la última navegación según la Navigation Timing API."""
+        try:
+            ms = self.driver.execute_script(
+                "var t = performance.timing;"
+                "return t.loadEventEnd > 0 ? t.loadEventEnd - t.navigationStart : null;"
+            )
+        except Exception:
+            return None
+        return ms / 1000.0 if isinstance(ms, (int, float)) and ms >= 0 else None
+
+    def _circuit_open(self) -> bool:
+        """True si el breaker se abrió a mitad de ejecución (no seguir paginando)."""
+        if self.circuit_breaker is not None and self.circuit_breaker.is_open():
+            logging.warning("Circuit breaker abierto: se omiten las páginas restantes.")
+            if self.paginacion is not None:
+                self.paginacion.motivo = "circuit_breaker"
+            return True
+        return False
+
+    @staticmethod
+    def _is_blocked(driver) -> bool:
+        return block_detection.is_blocked(driver)
+
+    def _load_results_page(self, url: str, esperar_cards, banners: int = 5, scroll=None,
+                           etiqueta: str = "") -> str:
+        """Abre `url` y espera sus cards; devuelve uno de los ``PAGINA_*``.
+
+        Solo los errores del driver (navegación, sesión) se reintentan y acaban
+        en ``PAGINA_FALLIDA``. Si la página carga pero las cards no aparecen es
+        un captcha o el final de los resultados: se decide con ``_is_blocked``
+        sin volver a pedirla.
+        """
+        for intento in range(3):
+            try:
+                self.driver.get(url)
+                self._accept_banners(banners)
+            except WebDriverException as e:
+                logging.warning("Reintento %s (%s): %s", etiqueta, intento + 1, e)
+                time.sleep(1.0)
+                continue
+            try:
+                esperar_cards()
+            except TimeoutException:
+                return self.PAGINA_BLOQUEADA if self._is_blocked(self.driver) else self.PAGINA_VACIA
+            except WebDriverException as e:
+                logging.warning("Reintento %s (%s): %s", etiqueta, intento + 1, e)
+                time.sleep(1.0)
+                continue
+            try:
+                self._human_scroll_until_growth(**(scroll or {}))
+            except WebDriverException as e:
+                logging.warning("Scroll incompleto en %s: %s", etiqueta, e)
+            return self.PAGINA_OK
+        return self.PAGINA_FALLIDA
+
+    def _page_without_cards(self, producto: str, page: int, estado: str):
+        """Registra una página sin cards (bloqueo o fin de resultados); la paginación se detiene."""
+        bloqueada = estado == self.PAGINA_BLOQUEADA
+        if bloqueada:
+            logging.warning("Bloqueo/captcha en %s (página %s).", self.PLATAFORMA, page)
+            self._report_block()
+        else:
+            logging.info("Página %s de %s sin resultados.", page, self.PLATAFORMA)
+            self._report_page_ok()
+        self._snapshot(producto, page, [])
+        if self.paginacion is not None:
+            self.paginacion.registrar(page, [], bloqueada)
+
+    def _start_pagination(self, max_productos=None, min_nuevos=None) -> Paginacion:
+        self.paginacion = Paginacion(max_productos, min_nuevos)
+        return self.paginacion
+
+    def _snapshot(self, producto: str, page: int, productos=None, page_source=None):
+        """Archiva el HTML de la página actual con los productos extraídos de ella."""
+        if self.snapshots is None:
+            return
+        try:
+            if page_source is None:
+                page_source = self.driver.page_source or ""
+            self.snapshots.save(
+                page_source,
+                plataforma=self.PLATAFORMA,
+                query=producto,
+                pagina=page,
+                job_id=self.job_id,
+                url=getattr(self.driver, "current_url", None),
+                productos=productos,
+            )
+        except Exception as e:
+            # Nunca tumbar un scrape por el archivo de snapshots
+            logging.warning("No se pudo guardar el snapshot de la página %s: %s", page, e)
+
+    def _extract_in_browser(self, cards=None):
+        """Todas las cards de la página en un solo execute_script; None si no fue posible."""
+        if self.SPEC is None or getattr(self, "driver", None) is None:
+            return None
+        return compile_spec(self.SPEC).extract_driver(self.driver, cards)
+
+    def _extract_card(self, card):
+        """Una card (WebElement) con el mismo spec, en una sola ida y vuelta."""
+        if self.SPEC is None:
+            return None
+        return compile_spec(self.SPEC).extract_element(self.driver, card)
+
+    def _extract_html(self, page_source, cards=None):
+        """Cards de un HTML (page_source o snapshot) con el extractor lxml del spec."""
+        if self.SPEC is None:
+            return []
+        return compile_spec(self.SPEC).extract_html(page_source, cards)
+
+    def search_url(self, producto: str, page: int = 1) -> str:
+        """URL de la página `page` de resultados de `producto` (la define cada scraper)."""
+        raise NotImplementedError
+
+    def _search_base(self) -> str:
+        """Raíz de las URLs de búsqueda, sin "/" final.
+
+        Prioridad: `base_url` (argumento de `parse()`), luego la variable
+        MARKETPLACE_BASE_URL + "/<plataforma>" y, por último, el sitio real.
+        """
+        if self.base_url:
+            return self.base_url.rstrip("/")
+        standin = os.getenv("MARKETPLACE_BASE_URL", "").rstrip("/")
+        if standin and self.PLATAFORMA:
+            return f"{standin}/{self.PLATAFORMA}"
+        return self.BASE_URL
+
+    def _end_parse(self):
+        """Cierre al terminar parse(), salvo que el navegador siga en uso (lotes)."""
+        if not self.keep_session:
+            self.close()
+
+    def ensure_alive(self) -> bool:
+        """Comprueba la sesión y la recrea si murió; False si no se pudo."""
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            logging.warning("Sesión del navegador perdida; se crea una nueva")
+        self.close()
+        try:
+            self._start_driver()
+            return True
+        except Exception:
+            logging.exception("No se pudo recrear el navegador")
+            return False
+
     def close(self):
         # Si estás mirando, puedes dejar la ventana abierta exportando VISUAL_MODE=1
         if os.getenv("VISUAL_MODE") == "1":
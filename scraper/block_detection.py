@@ -0,0 +1,105 @@
+# scraper/block_detection.py
+"""Detección de bloqueos/captcha sin traer ni parsear el DOM completo.
+
+Orden de comprobación:
+  1. URL actual (páginas "punish", "robot check"...).
+  2. Ruta rápida: un único ``execute_script`` devuelve ``document.title``, una
+     muestra acotada del texto visible y si existe un widget de captcha; se
+     busca con un solo patrón precompilado.
+  3. Ruta completa (``page_source`` + BeautifulSoup): solo si la rápida no es
+     concluyente (el script falla o devuelve algo inesperado).
+"""
+import re
+
+from bs4 import BeautifulSoup
+
+BLOCK_PATTERNS = (
+    "punish",
+    "unusual traffic",
+    "error:gvs",
+    "robot check",
+    "are you a robot",
+    "are you human",
+    "please verify you are a human",
+    "verify you are human",
+    "security verification",
+    "complete the captcha",
+    "captcha verification",
+    "please complete the captcha",
+)
+VERIFICATION_MARKERS = ("g-recaptcha", "h-captcha", "cf-chl-captcha")
+
+# Un solo autómata para todas las frases (en vez de un `in` por patrón)
+_BLOCK_RE = re.compile("|".join(re.escape(p) for p in BLOCK_PATTERNS))
+_MARKER_RE = re.compile("|".join(re.escape(m) for m in VERIFICATION_MARKERS))
+_META_ROBOTS_RE = re.compile(r"<meta[^>]+name=['\"]robots['\"][^>]*>", re.IGNORECASE)
+_META_ROBOTS_NAME = re.compile(r"^robots$", re.IGNORECASE)
+
+# Caracteres de texto visible que se traen del navegador (inicio y final)
+SAMPLE_CHARS = 4000
+
+_FAST_PROBE_JS = """
+var limit = arguments[0];
+var body = document.body;
+var text = body ? (body.innerText || "") : "";
+var captcha = !!document.querySelector(
+  '.g-recaptcha, .h-captcha, .cf-chl-captcha, [id^="cf-chl"], iframe[src*="captcha"]'
+);
+return {
+  title: document.title || "",
+  head: text.slice(0, limit),
+  tail: text.length > limit ? text.slice(-limit) : "",
+  captcha: captcha
+};
+"""
+
+
+def _url_blocked(driver) -> bool:
+    url = getattr(driver, "current_url", "") or ""
+    if isinstance(url, bytes):
+        url = url.decode("utf-8", "ignore")
+    return bool(_BLOCK_RE.search(url.lower()))
+
+
+def fast_probe(driver, sample_chars: int = SAMPLE_CHARS):
+    """True/False si la muestra del navegador es concluyente; None si no lo es."""
+    try:
+        data = driver.execute_script(_FAST_PROBE_JS, sample_chars)
+    except Exception:
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("head"), str):
+        return None
+    if data.get("captcha") is True:
+        return True
+    sample = " ".join(
+        str(data.get(k) or "") for k in ("title", "head", "tail")
+    ).lower()
+    return bool(_BLOCK_RE.search(sample))
+
+
+def full_dom_check(driver) -> bool:
+    """Ruta lenta: descarga el HTML y analiza todo el texto visible."""
+    html = getattr(driver, "page_source", "") or ""
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", "ignore")
+
+    try:
+        soup = BeautifulSoup(html, "html.parser")
+        for meta in soup.find_all("meta", attrs={"name": _META_ROBOTS_NAME}):
+            meta.decompose()
+        text_content = soup.get_text(separator=" ", strip=True).lower()
+    except Exception:
+        text_content = _META_ROBOTS_RE.sub(" ", html).lower()
+
+    if _BLOCK_RE.search(text_content):
+        return True
+    return bool(_MARKER_RE.search(html.lower()))
+
+
+def is_blocked(driver) -> bool:
+    if _url_blocked(driver):
+        return True
+    result = fast_probe(driver)
+    if result is not None:
+        return result
+    return full_dom_check(driver)
@@ -0,0 +1,210 @@
+# scraper/circuit_breaker.py
+"""Circuit breaker por plataforma alimentado por bloqueos y fallos de carga.
+
+Estados:
+  - closed: las tareas se ejecutan con normalidad.
+  - open: tras N incidencias consecutivas; las tareas se reprograman.
+  - half_open: vencido el enfriamiento, una única tarea (sonda) prueba la
+    plataforma; si tiene éxito se cierra, si falla se reabre con más espera.
+
+Varios workers comparten el estado: la sonda se reserva con un ``SET NX``
+(``circuit:<plataforma>:probe``, caduca a los ``probe_timeout`` segundos) y
+los contadores y transiciones se aplican con ``update_json`` del almacén
+(WATCH/MULTI en Redis), nunca con leer-modificar-guardar sueltos.
+"""
+import logging
+import time
+import uuid
+from typing import Callable, Optional
+
+from config import Config
+from .state import get_store
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        store=None,
+        threshold: int = Config.CIRCUIT_BREAKER_THRESHOLD,
+        cooldown: float = Config.CIRCUIT_BREAKER_COOLDOWN,
+        max_cooldown: float = Config.CIRCUIT_BREAKER_MAX_COOLDOWN,
+        probe_timeout: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store if store is not None else get_store()
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        # Si la sonda muere sin reportar, otra tarea puede probar pasado este tiempo
+        self.probe_timeout = probe_timeout if probe_timeout is not None else cooldown
+        self.clock = clock
+
+    # ----------------- estado -----------------
+
+    @staticmethod
+    def _key(plataforma: str) -> str:
+        return f"circuit:{plataforma}"
+
+    @staticmethod
+    def _probe_key(plataforma: str) -> str:
+        return f"circuit:{plataforma}:probe"
+
+    @staticmethod
+    def _closed() -> dict:
+        return {"state": CLOSED, "failures": 0, "opens": 0}
+
+    def _load(self, plataforma: str) -> dict:
+        try:
+            state = self.store.get_json(self._key(plataforma))
+        except Exception as e:
+            # Sin almacén el breaker no debe frenar el scraping (fail-open)
+            logging.warning("Circuit breaker sin estado para %s: %s", plataforma, e)
+            return self._closed()
+        return state or self._closed()
+
+    def _update(self, plataforma: str, fn) -> Optional[dict]:
+        """Aplica `fn` al estado de forma atómica; None si el almacén falla."""
+        try:
+            return self.store.update_json(self._key(plataforma), lambda state: fn(state or self._closed()))
+        except Exception as e:
+            logging.warning("No se pudo guardar el circuit breaker de %s: %s", plataforma, e)
+            return None
+
+    def _release_probe(self, plataforma: str):
+        try:
+            self.store.delete(self._probe_key(plataforma))
+        except Exception as e:
+            logging.warning("No se pudo liberar la sonda de %s: %s", plataforma, e)
+
+    def _open(self, state: dict) -> dict:
+        opens = state.get("opens", 0) + 1
+        espera = min(self.cooldown * 2 ** (opens - 1), self.max_cooldown)
+        return {**state, "state": OPEN, "opens": opens, "open_until": self.clock() + espera}
+
+    def _probe_due(self, state: dict, now: float) -> bool:
+        """Enfriamiento vencido (o sonda caducada): toca lanzar una sonda."""
+        if state["state"] == OPEN:
+            return now >= state.get("open_until", 0)
+        return state["state"] == HALF_OPEN and now >= state.get("probe_until", 0)
+
+    def state(self, plataforma: str) -> str:
+        return self._load(plataforma)["state"]
+
+    def is_open(self, plataforma: str) -> bool:
+        return self.state(plataforma) == OPEN
+
+    # ----------------- API para las tareas -----------------
+
+    def allow(self, plataforma: str) -> bool:
+        """Indica si una tarea puede ejecutarse ahora (y reserva la sonda si toca)."""
+        state = self._load(plataforma)
+        now = self.clock()
+        if state["state"] == CLOSED:
+            return True
+        if not self._probe_due(state, now):
+            return False
+
+        # Solo un worker gana el SET NX; el resto sigue esperando
+        reserva = {"owner": uuid.uuid4().hex, "since": now}
+        try:
+            if not self.store.set_nx(self._probe_key(plataforma), reserva, ttl=self.probe_timeout):
+                return False
+        except Exception as e:
+            logging.warning("Circuit breaker sin estado para %s: %s", plataforma, e)
+            return True
+
+        ganada = []
+
+        def a_sonda(actual):
+            # Revalidar dentro de la transacción: quizá otra sonda ya cerró o reabrió
+            del ganada[:]
+            if not self._probe_due(actual, now):
+                return actual
+            ganada.append(True)
+            return {**actual, "state": HALF_OPEN, "probe_until": now + self.probe_timeout}
+
+        if self._update(plataforma, a_sonda) is None:
+            return True
+        if not ganada:
+            try:
+                self.store.delete_if(self._probe_key(plataforma), reserva)
+            except Exception as e:
+                logging.warning("No se pudo liberar la sonda de %s: %s", plataforma, e)
+            return False
+        logging.info("Circuit breaker SEMIABIERTO para %s: lanzando sonda", plataforma)
+        return True
+
+    def retry_after(self, plataforma: str) -> float:
+        """Segundos hasta que tenga sentido volver a intentar."""
+        state = self._load(plataforma)
+        limite = state.get("open_until" if state["state"] == OPEN else "probe_until", 0)
+        return max(0.0, limite - self.clock())
+
+    def record_failure(self, plataforma: str, motivo: str = "bloqueo"):
+        transicion = {}
+
+        def fallo(actual):
+            nuevo = {**actual, "failures": actual.get("failures", 0) + 1}
+            transicion.clear()
+            if actual["state"] == HALF_OPEN or (
+                actual["state"] == CLOSED and nuevo["failures"] >= self.threshold
+            ):
+                nuevo = self._open(nuevo)
+                transicion["desde"] = actual["state"]
+            return nuevo
+
+        state = self._update(plataforma, fallo)
+        if state is None:
+            return
+        logging.info("Incidencia en %s (%s): %s consecutivas", plataforma, motivo, state["failures"])
+        if transicion:
+            logging.warning(
+                "Circuit breaker ABIERTO para %s (%s incidencias); enfriamiento %.0fs",
+                plataforma, state["failures"], state["open_until"] - self.clock(),
+            )
+            if transicion["desde"] == HALF_OPEN:
+                self._release_probe(plataforma)
+
+    def record_success(self, plataforma: str):
+        state = self._load(plataforma)
+        if state["state"] == CLOSED and not state.get("failures"):
+            return
+        if self._update(plataforma, lambda actual: self._closed()) is None:
+            return
+        if state["state"] != CLOSED:
+            logging.info("Circuit breaker CERRADO para %s", plataforma)
+            self._release_probe(plataforma)
+
+    def for_platform(self, plataforma: str) -> "PlatformBreaker":
+        return PlatformBreaker(self, plataforma)
+
+
+class PlatformBreaker:
+    """Vista del breaker ligada a una plataforma, la que recibe cada scraper."""
+
+    def __init__(self, breaker: CircuitBreaker, plataforma: str):
+        self.breaker = breaker
+        self.plataforma = plataforma
+
+    def record_failure(self, motivo: str = "bloqueo"):
+        self.breaker.record_failure(self.plataforma, motivo)
+
+    def record_success(self):
+        self.breaker.record_success(self.plataforma)
+
+    def is_open(self) -> bool:
+        return self.breaker.is_open(self.plataforma)
+
+
+_breaker: Optional[CircuitBreaker] = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        _breaker = CircuitBreaker()
+    return _breaker
@@ -0,0 +1,490 @@
+# scraper/crawl.py
+"""Barrido de categorías completas con frontera de URLs persistente.
+
+A diferencia de ``parse()`` (una búsqueda, pocas páginas), el crawl recorre
+categorías enteras (``CRAWL_CATEGORIAS``: camisa, pantalón…) página a página
+cada noche y solo escribe los productos que no se habían visto antes:
+
+  * ``Frontier``: cola de URLs en SQLite con prioridad, reintentos y cortesía
+    por host (un host no se vuelve a pedir hasta pasado ``CRAWL_DELAY``; tras
+    un bloqueo se le aplica una penalización creciente). Es reanudable: lo
+    pendiente de una ronda interrumpida o aplazada pasa a la siguiente
+    ejecución (``purgar``), aunque sea otro día.
+  * ``BloomFilter``: links de productos ya vistos, de tamaño fijo en memoria y
+    en disco aunque haya cientos de miles de productos.
+  * ``exclusivo``: cerrojo por plataforma en el almacén compartido. Frontera,
+    filtro y CSV de la ronda no admiten dos crawls a la vez de la misma
+    plataforma (p. ej. una tarea reentregada por el broker).
+  * ``Crawler``: descarga cada página con el navegador del scraper, extrae las
+    cards con su ``SPEC`` (``extract_offline``), añade los productos nuevos a
+    ``OUTPUT_DIR/crawl/<plataforma>_<ronda>.csv`` y encola la página siguiente.
+
+    python -m scraper.crawl temu --categorias camisa pantalón --max-urls 200
+    python -m scraper.crawl temu stats
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import sqlite3
+import struct
+import tempfile
+import time
+import uuid
+from contextlib import closing, contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from config import Config
+from . import block_detection
+from .offline import extract_offline
+from .pagination import clave_producto
+from .replay import COLUMNAS
+from .state import get_store
+
+_BLOOM_MAGIC = b"BLM1"
+_BLOOM_HEADER = struct.Struct(">4sQIQ")  # magic, bits, hashes, elementos
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    ronda TEXT NOT NULL,
+    url TEXT NOT NULL,
+    plataforma TEXT NOT NULL,
+    categoria TEXT,
+    pagina INTEGER,
+    host TEXT NOT NULL,
+    prioridad REAL NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    disponible REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (ronda, url)
+);
+CREATE INDEX IF NOT EXISTS frontier_cola ON frontier(ronda, estado, prioridad);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    siguiente REAL NOT NULL DEFAULT 0,
+    bloqueos INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class BloomFilter:
+    """Filtro de Bloom de tamaño fijo (falsos positivos ≈ `error`, sin falsos negativos)."""
+
+    def __init__(self, capacidad: int, error: float = 0.001, path: Optional[str] = None):
+        self.bits = max(8, math.ceil(-capacidad * math.log(error) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacidad * math.log(2)))
+        self.elementos = 0
+        self.path = path
+        self._data = bytearray((self.bits + 7) // 8)
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def _load(self, path: str):
+        with open(path, "rb") as fh:
+            cabecera = fh.read(_BLOOM_HEADER.size)
+            magic, bits, hashes, elementos = _BLOOM_HEADER.unpack(cabecera)
+            if magic != _BLOOM_MAGIC:
+                raise ValueError(f"{path} no es un filtro de Bloom")
+            # El archivo manda: cambiar la capacidad no invalida lo ya visto
+            self.bits, self.hashes, self.elementos = bits, hashes, elementos
+            self._data = bytearray(fh.read())
+
+    def _posiciones(self, item: str) -> Iterable[int]:
+        # Doble hashing (Kirsch-Mitzenmacher) sobre un solo blake2b
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._data[p >> 3] & (1 << (p & 7)) for p in self._posiciones(item))
+
+    def add(self, item: str) -> bool:
+        """Añade `item`; True si no estaba (probablemente) ya."""
+        nuevo = False
+        for p in self._posiciones(item):
+            byte, mask = p >> 3, 1 << (p & 7)
+            if not self._data[byte] & mask:
+                self._data[byte] |= mask
+                nuevo = True
+        if nuevo:
+            self.elementos += 1
+        return nuevo
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", prefix=".tmp-")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(_BLOOM_HEADER.pack(_BLOOM_MAGIC, self.bits, self.hashes, self.elementos))
+            fh.write(self._data)
+        os.replace(tmp, self.path)
+
+
+class Frontier:
+    """Cola persistente de URLs por ronda, con prioridad y cortesía por host."""
+
+    def __init__(self, path: str, delay: float = Config.CRAWL_DELAY,
+                 max_intentos: int = 3, clock=time.time):
+        self.path = path
+        self.delay = delay
+        self.max_intentos = max_intentos
+        self.clock = clock
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def push(self, ronda: str, url: str, plataforma: str, categoria: Optional[str] = None,
+             pagina: int = 1, prioridad: float = 0) -> bool:
+        """Encola `url` si no estaba ya en la ronda; True si se añadió."""
+        with closing(self._connect()) as db:
+            cur = db.execute(
+                "INSERT OR IGNORE INTO frontier (ronda, url, plataforma, categoria, pagina, host, prioridad)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ronda, url, plataforma, categoria, pagina, urlparse(url).netloc, prioridad),
+            )
+        return cur.rowcount == 1
+
+    def reanudar(self, ronda: str) -> int:
+        """Devuelve a la cola las URLs que quedaron en curso (worker caído)."""
+        with closing(self._connect()) as db:
+            return db.execute(
+                "UPDATE frontier SET estado = 'pendiente' WHERE ronda = ? AND estado = 'en_curso'", (ronda,)
+            ).rowcount
+
+    def pop(self, ronda: str) -> Optional[Dict]:
+        """Siguiente URL lista (prioridad más baja primero) cuyo host admite otra petición."""
+        now = self.clock()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")  # varios workers comparten la frontera
+            try:
+                row = db.execute(
+                    "SELECT f.* FROM frontier f LEFT JOIN hosts h ON h.host = f.host"
+                    " WHERE f.ronda = ? AND f.estado = 'pendiente' AND f.disponible <= ?"
+                    " AND COALESCE(h.siguiente, 0) <= ?"
+                    " ORDER BY f.prioridad, f.rowid LIMIT 1",
+                    (ronda, now, now),
+                ).fetchone()
+                if row is not None:
+                    db.execute("UPDATE frontier SET estado = 'en_curso' WHERE ronda = ? AND url = ?",
+                               (ronda, row["url"]))
+                    espera = self.delay * random.uniform(1.0, 1.3)
+                    db.execute(
+                        "INSERT INTO hosts (host, siguiente) VALUES (?, ?)"
+                        " ON CONFLICT(host) DO UPDATE SET siguiente = excluded.siguiente",
+                        (row["host"], now + espera),
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return dict(row) if row is not None else None
+
+    def espera(self, ronda: str) -> Optional[float]:
+        """Segundos hasta que haya una URL lista; None si la ronda no tiene pendientes."""
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT MIN(MAX(f.disponible, COALESCE(h.siguiente, 0))) FROM frontier f"
+                " LEFT JOIN hosts h ON h.host = f.host WHERE f.ronda = ? AND f.estado = 'pendiente'",
+                (ronda,),
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - self.clock())
+
+    def hecho(self, ronda: str, url: str, estado: str = "hecho"):
+        with closing(self._connect()) as db:
+            db.execute("UPDATE frontier SET estado = ? WHERE ronda = ? AND url = ?", (estado, ronda, url))
+
+    def reintentar(self, ronda: str, url: str, espera: float) -> bool:
+        """Vuelve a encolar tras un fallo; False si agotó los intentos."""
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT intentos FROM frontier WHERE ronda = ? AND url = ?",
+                             (ronda, url)).fetchone()
+            if row is None or row["intentos"] + 1 >= self.max_intentos:
+                db.execute("UPDATE frontier SET estado = 'error', intentos = intentos + 1"
+                           " WHERE ronda = ? AND url = ?", (ronda, url))
+                return False
+            db.execute(
+                "UPDATE frontier SET estado = 'pendiente', intentos = intentos + 1, disponible = ?"
+                " WHERE ronda = ? AND url = ?",
+                (self.clock() + espera, ronda, url),
+            )
+        return True
+
+    def penalizar_host(self, host: str, base: float) -> float:
+        """Bloqueo en `host`: no volver a pedirle nada durante base·2^bloqueos segundos."""
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT bloqueos FROM hosts WHERE host = ?", (host,)).fetchone()
+            bloqueos = row["bloqueos"] if row else 0
+            espera = base * (2 ** bloqueos)
+            db.execute(
+                "INSERT INTO hosts (host, siguiente, bloqueos) VALUES (?, ?, 1)"
+                " ON CONFLICT(host) DO UPDATE SET siguiente = excluded.siguiente, bloqueos = bloqueos + 1",
+                (host, self.clock() + espera),
+            )
+        return espera
+
+    def host_ok(self, host: str):
+        with closing(self._connect()) as db:
+            db.execute("UPDATE hosts SET bloqueos = 0 WHERE host = ?", (host,))
+
+    def stats(self, ronda: str) -> Dict[str, int]:
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT estado, COUNT(*) FROM frontier WHERE ronda = ? GROUP BY estado",
+                              (ronda,)).fetchall()
+        return {estado: n for estado, n in rows}
+
+    def purgar(self, conservar: str, plataforma: str) -> Dict[str, int]:
+        """Cierra las rondas de `plataforma` anteriores a `conservar`.
+
+        Lo que quedó pendiente (ronda cortada por ``CRAWL_MAX_HOURS`` o
+        aplazada por el circuit breaker) pasa a `conservar` con sus intentos;
+        solo se borran las URLs terminadas. Las demás plataformas no se tocan.
+        """
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                arrastradas = db.execute(
+                    "INSERT OR IGNORE INTO frontier"
+                    " (ronda, url, plataforma, categoria, pagina, host, prioridad, estado, intentos, disponible)"
+                    " SELECT ?, url, plataforma, categoria, pagina, host, prioridad, 'pendiente', intentos, disponible"
+                    " FROM frontier WHERE ronda < ? AND plataforma = ? AND estado IN ('pendiente', 'en_curso')"
+                    " ORDER BY ronda DESC, rowid",
+                    (conservar, conservar, plataforma),
+                ).rowcount
+                borradas = db.execute(
+                    "DELETE FROM frontier WHERE ronda < ? AND plataforma = ?", (conservar, plataforma)
+                ).rowcount
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        if arrastradas:
+            logging.info("Crawl %s: %s URLs pendientes de rondas anteriores pasan a %s",
+                         plataforma, arrastradas, conservar)
+        return {"arrastradas": arrastradas, "borradas": borradas}
+
+
+class Crawler:
+    def __init__(
+        self,
+        scraper,
+        frontier: Frontier,
+        vistos: BloomFilter,
+        ronda: str,
+        salida: str,
+        max_paginas: int = Config.CRAWL_MAX_PAGES,
+        bloqueo_espera: float = Config.CRAWL_BLOCK_BACKOFF,
+        clock=time.time,
+        sleep=time.sleep,
+    ):
+        self.scraper = scraper
+        self.frontier = frontier
+        self.vistos = vistos
+        self.ronda = ronda
+        self.salida = salida
+        self.max_paginas = max_paginas
+        self.bloqueo_espera = bloqueo_espera
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = {"paginas": 0, "productos": 0, "nuevos": 0, "bloqueos": 0, "fallos": 0}
+
+    @property
+    def plataforma(self) -> str:
+        return self.scraper.PLATAFORMA
+
+    def sembrar(self, categorias: Iterable[str]) -> int:
+        """Encola la primera página de cada categoría."""
+        self.frontier.reanudar(self.ronda)
+        return sum(
+            self.frontier.push(self.ronda, self.scraper.search_url(c, 1), self.plataforma, c, 1, prioridad=1)
+            for c in categorias
+        )
+
+    def _descargar(self, url: str) -> str:
+        driver = self.scraper.driver
+        driver.get(url)
+        if hasattr(self.scraper, "_accept_banners"):
+            self.scraper._accept_banners(4)
+        if hasattr(self.scraper, "_human_scroll_until_growth"):
+            self.scraper._human_scroll_until_growth()
+        return driver.page_source or ""
+
+    def _escribir(self, productos: List[Dict]):
+        if not productos:
+            return
+        os.makedirs(os.path.dirname(self.salida) or ".", exist_ok=True)
+        nuevo = not os.path.exists(self.salida)
+        # Se añade al CSV página a página: la memoria no crece con el barrido
+        with open(self.salida, "a", newline="", encoding="utf-8-sig") as fh:
+            writer = csv.DictWriter(fh, fieldnames=COLUMNAS, delimiter=";", extrasaction="ignore",
+                                    lineterminator="\n")
+            if nuevo:
+                writer.writeheader()
+            writer.writerows(productos)
+
+    def procesar(self, item: Dict):
+        url, host = item["url"], item["host"]
+        try:
+            html = self._descargar(url)
+        except Exception as e:
+            logging.warning("Crawl %s: fallo al cargar %s: %s", self.plataforma, url, e)
+            self.stats["fallos"] += 1
+            self.scraper._report_load_failure()
+            self.frontier.reintentar(self.ronda, url, self.frontier.delay * 2)
+            return
+
+        if block_detection.is_blocked(self.scraper.driver):
+            self.stats["bloqueos"] += 1
+            self.scraper._report_block()
+            espera = self.frontier.penalizar_host(host, self.bloqueo_espera)
+            logging.warning("Crawl %s: bloqueo en %s; host en pausa %.0fs", self.plataforma, url, espera)
+            self.frontier.reintentar(self.ronda, url, espera)
+            return
+        self.scraper._report_page_ok()
+        self.frontier.host_ok(host)
+
+        pagina = item["pagina"] or 1
+        productos = extract_offline(self.scraper, html, pagina)
+        # Sin link ni título no hay identidad con la que deduplicar: se descarta
+        nuevos = [p for p in productos if clave_producto(p) and self.vistos.add(clave_producto(p))]
+        self._escribir(nuevos)
+        if nuevos:
+            # Filtro y CSV avanzan juntos: si el worker muere después, la
+            # siguiente ejecución no vuelve a escribir estos productos
+            self.vistos.save()
+        self.scraper._snapshot(item["categoria"], pagina, productos, html)
+
+        self.stats["paginas"] += 1
+        self.stats["productos"] += len(productos)
+        self.stats["nuevos"] += len(nuevos)
+        if productos and pagina < self.max_paginas:
+            # Las categorías que aún dan productos nuevos se exploran antes
+            prioridad = pagina + 1 + (0 if nuevos else self.max_paginas)
+            self.frontier.push(self.ronda, self.scraper.search_url(item["categoria"], pagina + 1),
+                               self.plataforma, item["categoria"], pagina + 1, prioridad)
+        self.frontier.hecho(self.ronda, url)
+        logging.info("Crawl %s p%s de %r: %s productos, %s nuevos",
+                     self.plataforma, pagina, item["categoria"], len(productos), len(nuevos))
+
+    def run(self, max_urls: Optional[int] = None, hasta: Optional[float] = None) -> Dict:
+        """Procesa la frontera hasta vaciarla, agotar `max_urls` o llegar a `hasta`."""
+        procesadas = 0
+        try:
+            while max_urls is None or procesadas < max_urls:
+                if hasta is not None and self.clock() >= hasta:
+                    break
+                if self.scraper._circuit_open():
+                    break
+                item = self.frontier.pop(self.ronda)
+                if item is None:
+                    espera = self.frontier.espera(self.ronda)
+                    if espera is None:
+                        break  # ronda completa
+                    self.sleep(min(espera, 30.0))
+                    continue
+                self.procesar(item)
+                procesadas += 1
+        finally:
+            self.vistos.save()
+        return {**self.stats, "frontera": self.frontier.stats(self.ronda),
+                "vistos": self.vistos.elementos, "archivo": self.salida}
+
+
+# Tiempo para terminar la página en curso y cerrar el navegador tras el corte
+_MARGEN = 1800
+
+
+class CrawlEnCurso(RuntimeError):
+    """Ya hay un crawl de la plataforma en marcha."""
+
+
+def duracion_maxima() -> float:
+    """Segundos que puede durar un crawl, corte de ``CRAWL_MAX_HOURS`` incluido."""
+    return Config.CRAWL_MAX_HOURS * 3600 + _MARGEN
+
+
+@contextmanager
+def exclusivo(plataforma: str, store=None):
+    """Cerrojo del crawl de `plataforma`; lanza ``CrawlEnCurso`` si ya está tomado.
+
+    Caduca a los ``duracion_maxima()`` segundos por si el worker muere sin
+    liberarlo. Sin almacén compartido el crawl sigue (como el circuit breaker).
+    """
+    store = store if store is not None else get_store()
+    clave, valor = f"crawl:{plataforma}", {"token": uuid.uuid4().hex, "inicio": time.time()}
+    try:
+        tomado = store.set_nx(clave, valor, ttl=duracion_maxima())
+    except Exception as e:
+        logging.warning("Crawl de %s sin cerrojo compartido: %s", plataforma, e)
+        tomado = None
+    if tomado is False:
+        raise CrawlEnCurso(f"Ya hay un crawl de {plataforma} en curso")
+    try:
+        yield
+    finally:
+        if tomado:
+            try:
+                store.delete_if(clave, valor)
+            except Exception as e:
+                logging.warning("No se pudo liberar el cerrojo del crawl de %s: %s", plataforma, e)
+
+
+def ronda_actual() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def abrir(plataforma: str, raiz: str = Config.CRAWL_DIR):
+    """Frontera y filtro de vistos de `plataforma`, con sus rutas de la configuración."""
+    frontier = Frontier(os.path.join(raiz, "frontier.sqlite"))
+    vistos = BloomFilter(Config.CRAWL_BLOOM_CAPACITY, Config.CRAWL_BLOOM_ERROR,
+                         path=os.path.join(raiz, f"vistos-{plataforma}.bloom"))
+    return frontier, vistos
+
+
+def salida_csv(plataforma: str, ronda: str) -> str:
+    return os.path.join(os.environ.get("OUTPUT_DIR", "/app/data"), "crawl", f"{plataforma}_{ronda}.csv")
+
+
+def main(argv=None):
+    from .offline import scraper_cls
+
+    parser = argparse.ArgumentParser(description="Barrido de categorías con frontera persistente.")
+    parser.add_argument("plataforma")
+    parser.add_argument("accion", nargs="?", default="crawl", choices=["crawl", "stats"])
+    parser.add_argument("--categorias", nargs="*", default=Config.CRAWL_CATEGORIAS)
+    parser.add_argument("--ronda", default=None)
+    parser.add_argument("--max-urls", type=int)
+    args = parser.parse_args(argv)
+
+    ronda = args.ronda or ronda_actual()
+    frontier, vistos = abrir(args.plataforma)
+    if args.accion == "stats":
+        print(json.dumps({"ronda": ronda, "frontera": frontier.stats(ronda), "vistos": vistos.elementos},
+                         indent=2, ensure_ascii=False))
+        return
+
+    with exclusivo(args.plataforma), scraper_cls(args.plataforma)() as scraper:
+        frontier.purgar(conservar=ronda, plataforma=args.plataforma)
+        crawler = Crawler(scraper, frontier, vistos, ronda, salida_csv(args.plataforma, ronda))
+        crawler.sembrar(args.categorias)
+        resumen = crawler.run(max_urls=args.max_urls, hasta=time.time() + Config.CRAWL_MAX_HOURS * 3600)
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
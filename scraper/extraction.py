@@ -0,0 +1,310 @@
+# scraper/extraction.py
+"""Especificaciones declarativas de extracción por plataforma.
+
+Cada scraper describe sus cards una sola vez con un ``Spec``: qué selectores
+localizan las cards y, por campo, la lista ordenada de selectores, el atributo
+a leer y el post-proceso (``limpiar_precio``, ``_abs_link``...). ``compile_spec``
+convierte esa descripción en dos extractores equivalentes:
+
+  * ``extract_html``: lxml + XPath precompilado (CSS traducido con cssselect)
+    sobre el HTML guardado o el ``page_source``.
+  * ``extract_driver`` / ``extract_element``: un único ``execute_script`` que
+    recorre el DOM en el navegador y devuelve los valores crudos de todas las
+    cards (o de una) en una sola ida y vuelta.
+
+Ambos devuelven los mismos valores crudos (texto con espacios colapsados o el
+atributo pedido) y pasan por el mismo post-proceso en Python, así que el
+resultado no depende de la ruta usada.
+
+Sintaxis de selectores: ``"css"`` lee el texto; ``"css@attr"`` lee un
+atributo; ``"@attr"`` (css vacío) lee el atributo de la propia card. Para cada
+campo gana el primer selector cuyo primer nodo tenga un valor no vacío.
+"""
+import logging
+import re
+from typing import Callable, Dict, List, Optional, Sequence
+
+import lxml.html
+from cssselect import HTMLTranslator
+from lxml import etree
+
+_WS = re.compile(r"\s+")
+_ATTR = re.compile(r"^[A-Za-z_:][-\w:.]*$")
+_TRANSLATOR = HTMLTranslator()
+
+TEXTO = "texto"
+PIEZAS = "piezas"
+EXISTE = "existe"
+FILAS = "filas"
+
+
+class Campo:
+    """Un campo de la card.
+
+    - ``selectores``: lista ordenada (ver sintaxis en el docstring del módulo).
+    - ``attr``: atributo por defecto para los selectores sin ``@``.
+    - ``post``: función aplicada al valor crudo (``None`` si no hubo match).
+    - ``tipo``: ``"texto"`` (por defecto), ``"piezas"`` (texto de los <span>
+      descendientes unidos sin separador, para precios troceados),
+      ``"existe"`` (bool) o ``"filas"`` (lista de dicts con los sub-campos
+      ``sub`` de cada fila encontrada).
+
+    Los campos cuyo nombre empieza por "_" son intermedios: llegan a
+    ``Spec.finalizar`` pero no al resultado.
+    """
+
+    __slots__ = ("nombre", "selectores", "post", "tipo", "sub")
+
+    def __init__(self, nombre: str, selectores: Sequence[str], attr: Optional[str] = None,
+                 post: Optional[Callable] = None, tipo: str = TEXTO,
+                 sub: Optional[Dict[str, Sequence[str]]] = None):
+        self.nombre = nombre
+        self.selectores = [_parse_selector(s, attr) for s in selectores]
+        self.post = post
+        self.tipo = tipo
+        self.sub = {k: [_parse_selector(s, None) for s in v] for k, v in (sub or {}).items()}
+
+
+class Spec:
+    """Cards + campos de una plataforma; ``finalizar`` deriva campos o descarta la card (None)."""
+
+    def __init__(self, plataforma: str, cards: Sequence[str], campos: Sequence[Campo],
+                 finalizar: Optional[Callable[[Dict], Optional[Dict]]] = None):
+        self.plataforma = plataforma
+        self.cards = list(cards)
+        self.campos = list(campos)
+        self.finalizar = finalizar
+
+
+def _parse_selector(selector: str, attr: Optional[str]):
+    css, sep, nombre = selector.rpartition("@")
+    if sep and _ATTR.match(nombre):
+        return css.strip(), nombre
+    return selector.strip(), attr
+
+
+def _texto(valor: str) -> str:
+    return _WS.sub(" ", valor).strip()
+
+
+# ----------------- extractor lxml -----------------
+
+def _xpath(css: str, prefijo: str = "descendant::"):
+    if not css:
+        return etree.XPath("self::*")
+    return etree.XPath(_TRANSLATOR.css_to_xpath(css, prefix=prefijo))
+
+
+def _compilar_selectores(selectores):
+    return [(_xpath(css), attr) for css, attr in selectores]
+
+
+_SPANS = etree.XPath("descendant::span")
+
+
+def _valor_lxml(nodo, attr: Optional[str], piezas: bool = False) -> str:
+    if attr:
+        return (nodo.get(attr) or "").strip()
+    if piezas:
+        trozos = [t for t in (_texto(s.text_content()) for s in _SPANS(nodo)) if t]
+        if trozos:
+            return "".join(trozos)
+    return _texto(nodo.text_content())
+
+
+def _primero_lxml(card, compilados, piezas: bool = False) -> Optional[str]:
+    for xp, attr in compilados:
+        nodos = xp(card)
+        if not nodos:
+            continue
+        valor = _valor_lxml(nodos[0], attr, piezas)
+        if valor:
+            return valor
+    return None
+
+
+# ----------------- extractor en el navegador -----------------
+
+_JS_EXTRACTOR = """
+var spec = arguments[0], raiz = arguments[1] || null, cardsSel = arguments[2] || spec.cards;
+function txt(n) { return (n.textContent || "").replace(/\\s+/g, " ").trim(); }
+function valor(n, attr, piezas) {
+  if (!attr) {
+    if (piezas) {
+      var t = Array.prototype.map.call(n.querySelectorAll("span"), txt).filter(Boolean);
+      if (t.length) return t.join("");
+    }
+    return txt(n);
+  }
+  var v = n.getAttribute(attr);
+  return v == null ? "" : String(v).trim();
+}
+function nodo(card, css) { return css === "" ? card : card.querySelector(css); }
+function primero(card, sels, piezas) {
+  for (var i = 0; i < sels.length; i++) {
+    var n = nodo(card, sels[i][0]);
+    if (!n) continue;
+    var v = valor(n, sels[i][1], piezas);
+    if (v) return v;
+  }
+  return null;
+}
+function existe(card, sels) {
+  for (var i = 0; i < sels.length; i++) { if (nodo(card, sels[i][0])) return true; }
+  return false;
+}
+function filas(card, campo) {
+  for (var i = 0; i < campo.sel.length; i++) {
+    var rows = card.querySelectorAll(campo.sel[i][0]);
+    if (!rows.length) continue;
+    return Array.prototype.map.call(rows, function (r) {
+      var o = {};
+      for (var k in campo.sub) { o[k] = primero(r, campo.sub[k]); }
+      return o;
+    });
+  }
+  return [];
+}
+function extraer(card) {
+  var d = {};
+  spec.campos.forEach(function (c) {
+    d[c.nombre] = c.tipo === "existe" ? existe(card, c.sel)
+      : c.tipo === "filas" ? filas(card, c) : primero(card, c.sel, c.tipo === "piezas");
+  });
+  return d;
+}
+if (raiz) return extraer(raiz);
+for (var i = 0; i < cardsSel.length; i++) {
+  var cards = document.querySelectorAll(cardsSel[i]);
+  if (cards.length) return Array.prototype.map.call(cards, extraer);
+}
+return [];
+"""
+
+
+class CompiledSpec:
+    """Extractores listos para usar de un ``Spec`` (ver ``compile_spec``)."""
+
+    def __init__(self, spec: Spec):
+        self.spec = spec
+        self._cards = [_xpath(css, "descendant-or-self::") for css in spec.cards]
+        self._campos = []
+        for campo in spec.campos:
+            sub = {k: _compilar_selectores(v) for k, v in campo.sub.items()}
+            self._campos.append((campo, _compilar_selectores(campo.selectores), sub))
+        # Mismo spec en forma serializable para el extractor JS
+        self.js_spec = {
+            "cards": spec.cards,
+            "campos": [
+                {"nombre": c.nombre, "tipo": c.tipo, "sel": [list(s) for s in c.selectores],
+                 "sub": {k: [list(s) for s in v] for k, v in c.sub.items()}}
+                for c in spec.campos
+            ],
+        }
+
+    # ---------- valores crudos -> resultado ----------
+
+    def finalizar(self, crudo: Dict) -> Optional[Dict]:
+        datos = {}
+        for campo in self.spec.campos:
+            valor = crudo.get(campo.nombre)
+            if campo.tipo == EXISTE:
+                valor = bool(valor)
+            elif campo.tipo == FILAS:
+                valor = list(valor or [])
+            if campo.post is not None:
+                valor = campo.post(valor)
+            datos[campo.nombre] = valor
+        if self.spec.finalizar is not None:
+            datos = self.spec.finalizar(datos)
+            if datos is None:
+                return None
+        return {k: v for k, v in datos.items() if not k.startswith("_")}
+
+    # ---------- lxml ----------
+
+    def _crudo_lxml(self, card) -> Dict:
+        crudo = {}
+        for campo, compilados, sub in self._campos:
+            if campo.tipo == EXISTE:
+                crudo[campo.nombre] = any(xp(card) for xp, _ in compilados)
+            elif campo.tipo == FILAS:
+                filas = []
+                for xp, _ in compilados:
+                    filas = [{k: _primero_lxml(r, v) for k, v in sub.items()} for r in xp(card)]
+                    if filas:
+                        break
+                crudo[campo.nombre] = filas
+            else:
+                crudo[campo.nombre] = _primero_lxml(card, compilados, campo.tipo == PIEZAS)
+        return crudo
+
+    def cards_html(self, page_source, cards: Optional[Sequence[str]] = None) -> list:
+        if not page_source:
+            return []
+        try:
+            doc = lxml.html.fromstring(page_source)
+        except ValueError:
+            # str con declaración de encoding: lxml exige bytes
+            doc = lxml.html.fromstring(page_source.encode("utf-8"))
+        except etree.ParserError:
+            return []
+        selectores = self._cards if cards is None else [_xpath(c, "descendant-or-self::") for c in cards]
+        for xp in selectores:
+            nodos = xp(doc)
+            if nodos:
+                return nodos
+        return []
+
+    def extract_html(self, page_source, cards: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Extrae todas las cards de un HTML en una pasada (lxml)."""
+        resultados = []
+        for card in self.cards_html(page_source, cards):
+            datos = self.finalizar(self._crudo_lxml(card))
+            if datos:
+                resultados.append(datos)
+        return resultados
+
+    # ---------- navegador ----------
+
+    def extract_driver(self, driver, cards: Optional[Sequence[str]] = None) -> Optional[List[Dict]]:
+        """Extrae todas las cards de la página actual con un solo execute_script.
+
+        Devuelve None si el navegador no pudo ejecutar el extractor (el
+        llamador cae entonces a la ruta Selenium/HTML).
+        """
+        try:
+            crudos = driver.execute_script(_JS_EXTRACTOR, self.js_spec, None, list(cards) if cards else None)
+        except Exception as e:
+            logging.debug("Extractor JS no disponible: %s", e)
+            return None
+        if not isinstance(crudos, list) or not all(isinstance(c, dict) for c in crudos):
+            return None
+        return [d for d in (self.finalizar(c) for c in crudos) if d]
+
+    def extract_element(self, driver, card) -> Optional[Dict]:
+        """Extrae una card concreta (WebElement) con un solo execute_script."""
+        try:
+            crudo = driver.execute_script(_JS_EXTRACTOR, self.js_spec, card, None)
+        except Exception as e:
+            logging.debug("Extractor JS falló para la card: %s", e)
+            return None
+        if not isinstance(crudo, dict):
+            return None
+        return self.finalizar(crudo)
+
+
+_COMPILADOS: Dict[int, CompiledSpec] = {}
+
+
+def compile_spec(spec: Spec) -> CompiledSpec:
+    """Compila (una vez por proceso) un ``Spec``."""
+    compilado = _COMPILADOS.get(id(spec))
+    if compilado is None or compilado.spec is not spec:
+        compilado = _COMPILADOS[id(spec)] = CompiledSpec(spec)
+    return compilado
+
+
+def attr(selectores: Sequence[str], nombre: str) -> List[str]:
+    """Azúcar: los mismos selectores leyendo el atributo `nombre`."""
+    return [f"{s}@{nombre}" for s in selectores]
@@ -0,0 +1,238 @@
+# scraper/normalization.py
+"""Normalización de precios y cantidades compartida por todos los scrapers.
+
+Un mismo algoritmo para todas las plataformas, con patrones precompilados y
+una política por plataforma que recoge las diferencias deliberadas:
+
+  - ``rango``: qué valor tomar de un rango "7.99 - 15.99".
+      * ``"min"``   -> el menor (AliExpress, Temu, Made-in-China).
+      * ``"first"`` -> el primero válido (Alibaba muestra "desde - hasta").
+  - ``decimal_estricto``: con un único tipo de separador, solo se considera
+      decimal si la parte entera son dígitos sin otros separadores
+      ("1.234.56" -> 123456). Alibaba lo activa porque mezcla formatos.
+  - ``cantidad``: cómo leer ventas/MOQ.
+      * ``"multiplicador"``  -> "1.2k" = 1200, "3 mil" = 3000 (marketplaces).
+      * ``"primer_entero"``  -> primer número sin separadores, "1,200 Pieces" = 1200
+        (MOQ de Made-in-China, que nunca usa decimales ni sufijos).
+
+Separadores: si aparecen "." y "," el último es el decimal; si solo aparece
+uno, es decimal cuando le siguen 1 o 2 dígitos ("12,34"), y de miles si no
+("1,000").
+
+Además de las funciones escalares hay una API masiva (``limpiar_precios`` /
+``limpiar_cantidades`` / ``normalizar_dataframe``) para columnas de pandas o
+arrays de NumPy completos: deduplica con ``pd.factorize``, parsea solo los
+valores distintos y reconstruye la columna con un ``take`` de NumPy. Es la
+que se usa para re-normalizar CSV históricos de millones de filas.
+"""
+import argparse
+import re
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+POLITICAS = {
+    "aliexpress": {"rango": "min", "decimal_estricto": False, "cantidad": "multiplicador"},
+    "temu": {"rango": "min", "decimal_estricto": False, "cantidad": "multiplicador"},
+    "alibaba": {"rango": "first", "decimal_estricto": True, "cantidad": "multiplicador"},
+    "madeinchina": {"rango": "min", "decimal_estricto": False, "cantidad": "primer_entero"},
+}
+
+# ----------------- patrones precompilados -----------------
+
+_RANGE_SPLIT = re.compile(r"(?<=\d)\s*[-–—]\s*(?=\d)")
+_NON_NUMERIC = re.compile(r"[^0-9.,]")
+_SEPARATORS = re.compile(r"[.,]")
+# Separa en la última aparición de "." o ","
+_LAST_SEP = re.compile(r"^(.*)[.,]([0-9]*)$")
+_DIGITS_ONLY = re.compile(r"^[0-9]+$")
+_K_SUFFIX = re.compile(r"k\b")
+_FIRST_NUMBER = re.compile(r"[\d,.]+")
+_CURRENCY = re.compile(r"(US\$|S/|[$€£¥]|[A-Z]{1,4})")
+_NUMBER_TOKEN = re.compile(r"[\d][\d.,]*")
+
+
+def _politica(plataforma: str) -> dict:
+    try:
+        return POLITICAS[plataforma]
+    except KeyError:
+        raise ValueError(f"Plataforma sin política de normalización: {plataforma}") from None
+
+
+# ----------------- API escalar -----------------
+
+def _numero(texto: str, estricto: bool) -> Optional[float]:
+    cleaned = _NON_NUMERIC.sub("", texto)
+    if not cleaned:
+        return None
+    m = _LAST_SEP.match(cleaned)
+    if m:
+        int_part, dec_part = m.groups()
+        both = "." in cleaned and "," in cleaned
+        decimal = both or len(dec_part) in (1, 2)
+        if decimal and estricto and not both:
+            decimal = bool(_DIGITS_ONLY.match(int_part))
+        if decimal:
+            int_digits = _SEPARATORS.sub("", int_part)
+            if not int_digits and not dec_part:
+                return None
+            return float(f"{int_digits}.{dec_part or '0'}")
+    digits = _SEPARATORS.sub("", cleaned)
+    return float(digits) if digits else None
+
+
+def limpiar_precio(texto: Optional[str], plataforma: str = "aliexpress") -> Optional[float]:
+    """Convierte un texto de precio a float según la política de `plataforma`."""
+    if not texto:
+        return None
+    texto = texto.strip()
+    if not texto:
+        return None
+    politica = _politica(plataforma)
+    estricto = politica["decimal_estricto"]
+    # Sin símbolos de moneda: "US$3.60 - US$5.60" debe partirse como rango
+    texto = _CURRENCY.sub(" ", texto)
+    if not _RANGE_SPLIT.search(texto):
+        return _numero(texto, estricto)
+    valores = []
+    for parte in _RANGE_SPLIT.split(texto):
+        parte = parte.strip()
+        if not parte:
+            continue
+        valor = _numero(parte, estricto)
+        if valor is None:
+            continue
+        if politica["rango"] == "first":
+            return valor
+        valores.append(valor)
+    return min(valores) if valores else None
+
+
+def limpiar_cantidad(texto: Optional[str], plataforma: str = "aliexpress") -> int:
+    """Convierte ventas/MOQ ("1.2k", "3 mil", "1,000+ sold") a entero."""
+    if not texto:
+        return 0
+    t = texto.strip().lower().replace("+", "")
+    if not t:
+        return 0
+    if _politica(plataforma)["cantidad"] == "primer_entero":
+        m = _FIRST_NUMBER.search(t)
+        if not m:
+            return 0
+        digits = _SEPARATORS.sub("", m.group(0))
+        return int(digits) if digits else 0
+    mult = 1
+    if _K_SUFFIX.search(t):
+        mult = 1000
+        t = _K_SUFFIX.sub("", t)
+    if "mil" in t:
+        mult = 1000
+        t = t.replace("mil", "")
+    n = limpiar_precio(t, plataforma) or 0.0
+    return int(round(n * mult))
+
+
+def limpiar_rango_precio(
+    texto: Optional[str], plataforma: str = "madeinchina"
+) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    """Devuelve (min, max, moneda) desde strings como 'US$3.60 - 5.60 / Piece'."""
+    if not texto:
+        return None, None, None
+    m = _CURRENCY.search(texto)
+    moneda = m.group(0) if m else None
+    nums = _NUMBER_TOKEN.findall(_CURRENCY.sub("", texto))
+    vals: List[float] = []
+    for n in nums[:2]:
+        v = limpiar_precio(n, plataforma)
+        if v is not None:
+            vals.append(v)
+    if not vals:
+        return None, None, moneda
+    return min(vals), max(vals), moneda
+
+
+# ----------------- API masiva (vectorizada) -----------------
+
+def _en_bloque(values, fn, dtype, faltante):
+    """Aplica `fn` a cada valor *distinto* y reparte el resultado con NumPy.
+
+    Las columnas reales repiten muchísimo ("US $7.99", "1,000+ sold"...):
+    `pd.factorize` agrupa en una sola pasada en C, el parser escalar solo
+    corre sobre los únicos y `take` reconstruye la columna completa.
+    """
+    serie = values if isinstance(values, pd.Series) else pd.Series(np.asarray(values, dtype=object))
+    codes, uniques = pd.factorize(serie, use_na_sentinel=True)
+    tabla = np.fromiter(
+        (fn(u) if isinstance(u, str) else faltante for u in uniques),
+        dtype=dtype,
+        count=len(uniques),
+    )
+    # El centinela -1 (NaN/None) apunta al valor extra del final
+    resultado = np.append(tabla, np.array([faltante], dtype=dtype))[codes]
+    if isinstance(values, pd.Series):
+        return pd.Series(resultado, index=values.index, name=values.name)
+    return resultado
+
+
+def limpiar_precios(values, plataforma: str = "aliexpress"):
+    """`limpiar_precio` para una columna entera; float64 con NaN donde no hay precio.
+
+    Acepta una Series (conserva índice y nombre) o cualquier secuencia/array
+    de textos, y devuelve el mismo tipo de contenedor.
+    """
+    _politica(plataforma)
+
+    def fn(texto):
+        valor = limpiar_precio(texto, plataforma)
+        return np.nan if valor is None else valor
+
+    return _en_bloque(values, fn, np.float64, np.nan)
+
+
+def limpiar_cantidades(values, plataforma: str = "aliexpress"):
+    """`limpiar_cantidad` para una columna entera; int64 (0 donde no hay dato)."""
+    _politica(plataforma)
+    tope = np.iinfo(np.int64).max  # textos basura con decenas de dígitos
+
+    def fn(texto):
+        return min(limpiar_cantidad(texto, plataforma), tope)
+
+    return _en_bloque(values, fn, np.int64, 0)
+
+
+def normalizar_dataframe(
+    df: pd.DataFrame,
+    plataforma: str,
+    columnas_precio: Iterable[str] = ("precio", "precio_original"),
+    columnas_cantidad: Iterable[str] = ("ventas",),
+) -> pd.DataFrame:
+    """Normaliza en bloque las columnas de texto de un DataFrame (las numéricas no se tocan)."""
+    df = df.copy()
+    for col in columnas_precio:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = limpiar_precios(df[col], plataforma)
+    for col in columnas_cantidad:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = limpiar_cantidades(df[col], plataforma)
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Re-normaliza precios y cantidades de un CSV de productos."
+    )
+    parser.add_argument("entrada")
+    parser.add_argument("plataforma", choices=sorted(POLITICAS))
+    parser.add_argument("-o", "--salida", help="CSV de salida (por defecto sobrescribe la entrada)")
+    parser.add_argument("--sep", default=";")
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(args.entrada, sep=args.sep, dtype=str, keep_default_na=False)
+    df = normalizar_dataframe(df, args.plataforma)
+    df.to_csv(args.salida or args.entrada, sep=args.sep, index=False, encoding="utf-8-sig")
+    print(f"✅ {len(df)} filas normalizadas -> {args.salida or args.entrada}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# scraper/offline.py
+"""Extracción sin navegador a partir de HTML guardado.
+
+Todos los scrapers describen sus cards con un ``Spec`` (ver
+``scraper.extraction``), así que la extracción de disco usa exactamente los
+mismos selectores y post-proceso que la del navegador, vía el extractor lxml.
+"""
+from typing import Dict, List
+
+
+def scraper_cls(plataforma: str):
+    """Clase del scraper de `plataforma` (clave de ``SnapshotStore``/``PLATAFORMA``)."""
+    from .alibaba_scraper import AlibabaScraper
+    from .aliexpress_scraper import AliExpressScraper
+    from .madeinchina_scraper import MadeInChinaScraper
+    from .temu_scraper import TemuScraper
+
+    return {
+        "aliexpress": AliExpressScraper,
+        "temu": TemuScraper,
+        "alibaba": AlibabaScraper,
+        "madeinchina": MadeInChinaScraper,
+    }[plataforma]
+
+
+def new_scraper(scraper_cls):
+    """Instancia un scraper sin arrancar Chrome (solo para extraer HTML)."""
+    scraper = scraper_cls.__new__(scraper_cls)
+    scraper.driver = None
+    return scraper
+
+
+def extract_offline(scraper, page_source: str, page: int = 1) -> List[Dict]:
+    """Extrae las cards de `page_source` con la lógica del propio scraper."""
+    if hasattr(scraper, "_extract_from_html"):
+        return scraper._extract_from_html(page_source, page)
+
+    resultados = scraper._extract_html(page_source)
+    for data in resultados:
+        data["pagina"] = page
+    return resultados
@@ -0,0 +1,67 @@
+# scraper/pagination.py
+"""Paginación adaptativa: decide tras cada página si merece la pena cargar la siguiente.
+
+``parse(producto, paginas=4)`` recorría siempre todas las páginas aunque la
+segunda devolviera casi solo repetidos, ninguna card válida o una página de
+bloqueo. ``Paginacion`` lleva la cuenta de los productos vistos y corta en
+cuanto se cumple alguno de estos motivos:
+
+    bloqueo          la página es de captcha/antibot
+    fin_resultados   la página no trae ninguna card válida
+    repetidos        la proporción de productos nuevos cae por debajo de
+                     ``min_nuevos`` (la búsqueda ya no da más de sí)
+    max_productos    ya se reunieron los productos que pidió quien llama
+
+``paginas`` sigue siendo el tope absoluto.
+"""
+import logging
+from typing import Dict, List, Optional
+
+from config import Config
+
+
+def clave_producto(producto: Dict) -> str:
+    """Identidad de un producto entre páginas: su link o, si no hay, el título."""
+    return producto.get("link") or producto.get("titulo") or ""
+
+
+class Paginacion:
+    def __init__(self, max_productos: Optional[int] = None, min_nuevos: Optional[float] = None):
+        self.max_productos = max_productos or None
+        self.min_nuevos = Config.PAGINATION_MIN_NEW_RATIO if min_nuevos is None else min_nuevos
+        self.vistos = set()
+        self.total = 0
+        self.paginas = 0
+        self.motivo: Optional[str] = None
+
+    def registrar(self, page: int, productos: List[Dict], bloqueada: bool = False) -> bool:
+        """Anota los productos de una página; devuelve False si hay que dejar de paginar."""
+        self.paginas += 1
+        self.total += len(productos)
+        claves = [clave_producto(p) for p in productos]
+        nuevos = len(set(claves) - self.vistos)
+        self.vistos.update(claves)
+
+        if bloqueada:
+            self.motivo = "bloqueo"
+        elif not productos:
+            self.motivo = "fin_resultados"
+        elif self.max_productos and self.total >= self.max_productos:
+            self.motivo = "max_productos"
+        elif page > 1 and nuevos / len(productos) < self.min_nuevos:
+            self.motivo = "repetidos"
+        if self.motivo:
+            logging.info("Paginación detenida en la página %s (%s): %s productos, %s nuevos",
+                         page, self.motivo, len(productos), nuevos)
+            return False
+        return True
+
+    def recortar(self, resultados: List[Dict]) -> List[Dict]:
+        """Aplica `max_productos` a la lista final."""
+        if self.max_productos:
+            return resultados[:self.max_productos]
+        return resultados
+
+    def resumen(self) -> Dict:
+        return {"paginas": self.paginas, "productos_unicos": len(self.vistos),
+                "motivo": self.motivo or "max_paginas"}
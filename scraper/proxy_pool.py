@@ -0,0 +1,133 @@
+# scraper/proxy_pool.py
+"""Pool de proxies con puntuación de salud compartida entre workers.
+
+Cada proxy acumula éxitos, fallos, bloqueos y una latencia media móvil
+(EWMA) en el almacén compartido. Al crear el driver se elige un proxy con
+probabilidad proporcional a su puntuación; los que reciben un bloqueo
+quedan en cuarentena un tiempo que se duplica con cada reincidencia.
+
+Las estadísticas son un hash por proxy y cada resultado se aplica campo a
+campo con ``update_hash`` (HINCRBYFLOAT y comparaciones en un script Lua en
+Redis): dos workers que informan a la vez no se pisan los contadores, un
+éxito no toca ``quarantined_until`` y la cuarentena solo se alarga.
+"""
+import hashlib
+import logging
+import random
+import time
+from typing import Callable, List, Optional
+
+from config import Config
+from .state import get_store
+
+_LATENCY_ALPHA = 0.3  # peso de la última medición en la EWMA
+
+
+class ProxyPool:
+    def __init__(
+        self,
+        proxies: List[str],
+        store=None,
+        quarantine: float = Config.PROXY_QUARANTINE,
+        max_quarantine: float = Config.PROXY_MAX_QUARANTINE,
+        clock: Callable[[], float] = time.time,
+        rng: Optional[random.Random] = None,
+    ):
+        if not proxies:
+            raise ValueError("El pool de proxies está vacío.")
+        self.proxies = list(dict.fromkeys(proxies))
+        self.store = store if store is not None else get_store()
+        self.quarantine = quarantine
+        self.max_quarantine = max_quarantine
+        self.clock = clock
+        self.rng = rng or random.Random()
+
+    # ----------------- estado -----------------
+
+    @staticmethod
+    def _key(proxy: str) -> str:
+        # Hash para no dejar credenciales del proxy en las claves de Redis
+        return "proxy:" + hashlib.sha1(proxy.encode("utf-8")).hexdigest()[:16] + ":stats"
+
+    @staticmethod
+    def _stats(data: dict) -> dict:
+        """Hash del almacén (valores float, campos ausentes) -> estadísticas completas."""
+        stats = {campo: int(data.get(campo, 0)) for campo in ("successes", "failures", "blocks", "strikes")}
+        stats["latency"] = data.get("latency")
+        stats["quarantined_until"] = data.get("quarantined_until", 0)
+        return stats
+
+    def stats(self, proxy: str) -> dict:
+        try:
+            data = self.store.get_hash(self._key(proxy))
+        except Exception as e:
+            logging.warning("Sin estadísticas del proxy: %s", e)
+            data = {}
+        return self._stats(data)
+
+    def _update(self, proxy: str, **cambios) -> Optional[dict]:
+        try:
+            return self._stats(self.store.update_hash(self._key(proxy), alpha=_LATENCY_ALPHA, **cambios))
+        except Exception as e:
+            logging.warning("No se pudo guardar el estado del proxy: %s", e)
+            return None
+
+    @staticmethod
+    def score(data: dict) -> float:
+        """Tasa de éxito suavizada (Laplace) penalizada por latencia."""
+        ok = data.get("successes", 0)
+        bad = data.get("failures", 0) + 2 * data.get("blocks", 0)
+        rate = (ok + 1) / (ok + bad + 2)
+        latency = data.get("latency") or 0.0
+        return rate / (1.0 + latency / 10.0)
+
+    def is_quarantined(self, proxy: str) -> bool:
+        return self.stats(proxy).get("quarantined_until", 0) > self.clock()
+
+    # ----------------- selección -----------------
+
+    def select(self) -> str:
+        now = self.clock()
+        stats = {p: self.stats(p) for p in self.proxies}
+        healthy = [p for p in self.proxies if stats[p].get("quarantined_until", 0) <= now]
+        if not healthy:
+            # Todos en cuarentena: el que salga antes es el menos malo
+            proxy = min(self.proxies, key=lambda p: stats[p].get("quarantined_until", 0))
+            logging.warning("Todos los proxies en cuarentena; usando el más próximo a liberarse")
+            return proxy
+        weights = [self.score(stats[p]) for p in healthy]
+        return self.rng.choices(healthy, weights=weights, k=1)[0]
+
+    # ----------------- resultados de los scrapers -----------------
+
+    def record_success(self, proxy: str, latency: Optional[float] = None):
+        self._update(
+            proxy,
+            incr={"successes": 1},
+            assign={"strikes": 0},
+            ewma={"latency": latency} if latency is not None else None,
+        )
+
+    def record_failure(self, proxy: str):
+        self._update(proxy, incr={"failures": 1})
+
+    def record_block(self, proxy: str):
+        data = self._update(proxy, incr={"blocks": 1, "strikes": 1})
+        if data is None:
+            return
+        espera = min(self.quarantine * 2 ** (data["strikes"] - 1), self.max_quarantine)
+        # `maximum`: un bloqueo concurrente con menos reincidencias no acorta la cuarentena
+        self._update(proxy, maximum={"quarantined_until": self.clock() + espera})
+        logging.warning("Proxy %s en cuarentena %.0fs (bloqueo #%s)",
+                        self._key(proxy), espera, data["strikes"])
+
+
+_pool: Optional[ProxyPool] = None
+
+
+def get_proxy_pool() -> Optional[ProxyPool]:
+    """Pool configurado en PROXY_POOL, o None si no hay lista de proxies."""
+    global _pool
+    if _pool is None and Config.PROXY_POOL:
+        _pool = ProxyPool(Config.PROXY_POOL)
+    return _pool
@@ -0,0 +1,283 @@
+# scraper/replay.py
+"""Re-extracción masiva (replay) sobre los snapshots HTML archivados.
+
+Cuando se arregla un selector o se añade un campo al ``SPEC`` de un scraper,
+los datos históricos se pueden regenerar sin volver a scrapear: el replay
+pasa el código de extracción actual (``extract_offline``) por cada snapshot
+de ``scraper.snapshots`` y escribe una versión nueva del dataset junto con un
+informe de diferencias por campo frente a lo que se extrajo originalmente.
+
+El trabajo se reparte en lotes de snapshots entre un pool de procesos (uno
+por núcleo por defecto); cada proceso abre su propio ``SnapshotStore`` y
+descomprime y parsea sus páginas sin pasar HTML entre procesos.
+
+    python -m scraper.replay --plataforma alibaba
+    python -m scraper.replay --job <task_id> --workers 4 --lote 16
+    python -m scraper.replay --desde 2024-05-01 --salida data/replay
+
+Salida en ``<salida>/<version>/``: ``productos_<plataforma>.csv`` (mismo
+formato que los CSV de ``tasks.scrapear``), ``diff.json`` y ``manifest.json``.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from config import Config
+from .offline import extract_offline, new_scraper, scraper_cls
+from .snapshots import SnapshotStore
+
+# Mismo orden de columnas que los CSV de tasks.scrapear
+COLUMNAS = [
+    "titulo", "precio", "precio_original", "descuento", "ventas", "link",
+    "pagina", "plataforma", "fecha_scraping",
+    "moneda", "proveedor", "proveedor_anios", "proveedor_pais", "proveedor_verificado",
+    "rating_score", "rating_count", "moq", "moq_texto", "envio_promesa", "tasa_repeticion",
+]
+# Campos que dependen del momento de la extracción, no del HTML
+_SIN_DIFF = {"fecha_scraping", "pagina"}
+_EJEMPLOS_POR_CAMPO = 3
+
+# Estado por proceso del pool (lo crea _init_worker)
+_worker_store: Optional[SnapshotStore] = None
+_worker_scrapers: Dict[str, object] = {}
+
+
+def _init_worker(root: str):
+    global _worker_store
+    _worker_store = SnapshotStore(root, retention_days=0, max_mb=0, dict_samples=0)
+    _worker_scrapers.clear()
+
+
+def _normalizar(productos: List[Dict]) -> List[Dict]:
+    # Mismo tratamiento que al guardar en el índice (JSON con default=str)
+    return json.loads(json.dumps(productos, ensure_ascii=False, default=str))
+
+
+def _clave(producto: Dict) -> str:
+    return producto.get("link") or producto.get("titulo") or ""
+
+
+def _emparejar(original: List[Dict], nuevo: List[Dict]) -> Tuple[List[Tuple[Dict, Dict]], int, int]:
+    """Empareja productos por link (o título) y orden de aparición."""
+    pendientes = defaultdict(list)
+    for p in original:
+        pendientes[_clave(p)].append(p)
+    pares, solo_nuevo = [], 0
+    for p in nuevo:
+        cola = pendientes.get(_clave(p))
+        if cola:
+            pares.append((cola.pop(0), p))
+        else:
+            solo_nuevo += 1
+    solo_original = sum(len(c) for c in pendientes.values())
+    return pares, solo_original, solo_nuevo
+
+
+def diff_productos(original: List[Dict], nuevo: List[Dict]) -> Dict:
+    """Diferencias por campo entre dos extracciones de la misma página."""
+    pares, solo_original, solo_nuevo = _emparejar(original, nuevo)
+    campos: Dict[str, Counter] = defaultdict(Counter)
+    ejemplos: Dict[str, List] = defaultdict(list)
+    for antes, despues in pares:
+        for campo in set(antes) | set(despues):
+            if campo in _SIN_DIFF:
+                continue
+            a, d = antes.get(campo), despues.get(campo)
+            if a == d:
+                estado = "iguales"
+            elif a in (None, ""):
+                estado = "nuevos"
+            elif d in (None, ""):
+                estado = "perdidos"
+            else:
+                estado = "cambiados"
+            campos[campo][estado] += 1
+            if estado != "iguales" and len(ejemplos[campo]) < _EJEMPLOS_POR_CAMPO:
+                ejemplos[campo].append({"clave": _clave(despues), "antes": a, "despues": d})
+    return {
+        "emparejados": len(pares),
+        "solo_original": solo_original,
+        "solo_nuevo": solo_nuevo,
+        "campos": {c: dict(n) for c, n in campos.items()},
+        "ejemplos": dict(ejemplos),
+    }
+
+
+def _replay_snapshot(store: SnapshotStore, scrapers: Dict, snap: Dict) -> Dict:
+    plataforma = snap["plataforma"]
+    scraper = scrapers.get(plataforma)
+    if scraper is None:
+        scraper = scrapers[plataforma] = new_scraper(scraper_cls(plataforma))
+    try:
+        nuevos = _normalizar(extract_offline(scraper, store.load(snap["sha256"]), snap["pagina"] or 1))
+    except Exception as e:  # un snapshot corrupto no detiene el replay
+        return {"id": snap["id"], "plataforma": plataforma, "error": f"{type(e).__name__}: {e}"}
+
+    original = snap.get("productos")
+    # La fecha del dato es la del scrape original, no la del replay
+    fecha = datetime.fromtimestamp(snap["ts"]).strftime("%Y-%m-%d")
+    for p in nuevos:
+        if "fecha_scraping" in p:
+            p["fecha_scraping"] = fecha
+    return {
+        "id": snap["id"],
+        "plataforma": plataforma,
+        "productos": nuevos,
+        "diff": diff_productos(original, nuevos) if original is not None else None,
+    }
+
+
+def _replay_lote(lote: List[Dict]) -> List[Dict]:
+    """Unidad de trabajo del pool: un lote de filas del índice."""
+    return [_replay_snapshot(_worker_store, _worker_scrapers, snap) for snap in lote]
+
+
+def _lotes(snaps: Iterable[Dict], tam: int) -> Iterator[List[Dict]]:
+    lote = []
+    for snap in snaps:
+        lote.append(snap)
+        if len(lote) >= tam:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _ejecutar(store: SnapshotStore, snaps: Iterable[Dict], workers: int, lote: int) -> Iterator[Dict]:
+    if workers <= 1:
+        scrapers: Dict = {}
+        for snap in snaps:
+            yield _replay_snapshot(store, scrapers, snap)
+        return
+
+    # Ventana acotada de lotes en vuelo: el índice se lee en streaming
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(store.root,)) as pool:
+        pendientes = set()
+        for trozo in _lotes(snaps, lote):
+            pendientes.add(pool.submit(_replay_lote, trozo))
+            if len(pendientes) >= workers * 2:
+                hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    yield from futuro.result()
+        for futuro in pendientes:
+            yield from futuro.result()
+
+
+def _acumular(total: Dict, diff: Dict):
+    for clave in ("emparejados", "solo_original", "solo_nuevo"):
+        total[clave] += diff[clave]
+    for campo, estados in diff["campos"].items():
+        destino = total["campos"].setdefault(campo, Counter())
+        destino.update(estados)
+    for campo, ejemplos in diff["ejemplos"].items():
+        destino = total["ejemplos"].setdefault(campo, [])
+        destino.extend(ejemplos[:_EJEMPLOS_POR_CAMPO - len(destino)])
+
+
+def _escribir_csv(productos: List[Dict], path: str):
+    df = pd.DataFrame(productos).reindex(columns=COLUMNAS)
+    tmp = path + ".tmp"
+    df.to_csv(tmp, index=False, sep=";", encoding="utf-8-sig", quotechar='"',
+              quoting=csv.QUOTE_MINIMAL, lineterminator="\n", na_rep="")
+    os.replace(tmp, path)
+
+
+def replay(
+    store: SnapshotStore,
+    salida: str,
+    plataforma: Optional[str] = None,
+    job_id: Optional[str] = None,
+    desde: Optional[float] = None,
+    hasta: Optional[float] = None,
+    workers: Optional[int] = None,
+    lote: int = 16,
+    version: Optional[str] = None,
+) -> Dict:
+    """Re-extrae los snapshots seleccionados y escribe una nueva versión del dataset.
+
+    Devuelve el manifiesto de la versión (también en ``manifest.json``).
+    """
+    workers = workers or os.cpu_count() or 1
+    version = version or datetime.now().strftime("%Y%m%d-%H%M%S")
+    destino = os.path.join(salida, version)
+    os.makedirs(destino, exist_ok=True)
+
+    inicio = time.perf_counter()
+    snaps = store.iter_snapshots(plataforma=plataforma, job_id=job_id, desde=desde, hasta=hasta)
+    resultados = sorted(_ejecutar(store, snaps, workers, lote), key=lambda r: r["id"])
+
+    por_plataforma: Dict[str, List[Dict]] = defaultdict(list)
+    diffs: Dict[str, Dict] = {}
+    errores = []
+    for r in resultados:
+        if "error" in r:
+            errores.append({"id": r["id"], "error": r["error"]})
+            continue
+        por_plataforma[r["plataforma"]].extend(r["productos"])
+        if r["diff"] is not None:
+            total = diffs.setdefault(r["plataforma"], {
+                "emparejados": 0, "solo_original": 0, "solo_nuevo": 0, "campos": {}, "ejemplos": {},
+            })
+            _acumular(total, r["diff"])
+
+    archivos = {}
+    for plat, productos in por_plataforma.items():
+        archivos[plat] = os.path.join(destino, f"productos_{plat}.csv")
+        _escribir_csv(productos, archivos[plat])
+    for total in diffs.values():
+        total["campos"] = {c: dict(n) for c, n in sorted(total["campos"].items())}
+
+    manifest = {
+        "version": version,
+        "snapshots": len(resultados),
+        "errores": errores,
+        "productos": {p: len(v) for p, v in por_plataforma.items()},
+        "archivos": archivos,
+        "filtros": {"plataforma": plataforma, "job_id": job_id, "desde": desde, "hasta": hasta},
+        "workers": workers,
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+    with open(os.path.join(destino, "diff.json"), "w", encoding="utf-8") as fh:
+        json.dump(diffs, fh, indent=2, ensure_ascii=False, default=str)
+    with open(os.path.join(destino, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, ensure_ascii=False)
+    logging.info("Replay %s: %s snapshots, %s productos en %ss -> %s", version, len(resultados),
+                 sum(manifest["productos"].values()), manifest["segundos"], destino)
+    manifest["diff"] = diffs
+    return manifest
+
+
+def _fecha(texto: Optional[str]) -> Optional[float]:
+    return datetime.fromisoformat(texto).timestamp() if texto else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-extrae los snapshots HTML con el código actual.")
+    parser.add_argument("--plataforma")
+    parser.add_argument("--job", dest="job_id")
+    parser.add_argument("--desde", help="Fecha ISO (incluida)")
+    parser.add_argument("--hasta", help="Fecha ISO (excluida)")
+    parser.add_argument("--workers", type=int, help="Procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--lote", type=int, default=16, help="Snapshots por unidad de trabajo")
+    parser.add_argument("--salida", default=os.path.join("data", "replay"))
+    parser.add_argument("--snapshots", default=Config.SNAPSHOT_DIR, help="Carpeta del almacén")
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore(args.snapshots, retention_days=0, max_mb=0, dict_samples=0)
+    manifest = replay(store, args.salida, plataforma=args.plataforma, job_id=args.job_id,
+                      desde=_fecha(args.desde), hasta=_fecha(args.hasta),
+                      workers=args.workers, lote=args.lote)
+    print(json.dumps(manifest, indent=2, ensure_ascii=False, default=str))
+
+
+if __name__ == "__main__":
+    main()
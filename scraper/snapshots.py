@@ -0,0 +1,455 @@
+# scraper/snapshots.py
+"""Almacén de snapshots HTML direccionado por contenido.
+
+Cada página de resultados que procesa un scraper se guarda una sola vez por
+contenido (sha256 del HTML) y se indexa por plataforma/consulta/página/fecha
+y por el id de la tarea que la descargó, junto con los productos que se
+extrajeron de ella. Así se puede depurar un selector roto o regenerar datos
+sin volver a scrapear el sitio real.
+
+Disposición en disco (``Config.SNAPSHOT_DIR``):
+
+    index.sqlite                 índice (snapshots, blobs, diccionarios)
+    objects/ab/abcdef…           HTML comprimido, nombre = sha256 del original
+    dicts/<plataforma>-<n>.dict  diccionarios de compresión entrenados
+
+La compresión es zstd (paquete opcional ``zstandard``) con un diccionario
+entrenado por plataforma: las páginas de una misma plataforma comparten casi
+todo el marcado, así que el diccionario reduce mucho cada snapshot. Sin
+``zstandard`` se usa zlib con el diccionario como ``zdict``. Cada blob guarda
+el codec y el diccionario con que se escribió, de modo que reentrenar no
+invalida los snapshots antiguos.
+
+Retención: ``SNAPSHOT_RETENTION_DAYS`` (antigüedad) y ``SNAPSHOT_MAX_MB``
+(tamaño total comprimido); ``purge()`` corre como mucho una vez por hora y
+proceso al guardar, o a mano. ``save`` y ``purge`` son transacciones
+``BEGIN IMMEDIATE``, y los blobs huérfanos de menos de una hora no se borran:
+
+    python -m scraper.snapshots purgar
+    python -m scraper.snapshots entrenar aliexpress
+    python -m scraper.snapshots job <task_id>
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import closing, contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from config import Config
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depende del entorno
+    zstandard = None
+
+ZSTD = "zstd"
+ZLIB = "zlib"
+
+_ZLIB_DICT_BYTES = 32 * 1024  # zlib solo usa los últimos 32 KB del zdict
+_ZSTD_SAMPLE_BYTES = 4096
+_PURGE_INTERVAL = 3600.0
+_ORPHAN_GRACE = 3600.0  # un blob sin snapshots más reciente que esto puede estar a medio guardar
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    dict_id INTEGER,
+    size_raw INTEGER NOT NULL,
+    size_stored INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sha256 TEXT NOT NULL REFERENCES blobs(sha256),
+    job_id TEXT,
+    plataforma TEXT NOT NULL,
+    query TEXT,
+    pagina INTEGER,
+    url TEXT,
+    ts REAL NOT NULL,
+    n_productos INTEGER,
+    productos TEXT
+);
+CREATE INDEX IF NOT EXISTS snapshots_job ON snapshots(job_id);
+CREATE INDEX IF NOT EXISTS snapshots_plataforma_ts ON snapshots(plataforma, ts);
+CREATE INDEX IF NOT EXISTS snapshots_sha ON snapshots(sha256);
+CREATE TABLE IF NOT EXISTS dicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    plataforma TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    path TEXT NOT NULL,
+    muestras INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+def content_key(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+class SnapshotStore:
+    def __init__(
+        self,
+        root: str = Config.SNAPSHOT_DIR,
+        retention_days: float = Config.SNAPSHOT_RETENTION_DAYS,
+        max_mb: float = Config.SNAPSHOT_MAX_MB,
+        level: int = Config.SNAPSHOT_COMPRESSION_LEVEL,
+        dict_samples: int = Config.SNAPSHOT_DICT_SAMPLES,
+        dict_size: int = 110 * 1024,
+        codec: Optional[str] = None,
+        clock=time.time,
+    ):
+        self.root = root
+        self.retention_days = retention_days
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb else 0
+        self.level = level
+        self.dict_samples = dict_samples
+        self.dict_size = dict_size
+        self.codec = codec or (ZSTD if zstandard is not None else ZLIB)
+        if self.codec == ZSTD and zstandard is None:
+            raise ValueError("Codec zstd pedido pero el paquete zstandard no está instalado.")
+        self.clock = clock
+        self._dicts: Dict[int, bytes] = {}
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "dicts"), exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    # ----------------- sqlite / rutas -----------------
+
+    def _connect(self) -> sqlite3.Connection:
+        # Una conexión por operación: seguro entre hilos y procesos (fork de Celery)
+        db = sqlite3.connect(os.path.join(self.root, "index.sqlite"), timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    @contextmanager
+    def _immediate(self):
+        """Transacción que toma el cerrojo de escritura desde el principio.
+
+        ``save`` y ``purge`` comprueban y modifican blobs y snapshots dentro de
+        una de estas: otro worker no puede purgar un blob entre la comprobación
+        de ``save`` y la inserción del snapshot que lo referencia.
+        """
+        with closing(self._connect()) as db:
+            db.isolation_level = None
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.root, "objects", sha[:2], sha)
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    # ----------------- diccionarios -----------------
+
+    def _dict_bytes(self, dict_id: Optional[int]) -> Optional[bytes]:
+        if dict_id is None:
+            return None
+        with self._lock:
+            cached = self._dicts.get(dict_id)
+        if cached is not None:
+            return cached
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT path FROM dicts WHERE id = ?", (dict_id,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Diccionario {dict_id} no registrado")
+        with open(os.path.join(self.root, row["path"]), "rb") as fh:
+            data = fh.read()
+        with self._lock:
+            self._dicts[dict_id] = data
+        return data
+
+    def current_dict(self, plataforma: str) -> Optional[int]:
+        """Id del diccionario más reciente de la plataforma para el codec activo."""
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT id FROM dicts WHERE plataforma = ? AND codec = ? ORDER BY id DESC LIMIT 1",
+                (plataforma, self.codec),
+            ).fetchone()
+        return row["id"] if row else None
+
+    def train_dictionary(self, plataforma: str, muestras: Optional[int] = None) -> Optional[int]:
+        """Entrena un diccionario con los snapshots más recientes de la plataforma."""
+        muestras = muestras or self.dict_samples
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT DISTINCT sha256 FROM snapshots WHERE plataforma = ? ORDER BY ts DESC LIMIT ?",
+                (plataforma, muestras),
+            ).fetchall()
+        samples = [self.load(r["sha256"]).encode("utf-8") for r in rows]
+        if len(samples) < 2:
+            return None
+
+        if self.codec == ZSTD:
+            # El entrenador necesita muchas muestras pequeñas: trocea cada página
+            trozos = [s[i:i + _ZSTD_SAMPLE_BYTES] for s in samples for i in range(0, len(s), _ZSTD_SAMPLE_BYTES)]
+            try:
+                data = zstandard.train_dictionary(self.dict_size, trozos).as_bytes()
+            except zstandard.ZstdError as e:
+                logging.warning("No se pudo entrenar el diccionario zstd de %s: %s", plataforma, e)
+                return None
+        else:
+            # zlib: el marcado común (cabeceras, plantillas) va al final del zdict
+            data = b"".join(s[:4096] for s in samples)[-_ZLIB_DICT_BYTES:]
+
+        with closing(self._connect()) as db, db:
+            cur = db.execute(
+                "INSERT INTO dicts (plataforma, codec, path, muestras, created) VALUES (?, ?, '', ?, ?)",
+                (plataforma, self.codec, len(samples), self.clock()),
+            )
+            dict_id = cur.lastrowid
+            rel = os.path.join("dicts", f"{plataforma}-{dict_id}.dict")
+            self._write_atomic(os.path.join(self.root, rel), data)
+            db.execute("UPDATE dicts SET path = ? WHERE id = ?", (rel, dict_id))
+        logging.info("Diccionario %s de %s entrenado con %s snapshots (%s bytes)",
+                     dict_id, plataforma, len(samples), len(data))
+        return dict_id
+
+    # ----------------- compresión -----------------
+
+    def _compress(self, raw: bytes, dict_id: Optional[int]) -> bytes:
+        zdict = self._dict_bytes(dict_id)
+        if self.codec == ZSTD:
+            d = zstandard.ZstdCompressionDict(zdict) if zdict else None
+            return zstandard.ZstdCompressor(level=self.level, dict_data=d).compress(raw)
+        if zdict:
+            c = zlib.compressobj(min(self.level, 9), zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+        else:
+            c = zlib.compressobj(min(self.level, 9))
+        return c.compress(raw) + c.flush()
+
+    def _decompress(self, data: bytes, codec: str, dict_id: Optional[int]) -> bytes:
+        zdict = self._dict_bytes(dict_id)
+        if codec == ZSTD:
+            if zstandard is None:
+                raise RuntimeError("Snapshot zstd: instala el paquete zstandard para leerlo.")
+            d = zstandard.ZstdCompressionDict(zdict) if zdict else None
+            return zstandard.ZstdDecompressor(dict_data=d).decompress(data)
+        d = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+        return d.decompress(data) + d.flush()
+
+    # ----------------- API -----------------
+
+    def save(
+        self,
+        html: str,
+        plataforma: str,
+        query: Optional[str] = None,
+        pagina: Optional[int] = None,
+        job_id: Optional[str] = None,
+        url: Optional[str] = None,
+        productos: Optional[List[Dict]] = None,
+    ) -> str:
+        """Guarda el HTML (si no existía ya) y registra el snapshot; devuelve su sha256."""
+        sha = content_key(html)
+        now = self.clock()
+        # Comprimir fuera del cerrojo; dentro solo se comprueba y se inserta
+        with closing(self._connect()) as db:
+            existe = db.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha,)).fetchone()
+        preparado = None if existe else self._prepare_blob(html, plataforma)
+
+        with self._immediate() as db:
+            if not db.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha,)).fetchone():
+                # Nuevo, o purgado desde la comprobación de arriba
+                dict_id, raw, data = preparado or self._prepare_blob(html, plataforma)
+                self._write_atomic(self._blob_path(sha), data)
+                db.execute(
+                    "INSERT INTO blobs (sha256, codec, dict_id, size_raw, size_stored, created)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (sha, self.codec, dict_id, len(raw), len(data), now),
+                )
+            db.execute(
+                "INSERT INTO snapshots (sha256, job_id, plataforma, query, pagina, url, ts, n_productos, productos)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (sha, job_id, plataforma, query, pagina, url, now,
+                 len(productos) if productos is not None else None,
+                 json.dumps(productos, ensure_ascii=False, default=str) if productos is not None else None),
+            )
+            total = db.execute(
+                "SELECT COUNT(*) FROM snapshots WHERE plataforma = ?", (plataforma,)
+            ).fetchone()[0]
+
+        # Primer diccionario de la plataforma en cuanto hay muestras suficientes
+        if self.dict_samples and total % self.dict_samples == 0 and self.current_dict(plataforma) is None:
+            self.train_dictionary(plataforma)
+        if now - self._last_purge >= _PURGE_INTERVAL:
+            self._last_purge = now
+            self.purge()
+        return sha
+
+    def _prepare_blob(self, html: str, plataforma: str):
+        dict_id = self.current_dict(plataforma)
+        raw = html.encode("utf-8")
+        return dict_id, raw, self._compress(raw, dict_id)
+
+    def load(self, sha: str) -> str:
+        """HTML original de un snapshot."""
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT codec, dict_id FROM blobs WHERE sha256 = ?", (sha,)).fetchone()
+        if row is None:
+            raise KeyError(sha)
+        with open(self._blob_path(sha), "rb") as fh:
+            data = fh.read()
+        return self._decompress(data, row["codec"], row["dict_id"]).decode("utf-8")
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict:
+        data = dict(row)
+        if data.get("productos") is not None:
+            data["productos"] = json.loads(data["productos"])
+        return data
+
+    def by_job(self, job_id: str, productos: bool = False) -> List[Dict]:
+        """Snapshots de una tarea, en orden de página."""
+        columnas = "*" if productos else "id, sha256, job_id, plataforma, query, pagina, url, ts, n_productos"
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                f"SELECT {columnas} FROM snapshots WHERE job_id = ? ORDER BY pagina, id", (job_id,)
+            ).fetchall()
+        return [self._row(r) for r in rows]
+
+    def iter_snapshots(
+        self,
+        plataforma: Optional[str] = None,
+        job_id: Optional[str] = None,
+        desde: Optional[float] = None,
+        hasta: Optional[float] = None,
+    ) -> Iterator[Dict]:
+        """Recorre el índice (con los productos extraídos originalmente)."""
+        filtros, params = [], []
+        for columna, op, valor in (("plataforma", "=", plataforma), ("job_id", "=", job_id),
+                                   ("ts", ">=", desde), ("ts", "<", hasta)):
+            if valor is not None:
+                filtros.append(f"{columna} {op} ?")
+                params.append(valor)
+        where = " WHERE " + " AND ".join(filtros) if filtros else ""
+        with closing(self._connect()) as db:
+            for row in db.execute(f"SELECT * FROM snapshots{where} ORDER BY id", params):
+                yield self._row(row)
+
+    def stats(self) -> Dict:
+        with closing(self._connect()) as db:
+            snaps = db.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+            blobs, raw, stored = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_raw), 0), COALESCE(SUM(size_stored), 0) FROM blobs"
+            ).fetchone()
+        return {"snapshots": snaps, "blobs": blobs, "bytes_html": raw, "bytes_disco": stored,
+                "ratio": round(raw / stored, 2) if stored else None, "codec": self.codec}
+
+    def purge(self) -> Dict:
+        """Aplica la retención y borra los blobs que ya no referencia ningún snapshot.
+
+        Los huérfanos recientes (``_ORPHAN_GRACE``) se respetan, y los ficheros
+        se borran con el cerrojo de escritura tomado para que un ``save``
+        concurrente no pueda reutilizar un blob a medio borrar.
+        """
+        borrados = 0
+        with self._immediate() as db:
+            if self.retention_days:
+                corte = self.clock() - self.retention_days * 86400
+                borrados += db.execute("DELETE FROM snapshots WHERE ts < ?", (corte,)).rowcount
+            if self.max_bytes:
+                # Quita los snapshots más antiguos hasta caber en el presupuesto
+                while True:
+                    total = db.execute(
+                        "SELECT COALESCE(SUM(size_stored), 0) FROM blobs"
+                        " WHERE sha256 IN (SELECT sha256 FROM snapshots)"
+                    ).fetchone()[0]
+                    if total <= self.max_bytes:
+                        break
+                    viejo = db.execute("SELECT MIN(ts) FROM snapshots").fetchone()[0]
+                    if viejo is None:
+                        break
+                    borrados += db.execute("DELETE FROM snapshots WHERE ts <= ?", (viejo,)).rowcount
+            huerfanos = [r[0] for r in db.execute(
+                "SELECT sha256 FROM blobs WHERE created < ? AND sha256 NOT IN (SELECT sha256 FROM snapshots)",
+                (self.clock() - _ORPHAN_GRACE,),
+            )]
+            db.executemany("DELETE FROM blobs WHERE sha256 = ?", [(s,) for s in huerfanos])
+            for sha in huerfanos:
+                try:
+                    os.unlink(self._blob_path(sha))
+                except FileNotFoundError:
+                    pass
+        if borrados or huerfanos:
+            logging.info("Snapshots purgados: %s registros, %s blobs", borrados, len(huerfanos))
+        return {"snapshots": borrados, "blobs": len(huerfanos)}
+
+
+_store: Optional[SnapshotStore] = None
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Almacén configurado, o None si SNAPSHOTS_ENABLED está desactivado o no se puede crear."""
+    global _store
+    if _store is None and Config.SNAPSHOTS_ENABLED:
+        try:
+            _store = SnapshotStore()
+        except (OSError, sqlite3.Error) as e:
+            logging.warning("Snapshots desactivados: %s", e)
+    return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mantenimiento del almacén de snapshots HTML.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats")
+    sub.add_parser("purgar")
+    p_ent = sub.add_parser("entrenar", help="(Re)entrena el diccionario de una plataforma")
+    p_ent.add_argument("plataforma")
+    p_ent.add_argument("--muestras", type=int)
+    p_job = sub.add_parser("job", help="Snapshots de una tarea")
+    p_job.add_argument("job_id")
+    p_job.add_argument("--html", help="Carpeta donde volcar el HTML de cada página")
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore()
+    if args.cmd == "stats":
+        salida = store.stats()
+    elif args.cmd == "purgar":
+        salida = store.purge()
+    elif args.cmd == "entrenar":
+        salida = {"dict_id": store.train_dictionary(args.plataforma, args.muestras)}
+    else:
+        salida = store.by_job(args.job_id)
+        if args.html:
+            os.makedirs(args.html, exist_ok=True)
+            for snap in salida:
+                nombre = f"{snap['plataforma']}_p{snap['pagina']}_{snap['sha256'][:12]}.html"
+                with open(os.path.join(args.html, nombre), "w", encoding="utf-8") as fh:
+                    fh.write(store.load(snap["sha256"]))
+    print(json.dumps(salida, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# scraper/state.py
+"""Almacén clave/valor compartido entre workers (Redis) con respaldo en memoria."""
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from config import Config
+
+
+def _aplicar_hash(actual: dict, incr, assign, maximum, ewma, alpha: float):
+    """Misma semántica que el script Lua de ``RedisStore.update_hash``."""
+    for campo, valor in (incr or {}).items():
+        actual[campo] = actual.get(campo, 0) + valor
+    actual.update(assign or {})
+    for campo, valor in (maximum or {}).items():
+        if campo not in actual or valor > actual[campo]:
+            actual[campo] = valor
+    for campo, valor in (ewma or {}).items():
+        previo = actual.get(campo)
+        actual[campo] = valor if previo is None else alpha * valor + (1 - alpha) * previo
+
+
+class MemoryStore:
+    """Almacén en memoria del proceso; útil en tests y sin Redis."""
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get_json(self, key: str) -> Optional[dict]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+            return json.loads(value)
+
+    def set_json(self, key: str, value: dict, ttl: Optional[float] = None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (json.dumps(value), expires)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def set_nx(self, key: str, value: dict, ttl: Optional[float] = None) -> bool:
+        """Guarda `value` solo si `key` no existe; True si lo guardó."""
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (item[1] is None or item[1] > time.time()):
+                return False
+            self._data[key] = (json.dumps(value), expires)
+            return True
+
+    def delete_if(self, key: str, value: dict) -> bool:
+        """Borra `key` solo si sigue valiendo `value` (liberar un cerrojo propio)."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] != json.dumps(value):
+                return False
+            del self._data[key]
+            return True
+
+    def update_json(self, key: str, fn: Callable[[Optional[dict]], dict], ttl: Optional[float] = None) -> dict:
+        """Lee, transforma con `fn` y guarda sin que otro worker se cuele entre medias.
+
+        `fn` recibe el valor actual (o None) y devuelve el nuevo; puede llamarse
+        más de una vez si hay conflicto, así que no debe tener efectos laterales.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            actual = None
+            if item is not None and (item[1] is None or item[1] > time.time()):
+                actual = json.loads(item[0])
+            nuevo = fn(actual)
+            self._data[key] = (json.dumps(nuevo), time.time() + ttl if ttl else None)
+            return nuevo
+
+    def get_hash(self, key: str) -> Dict[str, float]:
+        return self.get_json(key) or {}
+
+    def update_hash(
+        self,
+        key: str,
+        incr: Optional[Dict[str, float]] = None,
+        assign: Optional[Dict[str, float]] = None,
+        maximum: Optional[Dict[str, float]] = None,
+        ewma: Optional[Dict[str, float]] = None,
+        alpha: float = 0.3,
+    ) -> Dict[str, float]:
+        """Aplica contadores campo a campo en una sola operación atómica.
+
+        `incr` suma, `assign` sobrescribe, `maximum` solo sube el campo y
+        `ewma` lo mezcla con su valor actual (peso `alpha` para el nuevo).
+        Los campos no mencionados no se tocan. Devuelve el hash resultante.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            actual = json.loads(item[0]) if item is not None else {}
+            _aplicar_hash(actual, incr, assign, maximum, ewma, alpha)
+            self._data[key] = (json.dumps(actual), None)
+            return actual
+
+
+class RedisStore:
+    """Almacén sobre Redis para compartir estado entre workers de Celery."""
+
+    # GET + DEL atómico: no borrar un cerrojo que ya expiró y tomó otro worker
+    _DELETE_IF = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+    return 0
+    """
+
+    # Contadores de un hash en un solo paso (ver update_hash)
+    _UPDATE_HASH = """
+    local key = KEYS[1]
+    local op = cjson.decode(ARGV[1])
+    for campo, valor in pairs(op.incr) do redis.call('hincrbyfloat', key, campo, valor) end
+    for campo, valor in pairs(op.assign) do redis.call('hset', key, campo, valor) end
+    for campo, valor in pairs(op.maximum) do
+        local previo = tonumber(redis.call('hget', key, campo))
+        if previo == nil or valor > previo then redis.call('hset', key, campo, valor) end
+    end
+    for campo, valor in pairs(op.ewma) do
+        local previo = tonumber(redis.call('hget', key, campo))
+        if previo ~= nil then valor = op.alpha * valor + (1 - op.alpha) * previo end
+        redis.call('hset', key, campo, valor)
+    end
+    return redis.call('hgetall', key)
+    """
+
+    def __init__(self, url: str, prefix: str = "dumping:"):
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(
+            url, socket_connect_timeout=1, socket_timeout=1
+        )
+
+    def get_json(self, key: str) -> Optional[dict]:
+        raw = self._client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set_json(self, key: str, value: dict, ttl: Optional[float] = None):
+        self._client.set(
+            self.prefix + key, json.dumps(value), ex=int(ttl) if ttl else None
+        )
+
+    def delete(self, key: str):
+        self._client.delete(self.prefix + key)
+
+    def set_nx(self, key: str, value: dict, ttl: Optional[float] = None) -> bool:
+        return bool(self._client.set(
+            self.prefix + key, json.dumps(value), nx=True, px=int(ttl * 1000) if ttl else None
+        ))
+
+    def delete_if(self, key: str, value: dict) -> bool:
+        return bool(self._client.eval(self._DELETE_IF, 1, self.prefix + key, json.dumps(value)))
+
+    def update_json(self, key: str, fn: Callable[[Optional[dict]], dict], ttl: Optional[float] = None) -> dict:
+        # WATCH/MULTI: si otro worker cambia la clave antes del EXEC, redis-py repite `fn`
+        clave = self.prefix + key
+
+        def transaccion(pipe):
+            raw = pipe.get(clave)
+            nuevo = fn(json.loads(raw) if raw else None)
+            pipe.multi()
+            pipe.set(clave, json.dumps(nuevo), ex=int(ttl) if ttl else None)
+            return nuevo
+
+        return self._client.transaction(transaccion, clave, value_from_callable=True)
+
+    def get_hash(self, key: str) -> Dict[str, float]:
+        raw = self._client.hgetall(self.prefix + key)
+        return {k.decode(): float(v) for k, v in raw.items()}
+
+    def update_hash(
+        self,
+        key: str,
+        incr: Optional[Dict[str, float]] = None,
+        assign: Optional[Dict[str, float]] = None,
+        maximum: Optional[Dict[str, float]] = None,
+        ewma: Optional[Dict[str, float]] = None,
+        alpha: float = 0.3,
+    ) -> Dict[str, float]:
+        # Lua: HINCRBYFLOAT y las comparaciones van en el servidor, sin huecos entre workers
+        op = {"incr": incr or {}, "assign": assign or {}, "maximum": maximum or {},
+              "ewma": ewma or {}, "alpha": alpha}
+        plano = self._client.eval(self._UPDATE_HASH, 1, self.prefix + key, json.dumps(op))
+        return {plano[i].decode(): float(plano[i + 1]) for i in range(0, len(plano), 2)}
+
+
+_store = None
+
+
+def get_store():
+    """Devuelve el almacén compartido del proceso (Redis si está configurado)."""
+    global _store
+    if _store is None:
+        url = Config.STATE_REDIS_URL
+        if url and url.startswith(("redis://", "rediss://")):
+            try:
+                _store = RedisStore(url)
+            except ImportError:
+                logging.warning("Paquete redis no disponible; usando estado en memoria")
+        if _store is None:
+            _store = MemoryStore()
+    return _store
@@ -6,86 +6,22 @@ from datetime import datetime
 from typing import Dict, List, Optional
 from urllib.parse import quote_plus
 
-from bs4 import BeautifulSoup
-from selenium.common.exceptions import (
-    TimeoutException,
-    NoSuchElementException,
-    StaleElementReferenceException,
-    WebDriverException,
-)
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+from . import normalization
 from .base import BaseScraper
+from .extraction import Campo, Spec, attr
 
 # ---------------- utilidades compartidas ----------------
 
-_RANGE_SPLIT_PATTERN = re.compile(r"(?<=\d)\s*[-–—]\s*(?=\d)")
-
 def limpiar_precio(texto: Optional[str]) -> Optional[float]:
-    def _normalizar(texto_unitario: str) -> Optional[float]:
-        cleaned = re.sub(r"[^0-9.,]", "", texto_unitario or "")
-        if not cleaned:
-            return None
-        decimal_sep: Optional[str] = None
-        has_dot = "." in cleaned
-        has_comma = "," in cleaned
-        if has_dot and has_comma:
-            decimal_sep = "," if cleaned.rfind(",") > cleaned.rfind(".") else "."
-        elif has_dot:
-            head, _, tail = cleaned.rpartition(".")
-            if len(tail) in (1, 2):
-                decimal_sep = "."
-        elif has_comma:
-            head, _, tail = cleaned.rpartition(",")
-            if len(tail) in (1, 2):
-                decimal_sep = ","
-        if decimal_sep:
-            int_part, dec_part = cleaned.rsplit(decimal_sep, 1)
-            int_digits = re.sub(r"[^0-9]", "", int_part)
-            dec_digits = re.sub(r"[^0-9]", "", dec_part)
-            if not int_digits and not dec_digits:
-                return None
-            number_str = f"{int_digits}.{dec_digits or '0'}"
-        else:
-            number_str = re.sub(r"[^0-9]", "", cleaned)
-            if not number_str:
-                return None
-        try:
-            return float(number_str)
-        except ValueError:
-            return None
-
-    if not texto:
-        return None
-    t = texto.strip()
-    if not t:
-        return None
-    if _RANGE_SPLIT_PATTERN.search(t):
-        partes = [p.strip() for p in _RANGE_SPLIT_PATTERN.split(t) if p.strip()]
-        cand = [(v, p) for p in partes if (v := _normalizar(p)) is not None]
-        if cand:
-            t = min(cand, key=lambda x: x[0])[1]
-        elif partes:
-            t = partes[0]
-    return _normalizar(t)
+    return normalization.limpiar_precio(texto, "temu")
 
 def limpiar_cantidad(texto: Optional[str]) -> int:
-    if texto is None:
-        return 0
-    t = texto.strip().lower().replace("+", "")
-    if not t:
-        return 0
-    mult = 1
-    if re.search(r"k\b", t):
-        mult = 1000
-        t = re.sub(r"k\b", "", t)
-    if "mil" in t:
-        mult = max(mult, 1000)
-        t = t.replace("mil", "")
-    n = limpiar_precio(t) or 0.0
-    return int(round(n * mult))
+    return normalization.limpiar_cantidad(texto, "temu")
 
 def _abs_link(href: str) -> str:
     if not href:
@@ -99,9 +35,32 @@ def _abs_link(href: str) -> str:
     return href
 
 
+def _solo_digitos(texto: Optional[str]) -> str:
+    return re.sub(r"[^\d]", "", texto or "")
+
+
+def _finalizar_card(d: Dict) -> Optional[Dict]:
+    """Descarta anuncios, aplica fallbacks de título y une entero + decimal del precio."""
+    if "anuncio" in (d["_anuncio"] or "").lower():
+        return None
+
+    d["titulo"] = d["titulo"] or d["_a_title"] or d["_a_texto"] or "Sin título"
+
+    entero, dec = _solo_digitos(d["_entero"]), _solo_digitos(d["_decimal"])
+    if entero or dec:
+        price_text = f"{entero}.{dec}" if entero and dec else (entero or f"0.{dec}")
+    else:
+        price_text = d["_precio_any"]
+    d["precio"] = limpiar_precio(price_text)
+    return d
+
+
 class TemuScraper(BaseScraper):
     """Scraper Temu actualizado (mismo patrón que AliExpress/Alibaba)."""
 
+    PLATAFORMA = "temu"
+    BASE_URL = "https://www.temu.com"
+
     # Contenedores de card (según HTML actualizado)
     CARD_CONTAINERS: List[str] = [
         "div._6q6qVUF5._1UrrHYym",  # wrapper principal de la card
@@ -145,6 +104,27 @@ class TemuScraper(BaseScraper):
     ]
     AD_BADGE: str = "div._2QlTgZaA"  # contiene el texto 'Anuncio' si es publicidad
 
+    # Spec declarativo de la card (ver scraper.extraction)
+    SPEC = Spec(
+        "temu",
+        CARD_CONTAINERS,
+        [
+            Campo("_anuncio", [AD_BADGE]),
+            Campo("titulo", TITLE),
+            Campo("_a_title", attr(A_CARD, "title") + ["@title"]),
+            Campo("_a_texto", A_CARD + [""]),
+            Campo("_entero", [PRICE_INTEGER]),
+            Campo("_decimal", [PRICE_DECIMAL]),
+            Campo("_precio_any", PRICE_ANY),
+            Campo("precio", []),  # lo calcula _finalizar_card
+            Campo("precio_original", PRICE_ORIGINAL, post=limpiar_precio),
+            Campo("descuento", DISCOUNT),
+            Campo("ventas", SOLD, post=lambda v: limpiar_cantidad(v or "")),
+            Campo("link", attr(A_CARD, "href") + ["@href"], post=_abs_link),
+        ],
+        finalizar=_finalizar_card,
+    )
+
     # ---------------- utilidades privadas ----------------
 
     def _accept_banners(self, timeout: int = 5):
@@ -179,16 +159,6 @@ class TemuScraper(BaseScraper):
             except Exception:
                 break
 
-    def _first_match(self, root, selectors: List[str]):
-        for css in selectors:
-            try:
-                el = root.find_element(By.CSS_SELECTOR, css)
-                if el:
-                    return el
-            except Exception:
-                continue
-        return None
-
     def _find_all_any(self, selectors: List[str], timeout: int = 10) -> List:
         for css in selectors:
             try:
@@ -202,148 +172,68 @@ class TemuScraper(BaseScraper):
                 continue
         return []
 
-    @staticmethod
-    def _node_text(node) -> Optional[str]:
-        if node is None:
-            return None
-        get_attribute = getattr(node, "get_attribute", None)
-        if callable(get_attribute):
-            return (get_attribute("innerText") or node.text or "").strip() or None
-        return None
-
-    def _resolve_price_text(self, card) -> Optional[str]:
-        """
-        Une los spans de precio entero y decimal si existen.
-        """
-        try:
-            entero_el = None
-            dec_el = None
-            try:
-                entero_el = card.find_element(By.CSS_SELECTOR, self.PRICE_INTEGER)
-            except Exception:
-                pass
-            try:
-                dec_el = card.find_element(By.CSS_SELECTOR, self.PRICE_DECIMAL)
-            except Exception:
-                pass
-
-            entero = re.sub(r"[^\d]", "", (entero_el.text if entero_el else "")).strip()
-            dec = re.sub(r"[^\d]", "", (dec_el.text if dec_el else "")).strip()
-
-            if entero or dec:
-                if entero and dec:
-                    return f"{entero}.{dec}"
-                if entero:
-                    return entero
-                return f"0.{dec}"
-
-            # Fallback: cualquier nodo de precio
-            any_price = None
-            for css in self.PRICE_ANY:
-                try:
-                    any_price = card.find_element(By.CSS_SELECTOR, css)
-                    if any_price:
-                        break
-                except Exception:
-                    continue
-            if any_price:
-                return (any_price.text or "").strip()
-        except Exception:
-            pass
-        return None
-
-    def _is_ad(self, card) -> bool:
-        # si aparece el badge "Anuncio", descartamos
-        try:
-            badge = card.find_element(By.CSS_SELECTOR, self.AD_BADGE)
-            if badge and "anuncio" in (badge.text or "").strip().lower():
-                return True
-        except Exception:
-            pass
-        return False
-
-    def _extract_card(self, card) -> Optional[Dict]:
-        try:
-            if self._is_ad(card):
-                return None
-
-            a = self._first_match(card, self.A_CARD) or card
-            link = _abs_link((a.get_attribute("href") or "").strip())
-
-            # Título
-            titulo_el = self._first_match(card, self.TITLE)
-            titulo = self._node_text(titulo_el) or (a.get_attribute("title") or a.text or "").strip() or "Sin título"
-
-            # Precio actual (entero+decimal unidos)
-            price_text = self._resolve_price_text(card)
-            precio = limpiar_precio(price_text)
-
-            # Precio original (tachado)
-            pori_el = self._first_match(card, self.PRICE_ORIGINAL)
-            precio_original = limpiar_precio(self._node_text(pori_el) if pori_el else None)
-
-            # Descuento si aparece (texto)
-            desc_el = self._first_match(card, self.DISCOUNT)
-            descuento = self._node_text(desc_el) if desc_el else None
-
-            # Ventas (8.3K+ventas -> 8300)
-            sold_el = self._first_match(card, self.SOLD)
-            ventas_txt = self._node_text(sold_el) if sold_el else None
-            ventas = limpiar_cantidad(ventas_txt or "")
-
-            return {
-                "titulo": titulo,
-                "precio": precio,
-                "precio_original": precio_original,
-                "descuento": descuento,
-                "ventas": ventas,
-                "link": link,
-            }
-        except (NoSuchElementException, StaleElementReferenceException):
-            return None
-        except Exception as e:
-            logging.error("Error extrayendo card Temu: %s", e)
-            return None
+    def _extract_from_html(self, page_source: str, page: int = 1) -> List[Dict]:
+        """Fallback sin driver: extrae las cards del HTML con el spec (lxml)."""
+        fecha = datetime.now().strftime("%Y-%m-%d")
+        resultados = self._extract_html(page_source)
+        for data in resultados:
+            data.update({"pagina": page, "plataforma": "Temu", "fecha_scraping": fecha})
+        return resultados
 
     # ---------------- flujo principal ----------------
 
-    def parse(self, producto: str, paginas: int = 4):
+    def search_url(self, producto: str, page: int = 1) -> str:
+        return f"{self._search_base()}/pe/search.html?search_key={quote_plus(producto)}&page={page}"
+
+    def parse(
+        self,
+        producto: str,
+        paginas: int = 4,
+        base_url: Optional[str] = None,
+        max_productos: Optional[int] = None,
+        min_nuevos: Optional[float] = None,
+    ):
+        if base_url:
+            self.base_url = base_url
+        paginacion = self._start_pagination(max_productos, min_nuevos)
         try:
             resultados: List[Dict] = []
 
             for page in range(1, paginas + 1):
-                q = quote_plus(producto)
-                url = f"https://www.temu.com/pe/search.html?search_key={q}&page={page}"
+                if self._circuit_open():
+                    break
+                url = self.search_url(producto, page)
                 logging.info("Cargando Temu: Página %s -> %s", page, url)
 
-                cargada = False
-                for intento in range(3):
-                    try:
-                        self.driver.get(url)
-                        self._accept_banners(4)
-                        WebDriverWait(self.driver, 15).until(
-                            EC.presence_of_any_elements_located(
-                                (By.CSS_SELECTOR, ", ".join(self.CARD_CONTAINERS))
-                            )
+                estado = self._load_results_page(
+                    url,
+                    lambda: WebDriverWait(self.driver, 15).until(
+                        EC.presence_of_any_elements_located(
+                            (By.CSS_SELECTOR, ", ".join(self.CARD_CONTAINERS))
                         )
-                        self._human_scroll_until_growth(max_scrolls=18, pause=1.0)
-                        cargada = True
-                        break
-                    except (TimeoutException, WebDriverException) as e:
-                        logging.warning("Reintento Temu p%s (%s): %s", page, intento + 1, e)
-                        time.sleep(1.0)
-
-                if not cargada:
+                    ),
+                    banners=4, scroll={"max_scrolls": 18, "pause": 1.0}, etiqueta=f"Temu p{page}",
+                )
+                if estado == self.PAGINA_FALLIDA:
                     logging.error("Omitiendo página %s por fallos de carga.", page)
+                    self._report_load_failure()
                     continue
+                if estado != self.PAGINA_OK:
+                    self._page_without_cards(producto, page, estado)
+                    break
 
-                # Selenium
-                bloques = self._find_all_any(self.CARD_CONTAINERS, timeout=8)
-                logging.info("Página %s: %s productos (candidatos via Selenium)", page, len(bloques))
+                self._report_page_ok()
 
+                # Extractor JS (una ida y vuelta); si no está disponible, card a card
+                fichas = self._extract_in_browser()
+                if not fichas:
+                    bloques = self._find_all_any(self.CARD_CONTAINERS, timeout=8)
+                    logging.info("Página %s: %s productos (candidatos via Selenium)", page, len(bloques))
+                    fichas = (self._extract_card(card) for card in bloques)
+
+                inicio = len(resultados)
                 count_page = 0
-                for card in bloques:
-                    data = self._extract_card(card)
+                for data in fichas:
                     if not data:
                         continue
                     data.update({
@@ -356,89 +246,15 @@ class TemuScraper(BaseScraper):
 
                 logging.info("Página %s: %s productos válidos (Selenium)", page, count_page)
 
-                # Fallback BeautifulSoup
+                # Fallback HTML
+                page_source = None
                 if count_page == 0:
                     page_source = getattr(self.driver, "page_source", "") or ""
-                    soup = BeautifulSoup(page_source, "html.parser")
-                    bs_cards: List = []
-                    for sel in self.CARD_CONTAINERS:
-                        bs_cards.extend(soup.select(sel) or [])
-
-                    for bloque in bs_cards:
-                        try:
-                            # skip Anuncio
-                            ad = bloque.select_one(self.AD_BADGE)
-                            if ad and "anuncio" in ad.get_text(" ", strip=True).lower():
-                                continue
-
-                            # link
-                            a = None
-                            for sel in self.A_CARD:
-                                a = bloque.select_one(sel)
-                                if a: break
-                            link = _abs_link(a.get("href", "") if a else "")
-
-                            # título
-                            titulo = None
-                            for tsel in self.TITLE:
-                                t = bloque.select_one(tsel)
-                                if t:
-                                    titulo = t.get_text(" ", strip=True)
-                                    break
-                            if not titulo and a:
-                                titulo = (a.get("title") or a.get_text(" ", strip=True) or "").strip()
-                            titulo = titulo or "Sin título"
-
-                            # precio (entero+decimal)
-                            entero = bloque.select_one(self.PRICE_INTEGER)
-                            dec = bloque.select_one(self.PRICE_DECIMAL)
-                            if entero or dec:
-                                e_txt = re.sub(r"[^\d]", "", entero.get_text() if entero else "")
-                                d_txt = re.sub(r"[^\d]", "", dec.get_text() if dec else "")
-                                ptxt = f"{e_txt}.{d_txt}" if (e_txt and d_txt) else (e_txt or (f"0.{d_txt}" if d_txt else ""))
-                            else:
-                                any_p = None
-                                for css in self.PRICE_ANY:
-                                    any_p = bloque.select_one(css)
-                                    if any_p: break
-                                ptxt = any_p.get_text(" ", strip=True) if any_p else None
-                            precio = limpiar_precio(ptxt)
-
-                            # precio original
-                            pori_tag = None
-                            for osel in self.PRICE_ORIGINAL:
-                                pori_tag = bloque.select_one(osel)
-                                if pori_tag: break
-                            precio_original = limpiar_precio(pori_tag.get_text(" ", strip=True) if pori_tag else None)
-
-                            # descuento
-                            dtag = None
-                            for dsel in self.DISCOUNT:
-                                dtag = bloque.select_one(dsel)
-                                if dtag: break
-                            descuento = dtag.get_text(" ", strip=True) if dtag else None
-
-                            # ventas
-                            sold = None
-                            for ssel in self.SOLD:
-                                sold = bloque.select_one(ssel)
-                                if sold: break
-                            ventas = limpiar_cantidad(sold.get_text(" ", strip=True) if sold else "")
-
-                            resultados.append({
-                                "pagina": page,
-                                "titulo": titulo,
-                                "precio": precio,
-                                "precio_original": precio_original,
-                                "descuento": descuento,
-                                "ventas": ventas,
-                                "link": link,
-                                "plataforma": "Temu",
-                                "fecha_scraping": datetime.now().strftime("%Y-%m-%d"),
-                            })
-                        except Exception:
-                            continue
-
-            return resultados
+                    resultados.extend(self._extract_from_html(page_source, page))
+                self._snapshot(producto, page, resultados[inicio:], page_source)
+                if not paginacion.registrar(page, resultados[inicio:]):
+                    break
+
+            return paginacion.recortar(resultados)
         finally:
-            self.close()
+            self._end_parse()
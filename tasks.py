@@ -1,8 +1,14 @@
 from celery import Celery
 import os
 import csv
+import random
+import re
+import time
 import pandas as pd
 from flask import Flask
+from kombu import Queue
+from celery.schedules import crontab
+from celery.signals import worker_process_init, task_postrun
 import logging
 import logging_config
 
@@ -11,6 +17,11 @@ from scraper.aliexpress_scraper import AliExpressScraper
 from scraper.temu_scraper import TemuScraper
 from scraper.alibaba_scraper import AlibabaScraper
 from scraper.madeinchina_scraper import MadeInChinaScraper
+from scraper.circuit_breaker import get_circuit_breaker
+from scraper.snapshots import get_snapshot_store
+from scraper import crawl
+import warmup
+from ml.predict import puntuar_productos
 
 flask_app = Flask(__name__)
 flask_app.config.from_object(Config)
@@ -28,31 +39,148 @@ SCRAPERS = {
     "madeinchina": (MadeInChinaScraper, "productos_madeinchina.csv"),
 }
 
-@celery_app.task(name="scrapear")
-def scrapear(producto: str, plataforma: str):
+# ================= Colas por plataforma y prioridad =================
+# Cada plataforma tiene dos carriles: `interactive` (peticiones de la UI) y
+# `batch` (backfills programados). Así se pueden dimensionar y escalar los
+# workers por plataforma y reservar capacidad para el carril interactivo
+# (p. ej. `celery -A tasks worker -Q scrape.alibaba.interactive`).
+DEFAULT_QUEUE = "celery"
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORIDADES = (INTERACTIVE, BATCH)
+
+
+def queue_for(plataforma: str, prioridad: str = INTERACTIVE) -> str:
+    """Nombre de la cola que atiende los scrapes de `plataforma` en ese carril."""
+    if plataforma not in SCRAPERS:
+        return DEFAULT_QUEUE
+    if prioridad not in PRIORIDADES:
+        prioridad = INTERACTIVE
+    return f"scrape.{plataforma}.{prioridad}"
+
+
+def worker_queues(plataformas=None, prioridades=PRIORIDADES) -> list:
+    """Colas para `-Q`, con las interactivas primero (se consumen en ese orden)."""
+    plataformas = plataformas or list(SCRAPERS)
+    return [queue_for(p, prio) for prio in prioridades for p in plataformas]
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    if name == "scrapear":
+        plataforma = kwargs.get("plataforma") or (args[1] if len(args) > 1 else None)
+        prioridad = kwargs.get("prioridad") or (args[2] if len(args) > 2 else INTERACTIVE)
+        return {"queue": queue_for(plataforma, prioridad)}
+    if name == "crawlear":
+        plataforma = kwargs.get("plataforma") or (args[0] if args else None)
+        return {"queue": queue_for(plataforma, BATCH)}
+    if name == "scrapear_lote":
+        # Los lotes van por defecto al carril batch
+        plataforma = kwargs.get("plataforma") or (args[1] if len(args) > 1 else None)
+        prioridad = kwargs.get("prioridad") or (args[2] if len(args) > 2 else BATCH)
+        return {"queue": queue_for(plataforma, prioridad)}
+    return None
+
+
+celery_app.conf.task_queues = [Queue(DEFAULT_QUEUE)] + [Queue(q) for q in worker_queues()]
+celery_app.conf.task_default_queue = DEFAULT_QUEUE
+celery_app.conf.task_routes = (route_task,)
+# Guarda cola/worker junto al resultado para poder consultarlos después
+celery_app.conf.result_extended = True
+# Un worker que escucha ambos carriles vacía primero las colas listadas antes
+# (las interactivas) en lugar de alternarlas en round-robin.
+celery_app.conf.broker_transport_options = {
+    "queue_order_strategy": "priority",
+    # Scrapes largos + acks tardíos: nunca por debajo de lo que puede durar un
+    # crawl, o el broker lo reentregaría a otro worker mientras sigue en marcha
+    "visibility_timeout": int(max(4 * 3600, crawl.duracion_maxima() + 3600)),
+}
+# Sin prefetch: un worker no acapara tareas batch mientras llegan interactivas
+celery_app.conf.worker_prefetch_multiplier = 1
+celery_app.conf.task_acks_late = True
+
+def limites_paginacion(paginas=None, max_productos=None, min_nuevos=None) -> dict:
+    """Argumentos de paginación para `parse()`, solo los que se indicaron."""
+    limites = {"paginas": paginas, "max_productos": max_productos, "min_nuevos": min_nuevos}
+    return {k: v for k, v in limites.items() if v is not None}
+
+
+@celery_app.task(name="scrapear", bind=True, max_retries=Config.CIRCUIT_BREAKER_MAX_RETRIES)
+def scrapear(
+    self,
+    producto: str,
+    plataforma: str,
+    prioridad: str = INTERACTIVE,
+    paginas: int = None,
+    max_productos: int = None,
+    min_nuevos: float = None,
+    puntuar: bool = None,
+):
     scraper_info = SCRAPERS.get(plataforma)
     if scraper_info is None:
         logging.error("Plataforma no soportada: %s", plataforma)
         return {"success": False, "message": "Plataforma no soportada."}
 
     scraper_cls, csv_name = scraper_info
-    logging.info("Ejecutando scraper %s para %s", plataforma, producto)
+
+    # Circuit breaker: si la plataforma está bloqueando, no arrancar Chrome
+    breaker = get_circuit_breaker()
+    if not breaker.allow(plataforma):
+        if self.request.retries >= self.max_retries:
+            logging.error("Plataforma %s bloqueada; tarea descartada tras %s reintentos",
+                          plataforma, self.request.retries)
+            return {"success": False, "message": "Plataforma bloqueada temporalmente."}
+        espera = breaker.retry_after(plataforma)
+        espera = max(espera, 1.0) * random.uniform(1.0, 1.2)  # jitter para no despertar todas a la vez
+        logging.warning("Circuit breaker abierto para %s; reprogramando en %.0fs", plataforma, espera)
+        raise self.retry(countdown=espera)
+
+    cola = (self.request.delivery_info or {}).get("routing_key") or queue_for(plataforma, prioridad)
+    logging.info("Ejecutando scraper %s para %s (cola %s, prioridad %s)",
+                 plataforma, producto, cola, prioridad)
 
     try:
         with scraper_cls() as scraper:
-            productos = scraper.parse(producto)
+            scraper.circuit_breaker = breaker.for_platform(plataforma)
+            scraper.snapshots = get_snapshot_store()
+            scraper.job_id = self.request.id
+            productos = scraper.parse(producto, **limites_paginacion(paginas, max_productos, min_nuevos))
+            paginacion = scraper.paginacion.resumen() if scraper.paginacion else None
     except Exception as e:
         logging.exception("Error al ejecutar scraper")
         return {"success": False, "message": str(e)}
 
-    output_dir = os.environ.get("OUTPUT_DIR", "/app/data")
-    os.makedirs(output_dir, exist_ok=True)
-    archivo_csv = os.path.join(output_dir, csv_name)
-
     if not productos:
         logging.warning("No se encontraron productos para %s en %s", producto, plataforma)
         return {"success": False, "message": "No se encontraron productos."}
 
+    productos = puntuar_si_procede(productos, producto, puntuar)
+    archivo_csv = guardar_csv(productos, csv_name)
+    logging.info("Scraping completado: %d productos -> %s (cola %s)", len(productos), archivo_csv, cola)
+    return {"success": True, "productos": productos, "archivo": archivo_csv,
+            "cola": cola, "prioridad": prioridad, "paginacion": paginacion}
+
+
+COLUMNAS_PUNTUACION = ["clase_nacional", "articulo_nacional", "similitud", "precio_local",
+                       "probabilidad_dumping", "puntuacion_anomalia", "decision"]
+
+
+def puntuar_si_procede(productos: list, consulta: str, puntuar: bool = None) -> list:
+    """Puntúa el resultado de un scrape si `puntuar` (o SCORE_AFTER_SCRAPE) lo pide.
+
+    Un fallo del modelo o del catálogo nacional no debe perder el scrape: se
+    registra y se devuelven los productos sin puntuar.
+    """
+    if not (Config.SCORE_AFTER_SCRAPE if puntuar is None else puntuar):
+        return productos
+    try:
+        return puntuar_productos(productos, consulta=consulta, modelo=Config.SCORE_MODEL)
+    except Exception:
+        logging.exception("No se pudo puntuar el resultado de %r; se guarda sin puntuación", consulta)
+        return productos
+
+
+def guardar_csv(productos: list, csv_name: str, subdir: str = "") -> str:
+    """Escribe los productos en OUTPUT_DIR/subdir con el formato común; devuelve la ruta final."""
     df = pd.DataFrame(productos)
 
     # Orden fijo de columnas
@@ -63,6 +191,8 @@ def scrapear(producto: str, plataforma: str):
         "moneda","proveedor","proveedor_anios","proveedor_pais","proveedor_verificado",
         "rating_score","rating_count","moq","moq_texto","envio_promesa","tasa_repeticion",
     ]
+    # Columnas de puntuación, solo si el scrape se puntuó (ver puntuar_si_procede)
+    cols += [c for c in COLUMNAS_PUNTUACION if c in df.columns]
 
     df = df.reindex(columns=cols)
 
@@ -76,9 +206,11 @@ def scrapear(producto: str, plataforma: str):
                      .str.strip()
             )
 
-    # Escritura atómica (delimitador ';' para no chocar con comas en títulos)
-    tmp_path = archivo_csv + ".tmp"
-    try:
+    def escribir(directorio):
+        # Escritura atómica (delimitador ';' para no chocar con comas en títulos)
+        os.makedirs(directorio, exist_ok=True)
+        archivo_csv = os.path.join(directorio, csv_name)
+        tmp_path = archivo_csv + ".tmp"
         df.to_csv(
             tmp_path,
             index=False,
@@ -90,25 +222,180 @@ def scrapear(producto: str, plataforma: str):
             na_rep=""
         )
         os.replace(tmp_path, archivo_csv)
-        logging.info("Scraping completado: %d productos -> %s", len(df), archivo_csv)
-        return {"success": True, "productos": productos, "archivo": archivo_csv}
+        return archivo_csv
 
+    output_dir = os.path.join(os.environ.get("OUTPUT_DIR", "/app/data"), subdir)
+    try:
+        return escribir(output_dir)
     except PermissionError as e:
-        logging.error("Sin permisos en %s: %s. Probando /tmp ...", archivo_csv, e)
-        fallback_dir = "/tmp/dumping-detector"
-        os.makedirs(fallback_dir, exist_ok=True)
-        fallback_csv = os.path.join(fallback_dir, csv_name)
-        tmp2 = fallback_csv + ".tmp"
-        df.to_csv(
-            tmp2,
-            index=False,
-            sep=";",                     # mantener el mismo delimitador
-            encoding="utf-8-sig",
-            quotechar='"',
-            quoting=csv.QUOTE_MINIMAL,
-            lineterminator="\n",
-            na_rep=""
-        )
-        os.replace(tmp2, fallback_csv)
+        logging.error("Sin permisos en %s: %s. Probando /tmp ...", output_dir, e)
+        fallback_csv = escribir(os.path.join("/tmp/dumping-detector", subdir))
         logging.info("Guardado por fallback: %s", fallback_csv)
-        return {"success": True, "productos": productos, "archivo": fallback_csv}
+        return fallback_csv
+
+
+# ================= Lotes de búsquedas en una sola sesión =================
+def _slug(texto: str) -> str:
+    return re.sub(r"[^\w-]+", "_", texto.strip().lower()).strip("_")[:60] or "consulta"
+
+
+@celery_app.task(name="scrapear_lote", bind=True)
+def scrapear_lote(
+    self,
+    productos: list,
+    plataforma: str,
+    prioridad: str = BATCH,
+    paginas: int = None,
+    max_productos: int = None,
+    min_nuevos: float = None,
+    puntuar: bool = None,
+):
+    """Scrapea una lista de búsquedas de una plataforma con un único navegador.
+
+    Cookies, consentimientos y caché se conservan entre búsquedas. Cada término
+    se guarda en su CSV (``OUTPUT_DIR/lotes/<task_id>/``, con su posición en el
+    lote delante del slug) en cuanto termina y el progreso se publica como
+    estado ``PROGRESS``; un término que falla se anota y el lote sigue (el
+    navegador solo se recrea si la sesión murió).
+    """
+    scraper_info = SCRAPERS.get(plataforma)
+    if scraper_info is None:
+        logging.error("Plataforma no soportada: %s", plataforma)
+        return {"success": False, "message": "Plataforma no soportada."}
+    scraper_cls, csv_name = scraper_info
+    terminos = list(dict.fromkeys(p.strip() for p in productos if p and p.strip()))
+    limites = limites_paginacion(paginas, max_productos, min_nuevos)
+    subdir = os.path.join("lotes", self.request.id or "local")
+    cola = (self.request.delivery_info or {}).get("routing_key") or queue_for(plataforma, prioridad)
+    logging.info("Lote de %s búsquedas en %s (cola %s)", len(terminos), plataforma, cola)
+
+    breaker = get_circuit_breaker()
+    resultados = []
+    try:
+        with scraper_cls() as scraper:
+            scraper.keep_session = True
+            scraper.circuit_breaker = breaker.for_platform(plataforma)
+            scraper.snapshots = get_snapshot_store()
+            scraper.job_id = self.request.id
+            for i, producto in enumerate(terminos):
+                item = {"producto": producto}
+                if not breaker.allow(plataforma):
+                    item.update(success=False, message="Plataforma bloqueada temporalmente.")
+                elif not scraper.ensure_alive():
+                    item.update(success=False, message="Navegador no disponible.")
+                else:
+                    try:
+                        encontrados = scraper.parse(producto, **limites)
+                        item["paginacion"] = scraper.paginacion.resumen() if scraper.paginacion else None
+                        item["n_productos"] = len(encontrados)
+                        if encontrados:
+                            encontrados = puntuar_si_procede(encontrados, producto, puntuar)
+                            # El índice evita que dos términos con el mismo slug se pisen
+                            nombre = csv_name.replace(".csv", f"_{i:03d}_{_slug(producto)}.csv")
+                            item.update(success=True, archivo=guardar_csv(encontrados, nombre, subdir))
+                        else:
+                            item.update(success=False, message="No se encontraron productos.")
+                    except Exception as e:
+                        logging.exception("Error en la búsqueda %r del lote", producto)
+                        item.update(success=False, message=str(e))
+                resultados.append(item)
+                if not self.request.is_eager:
+                    self.update_state(state="PROGRESS", meta={
+                        "hechos": i + 1, "total": len(terminos), "ultimo": item, "cola": cola,
+                    })
+    except Exception as e:
+        logging.exception("Error al iniciar el navegador del lote")
+        return {"success": False, "message": str(e), "resultados": resultados}
+
+    ok = sum(1 for r in resultados if r["success"])
+    logging.info("Lote completado en %s: %s/%s búsquedas con productos", plataforma, ok, len(terminos))
+    return {"success": ok > 0, "resultados": resultados, "total": len(terminos), "completados": ok,
+            "cola": cola, "prioridad": prioridad}
+
+
+# ================= Barrido nocturno de categorías =================
+@celery_app.task(name="crawlear", bind=True)
+def crawlear(self, plataforma: str, categorias: list = None, ronda: str = None, max_urls: int = None):
+    """Recorre las categorías de `plataforma` con la frontera persistente (ver scraper.crawl)."""
+    scraper_info = SCRAPERS.get(plataforma)
+    if scraper_info is None:
+        logging.error("Plataforma no soportada: %s", plataforma)
+        return {"success": False, "message": "Plataforma no soportada."}
+    scraper_cls, _ = scraper_info
+
+    breaker = get_circuit_breaker()
+    if not breaker.allow(plataforma):
+        # Lo pendiente queda en la frontera y la próxima ejecución lo arrastra a su ronda
+        logging.warning("Crawl de %s aplazado: circuit breaker abierto", plataforma)
+        return {"success": False, "message": "Plataforma bloqueada temporalmente."}
+
+    ronda = ronda or crawl.ronda_actual()
+    try:
+        # Una sola ejecución por plataforma: frontera, filtro de vistos y CSV son compartidos
+        with crawl.exclusivo(plataforma):
+            frontier, vistos = crawl.abrir(plataforma)
+            frontier.purgar(conservar=ronda, plataforma=plataforma)
+            with scraper_cls() as scraper:
+                scraper.circuit_breaker = breaker.for_platform(plataforma)
+                scraper.snapshots = get_snapshot_store()
+                scraper.job_id = self.request.id
+                crawler = crawl.Crawler(scraper, frontier, vistos, ronda, crawl.salida_csv(plataforma, ronda))
+                crawler.sembrar(categorias or Config.CRAWL_CATEGORIAS)
+                resumen = crawler.run(max_urls=max_urls, hasta=time.time() + Config.CRAWL_MAX_HOURS * 3600)
+    except crawl.CrawlEnCurso as e:
+        logging.warning("%s; esta ejecución termina sin hacer nada", e)
+        return {"success": False, "message": str(e), "plataforma": plataforma, "ronda": ronda}
+    except Exception as e:
+        logging.exception("Error en el crawl de %s", plataforma)
+        return {"success": False, "message": str(e)}
+
+    logging.info("Crawl %s ronda %s: %s páginas, %s productos nuevos",
+                 plataforma, ronda, resumen["paginas"], resumen["nuevos"])
+    return {"success": True, "plataforma": plataforma, "ronda": ronda, **resumen}
+
+
+if Config.CRAWL_HORA >= 0:
+    # `celery -A tasks beat` lanza cada noche un crawl por plataforma (carril batch)
+    celery_app.conf.beat_schedule = {
+        f"crawl-{plataforma}": {
+            "task": "crawlear",
+            "schedule": crontab(hour=Config.CRAWL_HORA, minute=0),
+            "args": (plataforma,),
+        }
+        for plataforma in SCRAPERS
+    }
+
+
+# ================= Precalentamiento de workers =================
+@worker_process_init.connect
+def _warm_worker_process(**kwargs):
+    warmup.start([scraper_cls for scraper_cls, _ in SCRAPERS.values()])
+
+
+@task_postrun.connect(sender=scrapear)
+@task_postrun.connect(sender=scrapear_lote)
+@task_postrun.connect(sender=crawlear)
+def _rewarm_after_scrape(**kwargs):
+    warmup.rewarm_browser()
+
+
+def encolar_scrape(producto: str, plataforma: str, prioridad: str = INTERACTIVE,
+                   puntuar: bool = None, **limites):
+    """Encola un scrape en el carril indicado; punto de entrada para UI y lotes.
+
+    `limites` admite `paginas`, `max_productos` y `min_nuevos` (ver scraper.pagination);
+    `puntuar` fuerza (o evita) la puntuación de dumping del resultado.
+    """
+    opciones = limites_paginacion(**limites)
+    if puntuar is not None:
+        opciones["puntuar"] = puntuar
+    return scrapear.delay(producto, plataforma, prioridad=prioridad, **opciones)
+
+
+def encolar_lote(productos: list, plataforma: str, prioridad: str = BATCH,
+                 puntuar: bool = None, **limites):
+    """Encola un lote de búsquedas de una plataforma (carril batch por defecto)."""
+    opciones = limites_paginacion(**limites)
+    if puntuar is not None:
+        opciones["puntuar"] = puntuar
+    return scrapear_lote.delay(productos, plataforma, prioridad=prioridad, **opciones)
@@ -1,4 +1,26 @@
 import os
 import sys
 
+import numpy as np
+import pandas as pd
+import pytest
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@pytest.fixture
+def dataset_dumping():
+    """Fábrica de datasets sintéticos con las columnas de ml/preprocessing.py."""
+    def crear(n=400, seed=0):
+        rng = np.random.default_rng(seed)
+        precio_local = rng.uniform(10, 80, n)
+        precio = precio_local * rng.uniform(0.1, 1.5, n)
+        df = pd.DataFrame({
+            "precio": precio,
+            "precio_local": precio_local,
+            "ratio_precio": precio / precio_local,
+            "plataforma": rng.choice(["Alibaba", "AliExpress"], n),
+        })
+        df["dumping_flag"] = (df["ratio_precio"] < 0.7).astype(int)
+        return df
+    return crear
@@ -2,7 +2,6 @@ import unittest
 from unittest.mock import patch, MagicMock, call
 from urllib.parse import quote_plus
 
-from bs4 import BeautifulSoup
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 
@@ -144,167 +143,29 @@ class TestAliExpressScraper(unittest.TestCase):
         self.assertEqual(resultados[0]["titulo"], "Producto móvil")
 
     @patch("scraper.aliexpress_scraper.BaseScraper.__init__", return_value=None)
-    def test_extract_card_handles_price_container(self, mock_base_init):
-        scraper = AliExpressScraper()
-
-        anchor = MagicMock()
-        anchor.text = "Producto"
-
-        def anchor_get_attribute(attr):
-            mapping = {"href": "https://example.com/item", "title": "Producto"}
-            return mapping.get(attr)
-
-        anchor.get_attribute.side_effect = anchor_get_attribute
-
-        price_container = MagicMock()
-        price_container.text = "US$ 12,34"
-        price_container.tag_name = "div"
-
-        price_spans = []
-        for text in ("US$", "12,34"):
-            span = MagicMock()
-            span.text = text
-            price_spans.append(span)
-
-        def price_get_attribute(attr):
-            mapping = {
-                "data-price": None,
-                "class": "ks_kn ks_le",
-                "innerText": "US$ 12,34",
-            }
-            return mapping.get(attr)
-
-        price_container.get_attribute.side_effect = price_get_attribute
-        price_container.find_elements.return_value = price_spans
-
-        pori_container = MagicMock()
-        pori_container.text = "US$ 15,00"
-        pori_container.tag_name = "div"
-
-        pori_spans = []
-        for text in ("US$", "15,00"):
-            span = MagicMock()
-            span.text = text
-            pori_spans.append(span)
-
-        def pori_get_attribute(attr):
-            mapping = {
-                "data-original-price": None,
-                "class": "ks_kw ks_kv",
-                "innerText": "US$ 15,00",
-            }
-            return mapping.get(attr)
-
-        pori_container.get_attribute.side_effect = pori_get_attribute
-        pori_container.find_elements.return_value = pori_spans
-
-        sold_el = MagicMock()
-
-        def sold_get_attribute(attr):
-            mapping = {"data-sold": "1.2k"}
-            return mapping.get(attr)
-
-        sold_el.get_attribute.side_effect = sold_get_attribute
-        sold_el.text = "1.2k vendidos"
-
-        card = MagicMock()
-        card.text = "1.2k vendidos"
-
-        sequence = iter([anchor, price_container, pori_container, None, sold_el])
-
-        def fake_first_match(root, selectors):
-            return next(sequence, None)
-
-        with patch.object(scraper, "_first_match", side_effect=fake_first_match):
-            resultado = scraper._extract_card(card)
-
-        self.assertIsNotNone(resultado)
-        self.assertAlmostEqual(resultado["precio"], 12.34)
-        self.assertAlmostEqual(resultado["precio_original"], 15.0)
-        self.assertEqual(resultado["ventas"], 1200)
-
-    @patch("scraper.aliexpress_scraper.BaseScraper.__init__", return_value=None)
-    def test_extract_card_handles_ks_lg_discount(self, mock_base_init):
-        scraper = AliExpressScraper()
-
-        anchor = MagicMock()
-        anchor.text = "Producto"
-
-        def anchor_get_attribute(attr):
-            mapping = {"href": "https://example.com/item", "title": "Producto"}
-            return mapping.get(attr)
-
-        anchor.get_attribute.side_effect = anchor_get_attribute
-
-        price_el = MagicMock()
-        price_el.text = "10,00"
-
-        def price_get_attribute(attr):
-            mapping = {"data-price": "10.00"}
-            return mapping.get(attr)
-
-        price_el.get_attribute.side_effect = price_get_attribute
-
-        pori_el = MagicMock()
-
-        def pori_get_attribute(attr):
-            mapping = {"data-original-price": "12.00"}
-            return mapping.get(attr)
-
-        pori_el.get_attribute.side_effect = pori_get_attribute
-        pori_el.text = "12,00"
-
-        discount_el = MagicMock()
-        discount_el.text = "-49%"
-
-        def discount_get_attribute(attr):
-            mapping = {"data-discount": None}
-            return mapping.get(attr)
-
-        discount_el.get_attribute.side_effect = discount_get_attribute
-
-        sold_el = MagicMock()
-
-        def sold_get_attribute(attr):
-            mapping = {"data-sold": "3"}
-            return mapping.get(attr)
-
-        sold_el.get_attribute.side_effect = sold_get_attribute
-        sold_el.text = "3 vendidos"
-
-        card = MagicMock()
-        card.text = ""
-
-        sequence = iter([anchor, price_el, pori_el, discount_el, sold_el])
-
-        def fake_first_match(root, selectors):
-            return next(sequence, None)
-
-        with patch.object(scraper, "_first_match", side_effect=fake_first_match):
-            resultado = scraper._extract_card(card)
-
-        self.assertIsNotNone(resultado)
-        self.assertEqual(resultado["descuento"], "-49%")
-
-    @patch("scraper.aliexpress_scraper.BaseScraper.__init__", return_value=None)
-    def test_resolve_price_text_with_bs_structure(self, mock_base_init):
+    def test_split_price_spans_are_joined(self, mock_base_init):
         scraper = AliExpressScraper()
 
         html = """
-        <div class="list-item">
+        <div class="search-item-card-wrapper-gallery">
+            <a href="//es.aliexpress.com/item/1.html" title="Camisa lino">Camisa lino</a>
             <div class="ks_kn">
                 <span class="ks_cv">US$</span>
                 <span class="ks_le">1.234,56</span>
             </div>
+            <div class="ks_kw">
+                <span>US$</span>
+                <span>1.500,00</span>
+            </div>
+            <span data-sold="1.2k">1.2k vendidos</span>
         </div>
         """
-        soup = BeautifulSoup(html, "html.parser")
-        bloque = soup.select_one("div.list-item")
-        price_tag = bloque.select_one(", ".join(scraper.PRICE))
-
-        precio = scraper._to_float(scraper._resolve_price_text(price_tag, "data-price"))
+        resultados = scraper._extract_html(html, scraper.CARD_CONTAINERS)
 
-        self.assertAlmostEqual(precio, 1234.56)
+        self.assertEqual(len(resultados), 1)
+        self.assertAlmostEqual(resultados[0]["precio"], 1234.56)
+        self.assertAlmostEqual(resultados[0]["precio_original"], 1500.0)
+        self.assertEqual(resultados[0]["ventas"], 1200)
 
     @patch("scraper.aliexpress_scraper.BaseScraper.__init__", return_value=None)
     def test_is_blocked_ignores_meta_robots(self, mock_base_init):
@@ -14,7 +14,7 @@ def client():
         yield client
 
 
-def dummy_run(producto, plataforma):
+def dummy_run(producto, plataforma, prioridad="interactive"):
     return {"success": True, "productos": [], "archivo": "file.csv"}
 
 
@@ -44,6 +44,29 @@ def test_resultado_endpoint_success(client):
     assert data["archivo"] == "file.csv"
 
 
+def test_scrape_endpoint_tags_batch_priority(client):
+    with patch("tasks.scrapear.delay") as mock_delay:
+        mock_delay.return_value.id = "abc"
+        response = client.post(
+            "/api/scrape",
+            json={"producto": "test", "plataforma": "temu", "prioridad": "batch"},
+        )
+    assert response.status_code == 202
+    data = response.get_json()
+    assert data["prioridad"] == "batch"
+    assert data["cola"] == "scrape.temu.batch"
+    mock_delay.assert_called_once_with("test", "temu", prioridad="batch")
+
+
+def test_scrape_endpoint_rejects_unknown_priority(client):
+    response = client.post(
+        "/api/scrape",
+        json={"producto": "test", "plataforma": "temu", "prioridad": "urgente"},
+    )
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
 def test_scrape_endpoint_missing_params(client):
     response = client.post(
         "/api/scrape", json={"producto": "test"}
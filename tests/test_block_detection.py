@@ -0,0 +1,46 @@
+from unittest.mock import MagicMock
+
+from scraper import block_detection
+
+
+def make_driver(url="https://www.aliexpress.com/w/wholesale-x.html", probe=None, html=""):
+    driver = MagicMock()
+    driver.current_url = url
+    driver.page_source = html
+    if isinstance(probe, Exception):
+        driver.execute_script.side_effect = probe
+    else:
+        driver.execute_script.return_value = probe
+    return driver
+
+
+def test_url_match_skips_browser_roundtrip():
+    driver = make_driver(url="https://www.aliexpress.com/punish?x5secdata=1")
+    assert block_detection.is_blocked(driver)
+    driver.execute_script.assert_not_called()
+
+
+def test_fast_probe_detects_title_and_captcha_widget():
+    by_title = make_driver(probe={"title": "Security Verification", "head": "", "tail": "", "captcha": False})
+    by_widget = make_driver(probe={"title": "AliExpress", "head": "slide to verify", "tail": "", "captcha": True})
+    assert block_detection.is_blocked(by_title)
+    assert block_detection.is_blocked(by_widget)
+
+
+def test_conclusive_fast_probe_never_reads_page_source():
+    driver = make_driver(probe={"title": "auriculares", "head": "US $7.99 1,000+ sold", "tail": "", "captcha": False})
+    type(driver).page_source = property(lambda self: (_ for _ in ()).throw(AssertionError("DOM completo")))
+    assert not block_detection.is_blocked(driver)
+
+
+def test_phrase_in_text_tail_is_detected():
+    driver = make_driver(probe={"title": "x", "head": "a" * 10, "tail": "Are you a robot?", "captcha": False})
+    assert block_detection.is_blocked(driver)
+
+
+def test_inconclusive_probe_falls_back_to_full_dom():
+    html = "<html><body><div class='h-captcha'></div></body></html>"
+    assert block_detection.is_blocked(make_driver(probe=RuntimeError("no js"), html=html))
+    assert block_detection.is_blocked(make_driver(probe=None, html=html))
+    robots = '<html><head><meta name="robots" content="punish"></head><body>ok</body></html>'
+    assert not block_detection.is_blocked(make_driver(probe=None, html=robots))
@@ -0,0 +1,200 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from scraper.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from scraper.state import MemoryStore, RedisStore
+import tasks
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(**kwargs):
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        store=MemoryStore(), threshold=3, cooldown=60, max_cooldown=600, clock=clock, **kwargs
+    )
+    return breaker, clock
+
+
+def test_opens_after_consecutive_failures():
+    breaker, _ = make_breaker()
+    for _ in range(2):
+        breaker.record_failure("aliexpress")
+    assert breaker.allow("aliexpress")
+
+    breaker.record_failure("aliexpress")
+    assert breaker.state("aliexpress") == OPEN
+    assert not breaker.allow("aliexpress")
+    assert breaker.retry_after("aliexpress") == 60
+    # Otras plataformas no se ven afectadas
+    assert breaker.allow("temu")
+
+
+def test_success_resets_failure_count():
+    breaker, _ = make_breaker()
+    breaker.record_failure("alibaba")
+    breaker.record_failure("alibaba")
+    breaker.record_success("alibaba")
+    breaker.record_failure("alibaba")
+    assert breaker.state("alibaba") == CLOSED
+
+
+def test_half_open_probe_closes_on_success():
+    breaker, clock = make_breaker()
+    for _ in range(3):
+        breaker.record_failure("alibaba")
+
+    clock.now += 61
+    assert breaker.allow("alibaba")  # sonda
+    assert breaker.state("alibaba") == HALF_OPEN
+    assert not breaker.allow("alibaba")  # solo una sonda a la vez
+
+    breaker.record_success("alibaba")
+    assert breaker.state("alibaba") == CLOSED
+    assert breaker.allow("alibaba")
+
+
+def test_half_open_probe_failure_reopens_with_longer_cooldown():
+    breaker, clock = make_breaker()
+    for _ in range(3):
+        breaker.record_failure("alibaba")
+
+    clock.now += 61
+    assert breaker.allow("alibaba")
+    breaker.record_failure("alibaba")
+
+    assert breaker.state("alibaba") == OPEN
+    assert breaker.retry_after("alibaba") == 120
+
+
+def test_store_errors_fail_open():
+    store = MagicMock()
+    store.get_json.side_effect = ConnectionError("redis caído")
+    breaker = CircuitBreaker(store=store)
+    assert breaker.allow("aliexpress")
+
+
+def test_scrapear_skips_browser_while_circuit_open():
+    breaker, _ = make_breaker()
+    for _ in range(3):
+        breaker.record_failure("temu")
+
+    scraper_cls = MagicMock()
+    with patch("tasks.get_circuit_breaker", return_value=breaker), \
+         patch.dict(tasks.SCRAPERS, {"temu": (scraper_cls, "productos_temu.csv")}), \
+         patch.object(tasks.scrapear, "max_retries", 0):
+        result = tasks.scrapear.apply(args=("camisa", "temu")).get()
+
+    assert result["success"] is False
+    scraper_cls.assert_not_called()
+
+
+class RacingStore(MemoryStore):
+    """Almacén que reproduce las carreras entre workers.
+
+    Con `lecturas` asignada, cada lectura del estado espera a las de los demás
+    hilos. `update_json` es optimista como WATCH/MULTI en Redis: lee sin
+    cerrojo, espera en `transacciones` (solo el primer intento de cada hilo)
+    y confirma solo si nadie escribió entre medias; si no, repite `fn`.
+    """
+
+    lecturas = None
+    transacciones = None
+
+    def __init__(self):
+        super().__init__()
+        self.esperas = 0
+        self.reintentos = 0
+
+    def _esperar(self, barrera):
+        if barrera is not None:
+            with self._lock:
+                self.esperas += 1
+            barrera.wait()
+
+    def get_json(self, key):
+        value = super().get_json(key)
+        if not key.endswith(":probe"):
+            self._esperar(self.lecturas)
+        return value
+
+    def update_json(self, key, fn, ttl=None):
+        primero = True
+        while True:
+            with self._lock:
+                item = self._data.get(key)
+            if primero:
+                self._esperar(self.transacciones)
+            nuevo = fn(json.loads(item[0]) if item is not None else None)
+            with self._lock:
+                if self._data.get(key) is item:
+                    self._data[key] = (json.dumps(nuevo), None)
+                    return nuevo
+                self.reintentos += 1
+            primero = False
+
+
+def _race(n, fn):
+    with ThreadPoolExecutor(n) as pool:
+        return list(pool.map(lambda _: fn(), range(n)))
+
+
+def test_only_one_concurrent_allow_becomes_the_probe():
+    clock = FakeClock()
+    store = RacingStore()
+    breaker = CircuitBreaker(store=store, threshold=1, cooldown=60, max_cooldown=600, clock=clock)
+    breaker.record_failure("temu")
+    assert breaker.state("temu") == OPEN
+
+    clock.now += 61
+    # Ambos leen "open vencido" antes de que ninguno reserve la sonda
+    store.lecturas = threading.Barrier(2, timeout=5)
+    resultados = _race(2, lambda: breaker.allow("temu"))
+    store.lecturas = None
+    assert store.esperas == 2
+    assert sorted(resultados) == [False, True]
+    assert breaker.state("temu") == HALF_OPEN
+
+
+def test_concurrent_failures_are_all_counted():
+    store = RacingStore()
+    breaker = CircuitBreaker(store=store, threshold=5, cooldown=60, max_cooldown=600, clock=FakeClock())
+    # Los 20 leen el mismo estado antes de que ninguno confirme
+    store.transacciones = threading.Barrier(20, timeout=5)
+    try:
+        _race(20, lambda: breaker.record_failure("temu"))
+    finally:
+        store.transacciones = None
+    assert store.esperas == 20 and store.reintentos > 0
+    estado = store.get_json("circuit:temu")
+    assert estado["failures"] == 20
+    # Una sola apertura aunque varios hilos cruzaran el umbral con estados viejos
+    assert estado["state"] == OPEN and estado["opens"] == 1
+
+
+def test_redis_update_json_retries_on_conflict():
+    fakeredis = pytest.importorskip("fakeredis")
+    store = RedisStore.__new__(RedisStore)
+    store.prefix, store._client = "test:", fakeredis.FakeRedis()
+    barrera = threading.Barrier(10, timeout=5)
+    llamadas = []
+
+    def sumar(actual):
+        llamadas.append(1)
+        if len(llamadas) <= 10:
+            barrera.wait()  # todos leen 0 antes del primer EXEC
+        return {"n": (actual or {"n": 0})["n"] + 1}
+
+    _race(10, lambda: store.update_json("contador", sumar))
+    assert store.get_json("contador") == {"n": 10}
+    assert len(llamadas) > 10  # WATCH detectó conflictos y redis-py repitió `fn`
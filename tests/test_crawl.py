@@ -0,0 +1,170 @@
+import csv
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import tasks
+from benchmarks import corpus
+from config import Config
+from scraper import crawl
+from scraper.crawl import BloomFilter, Crawler, Frontier
+from scraper.offline import new_scraper
+from scraper.state import MemoryStore
+from scraper.temu_scraper import TemuScraper
+
+
+class Reloj:
+    def __init__(self, t=1_000_000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+    def dormir(self, segundos):
+        self.t += segundos
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives(tmp_path):
+    vistos = BloomFilter(10_000, error=0.01, path=str(tmp_path / "vistos.bloom"))
+    tam = len(vistos._data)
+    assert sum(vistos.add(f"https://x/item/{i}") for i in range(10_000)) > 9_900
+    assert len(vistos._data) == tam  # la memoria no crece con los elementos
+
+    assert all(f"https://x/item/{i}" in vistos for i in range(10_000))
+    falsos = sum(f"https://y/otro/{i}" in vistos for i in range(10_000))
+    assert falsos < 300
+
+    vistos.save()
+    recargado = BloomFilter(10, path=str(tmp_path / "vistos.bloom"))
+    assert "https://x/item/42" in recargado and recargado.elementos == vistos.elementos
+    assert not recargado.add("https://x/item/42")
+
+
+def test_frontier_respects_priority_politeness_and_retries(tmp_path):
+    reloj = Reloj()
+    frontier = Frontier(str(tmp_path / "f.sqlite"), delay=10, max_intentos=2, clock=reloj)
+    frontier.push("r", "https://a.com/2", "temu", "camisa", 2, prioridad=2)
+    frontier.push("r", "https://a.com/1", "temu", "camisa", 1, prioridad=1)
+    frontier.push("r", "https://b.com/1", "temu", "polo", 1, prioridad=5)
+    assert not frontier.push("r", "https://a.com/1", "temu")  # ya en la frontera
+
+    assert frontier.pop("r")["url"] == "https://a.com/1"
+    assert frontier.pop("r")["url"] == "https://b.com/1"  # a.com en pausa de cortesía
+    assert frontier.pop("r") is None
+    assert 10 <= frontier.espera("r") <= 13
+
+    reloj.dormir(15)
+    assert frontier.pop("r")["url"] == "https://a.com/2"
+    assert frontier.reintentar("r", "https://a.com/2", espera=0)
+    reloj.dormir(15)
+    assert frontier.pop("r")["url"] == "https://a.com/2"
+    assert not frontier.reintentar("r", "https://a.com/2", espera=0)  # agotó los intentos
+    assert frontier.stats("r") == {"en_curso": 2, "error": 1}
+
+    assert frontier.reanudar("r") == 2
+    assert frontier.stats("r") == {"pendiente": 2, "error": 1}
+
+
+@pytest.fixture
+def crawler(tmp_path):
+    html = corpus.leer(next(corpus.paginas(plataforma="temu"))[0])
+    scraper = new_scraper(TemuScraper)
+    scraper.driver = MagicMock(page_source=html)
+    scraper._accept_banners = MagicMock()
+    scraper._human_scroll_until_growth = MagicMock()
+    reloj = Reloj()
+
+    def nuevo(ronda):
+        frontier = Frontier(str(tmp_path / "f.sqlite"), delay=5, clock=reloj)
+        vistos = BloomFilter(1000, path=str(tmp_path / "vistos.bloom"))
+        return Crawler(scraper, frontier, vistos, ronda, str(tmp_path / f"crawl_{ronda}.csv"),
+                       max_paginas=3, clock=reloj, sleep=reloj.dormir)
+
+    return nuevo
+
+
+@patch("scraper.crawl.block_detection.is_blocked", return_value=False)
+def test_crawl_writes_only_unseen_products_across_rounds(mock_blocked, crawler):
+    primera = crawler("2024-05-01")
+    assert primera.sembrar(["camisa", "polo"]) == 2
+    resumen = primera.run()
+
+    # 2 categorías x 3 páginas; la misma página repetida solo aporta productos la primera vez
+    assert resumen["paginas"] == 6
+    assert resumen["nuevos"] == resumen["vistos"] == resumen["productos"] // 6
+    with open(primera.salida, encoding="utf-8-sig") as fh:
+        filas = list(csv.DictReader(fh, delimiter=";"))
+    assert len(filas) == resumen["nuevos"] and filas[0]["plataforma"] == "Temu"
+
+    segunda = crawler("2024-05-02")
+    segunda.sembrar(["camisa"])
+    assert segunda.run(max_urls=2)["nuevos"] == 0
+
+
+@patch("scraper.crawl.block_detection.is_blocked", return_value=True)
+def test_blocked_pages_pause_the_host_and_are_retried(mock_blocked, crawler):
+    c = crawler("2024-05-01")
+    c.sembrar(["camisa"])
+    resumen = c.run(max_urls=1)
+    assert resumen["bloqueos"] == 1 and resumen["paginas"] == 0
+    assert c.frontier.stats("2024-05-01") == {"pendiente": 1}
+    assert c.frontier.espera("2024-05-01") >= c.bloqueo_espera
+
+
+def test_exclusive_lock_per_platform():
+    store = MemoryStore()
+    with crawl.exclusivo("temu", store=store):
+        with pytest.raises(crawl.CrawlEnCurso):
+            with crawl.exclusivo("temu", store=store):
+                pass
+        with crawl.exclusivo("alibaba", store=store):
+            pass
+    with crawl.exclusivo("temu", store=store):
+        pass
+
+
+def test_crawlear_exits_while_another_crawl_holds_the_lock():
+    store = MemoryStore()
+    scraper_cls = MagicMock()
+    with patch("scraper.crawl.get_store", return_value=store), \
+         patch.dict(tasks.SCRAPERS, {"temu": (scraper_cls, "productos_temu.csv")}), \
+         patch("tasks.crawl.abrir") as abrir, \
+         crawl.exclusivo("temu"):
+        result = tasks.crawlear.apply(args=("temu",)).get()
+
+    assert result["success"] is False and "en curso" in result["message"]
+    abrir.assert_not_called()
+    scraper_cls.assert_not_called()
+
+
+def test_visibility_timeout_outlasts_the_longest_crawl():
+    timeout = tasks.celery_app.conf.broker_transport_options["visibility_timeout"]
+    assert timeout > crawl.duracion_maxima() > Config.CRAWL_MAX_HOURS * 3600
+
+
+def test_pending_urls_carry_over_to_the_next_round(tmp_path):
+    frontier = Frontier(str(tmp_path / "f.sqlite"), delay=0, clock=Reloj())
+    frontier.push("2024-05-01", "https://a.com/1", "temu", "camisa", 1)
+    frontier.push("2024-05-01", "https://a.com/2", "temu", "camisa", 2)
+    frontier.push("2024-05-01", "https://a.com/3", "temu", "camisa", 3)
+    frontier.push("2024-05-01", "https://b.com/1", "alibaba", "camisa", 1)
+    frontier.hecho("2024-05-01", frontier.pop("2024-05-01")["url"])
+    frontier.pop("2024-05-01")  # en curso cuando se cortó la ronda
+
+    assert frontier.purgar(conservar="2024-05-02", plataforma="temu") == {"arrastradas": 2, "borradas": 3}
+    assert frontier.stats("2024-05-02") == {"pendiente": 2}
+    assert frontier.pop("2024-05-02")["pagina"] == 2
+    # La ronda sin terminar de otra plataforma sigue intacta
+    assert frontier.stats("2024-05-01") == {"pendiente": 1}
+
+
+@patch("scraper.crawl.block_detection.is_blocked", return_value=False)
+def test_seen_filter_is_saved_with_every_page_written(mock_blocked, crawler):
+    c = crawler("2024-05-01")
+    c.sembrar(["camisa"])
+    # Solo procesar(), sin el guardado final de run(): como un worker que muere tras la página
+    c.procesar(c.frontier.pop("2024-05-01"))
+    assert c.stats["nuevos"] > 0
+
+    siguiente = crawler("2024-05-02")
+    assert siguiente.vistos.elementos == c.stats["nuevos"]
@@ -0,0 +1,95 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from ml.data_cache import DataCache, TIPOS_PLATAFORMA, aplicar_tipos
+
+CSV = "titulo;precio;plataforma\nCamisa lino;12.5;Alibaba\nPantalón;n/a;\nPolo;3;AliExpress\n"
+
+
+def _lector(path):
+    return aplicar_tipos(pd.read_csv(path, sep=";"), TIPOS_PLATAFORMA)
+
+
+def test_artifact_is_reused_until_source_content_changes(tmp_path):
+    fuente = tmp_path / "productos.csv"
+    fuente.write_text(CSV, encoding="utf-8")
+    cache = DataCache(str(tmp_path / "cache"))
+    lector = MagicMock(side_effect=_lector)
+
+    primero = cache.leer(str(fuente), lector, "plataforma")
+    segundo = cache.leer(str(fuente), lector, "plataforma")
+    assert lector.call_count == 1
+    pd.testing.assert_frame_equal(primero, segundo)
+
+    os.utime(fuente, (0, 0))  # tocar el archivo sin cambiar el contenido no invalida
+    cache.leer(str(fuente), lector, "plataforma")
+    assert lector.call_count == 1
+
+    fuente.write_text(CSV + "Chompa;20;Temu\n", encoding="utf-8")
+    tercero = cache.leer(str(fuente), lector, "plataforma")
+    assert lector.call_count == 2 and len(tercero) == 4
+    assert len(os.listdir(tmp_path / "cache")) == 1  # la versión anterior se borró
+
+
+def test_artifacts_keep_explicit_dtypes(tmp_path):
+    fuente = tmp_path / "productos.csv"
+    fuente.write_text(CSV, encoding="utf-8")
+    cache = DataCache(str(tmp_path / "cache"))
+    cache.leer(str(fuente), _lector, "plataforma")
+    df = cache.leer(str(fuente), _lector, "plataforma")
+    assert df["precio"].dtype == "float64" and df["precio"].isna().sum() == 1
+    assert isinstance(df["plataforma"].dtype, pd.CategoricalDtype)
+    assert list(df["plataforma"].cat.categories) == ["AliExpress", "Alibaba"]
+    assert df["titulo"].tolist() == ["Camisa lino", "Pantalón", "Polo"]
+
+
+def test_unreadable_artifact_is_regenerated(tmp_path):
+    fuente = tmp_path / "productos.csv"
+    fuente.write_text(CSV, encoding="utf-8")
+    cache = DataCache(str(tmp_path / "cache"))
+    cache.leer(str(fuente), _lector, "plataforma")
+    (artefacto,) = (tmp_path / "cache").iterdir()
+    artefacto.write_bytes(b"corrupto")
+    assert len(cache.leer(str(fuente), _lector, "plataforma")) == 3
+
+
+def test_parquet_is_the_default_format(tmp_path):
+    fuente = tmp_path / "productos.csv"
+    fuente.write_text(CSV, encoding="utf-8")
+    cache = DataCache(str(tmp_path / "cache"))
+    cache.leer(str(fuente), _lector, "plataforma")
+    (artefacto,) = (tmp_path / "cache").iterdir()
+    assert artefacto.suffix == ".parquet"
+
+
+def test_same_file_name_in_other_directory_keeps_its_own_artifact(tmp_path):
+    cache = DataCache(str(tmp_path / "cache"))
+    fuentes = []
+    for carpeta, extra in (("data", ""), ("tmp", "Chompa;20;Temu\n")):
+        (tmp_path / carpeta).mkdir()
+        fuente = tmp_path / carpeta / "productos_temu.csv"
+        fuente.write_text(CSV + extra, encoding="utf-8")
+        fuentes.append(str(fuente))
+    lector = MagicMock(side_effect=_lector)
+
+    for _ in range(2):
+        assert [len(cache.leer(f, lector, "plataforma")) for f in fuentes] == [3, 4]
+    assert lector.call_count == 2  # la segunda vuelta sale entera de la caché
+    assert len(os.listdir(tmp_path / "cache")) == 2
+
+
+def test_cleanup_ignores_temporary_and_vanished_files(tmp_path):
+    fuente = tmp_path / "productos.csv"
+    fuente.write_text(CSV, encoding="utf-8")
+    cache = DataCache(str(tmp_path / "cache"))
+    cache.leer(str(fuente), _lector, "plataforma")
+    (artefacto,) = (tmp_path / "cache").iterdir()
+    en_curso = artefacto.with_name(artefacto.name + ".tmp")  # escritura de otro proceso
+    en_curso.write_bytes(b"")
+
+    fuente.write_text(CSV + "Chompa;20;Temu\n", encoding="utf-8")
+    with patch("ml.data_cache.os.remove", side_effect=FileNotFoundError):
+        assert len(cache.leer(str(fuente), _lector, "plataforma")) == 4
+    assert en_curso.exists()
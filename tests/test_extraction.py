@@ -0,0 +1,116 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from benchmarks import corpus
+from scraper.aliexpress_scraper import AliExpressScraper
+from scraper.extraction import EXISTE, FILAS, PIEZAS, Campo, Spec, attr, compile_spec
+from scraper.offline import new_scraper
+
+HTML = """
+<html><body>
+  <div class="card" data-id="1">
+    <a class="t" href="/p/1" title="Titulo attr">  Producto
+       uno </a>
+    <div class="precio"><span>US $</span> <span>7</span><span>.99</span></div>
+    <span class="badge"></span>
+    <div class="fila"><b class="k">Talla:</b><i class="v">M</i></div>
+    <div class="fila"><b class="k">Color:</b></div>
+  </div>
+  <div class="card" data-id="2">
+    <a href="/p/2"></a>
+    <div class="precio">S/ 10</div>
+  </div>
+  <div class="card"><span class="anuncio">x</span></div>
+</body></html>
+"""
+
+
+def _spec():
+    def finalizar(d):
+        if d["_anuncio"]:
+            return None
+        d["titulo"] = d["titulo"] or "Sin título"
+        return d
+
+    return Spec(
+        "prueba",
+        ["div.no-existe", "div.card"],
+        [
+            Campo("titulo", ["h3", "a.t"]),
+            Campo("link", attr(["a"], "href")),
+            Campo("id", ["@data-id"], post=lambda v: int(v) if v else None),
+            Campo("precio", ["div.precio"], tipo=PIEZAS),
+            Campo("badge", [".nada", ".badge"], tipo=EXISTE),
+            Campo("atributos", [".fila"], tipo=FILAS, sub={"k": [".k"], "v": [".v"]}),
+            Campo("_anuncio", [".anuncio"], tipo=EXISTE),
+        ],
+        finalizar=finalizar,
+    )
+
+
+def test_spec_html_applies_fallbacks_attributes_and_finalizar():
+    resultados = compile_spec(_spec()).extract_html(HTML)
+
+    assert len(resultados) == 2  # la tercera card es un anuncio
+    uno, dos = resultados
+    assert uno == {
+        "titulo": "Producto uno",
+        "link": "/p/1",
+        "id": 1,
+        "precio": "US $7.99",
+        "badge": True,
+        "atributos": [{"k": "Talla:", "v": "M"}, {"k": "Color:", "v": None}],
+    }
+    assert dos["titulo"] == "Sin título"
+    assert dos["precio"] == "S/ 10"
+    assert dos["badge"] is False and dos["atributos"] == []
+
+
+def test_driver_path_shares_post_processing_with_lxml():
+    spec = _spec()
+    compilado = compile_spec(spec)
+    doc_cards = compilado.cards_html(HTML)
+    crudos = [compilado._crudo_lxml(c) for c in doc_cards]
+
+    driver = MagicMock()
+    driver.execute_script.return_value = crudos
+    assert compilado.extract_driver(driver) == compilado.extract_html(HTML)
+    assert driver.execute_script.call_count == 1
+
+
+def test_driver_path_reports_unavailable_extractor():
+    compilado = compile_spec(_spec())
+    roto = MagicMock()
+    roto.execute_script.side_effect = RuntimeError("sin javascript")
+    assert compilado.extract_driver(roto) is None
+    # Un driver simulado devuelve un MagicMock: los scrapers caen a la ruta Selenium
+    assert compilado.extract_driver(MagicMock()) is None
+
+
+def test_aliexpress_spec_matches_legacy_fallback_fields():
+    html = """
+    <div class="list-item">
+        <a href="//example.com/item" title="Producto">Producto</a>
+        <div class="ks_kn"><span class="ks_cv">US$</span><span class="ks_le">1.234,56</span></div>
+        <span class="ks_lg">-49%</span>
+        <div class="card-text">3 vendidos</div>
+    </div>
+    """
+    scraper = new_scraper(AliExpressScraper)
+    [data] = scraper._extract_from_html(html, page=2)
+
+    assert data["link"] == "https://example.com/item"
+    assert data["titulo"] == "Producto"
+    assert data["precio"] == pytest.approx(1234.56)
+    assert data["descuento"] == "-49%"
+    assert data["ventas"] == 3  # del texto de la card
+    assert data["pagina"] == 2
+
+
+@pytest.mark.parametrize("plataforma", corpus.PLATAFORMAS)
+def test_every_scraper_declares_a_compilable_spec(plataforma):
+    scraper_cls = corpus.scraper_cls(plataforma)
+    assert scraper_cls.SPEC is not None
+    assert scraper_cls.SPEC.plataforma == plataforma
+    assert compile_spec(scraper_cls.SPEC) is compile_spec(scraper_cls.SPEC)
@@ -0,0 +1,44 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.compiled import CompiledPipeline, NotCompilable
+from ml.predict import NUMERICAS, get_registry, predict_dumping
+
+PRECIOS = [0.5, 3.0, 9.99, 25.0, 120.0]
+LOCALES = [1.0, 18.0, 45.5, 300.0]
+PLATAFORMAS = ["AliExpress", "Alibaba", "Temu"]  # Temu no estaba en el entrenamiento
+
+
+@pytest.mark.parametrize("modelo", ["xgboost", "logistica"])
+def test_compiled_path_matches_sklearn_pipeline(modelo):
+    pipeline = get_registry().get(modelo)
+    rapido = CompiledPipeline(pipeline, NUMERICAS)
+
+    filas = [
+        {"precio": p, "precio_local": l, "ratio_precio": p / l, "plataforma": plat}
+        for p, l, plat in itertools.product(PRECIOS, LOCALES, PLATAFORMAS)
+    ]
+    esperado = pipeline.predict_proba(pd.DataFrame(filas))[:, 1]
+    obtenido = [rapido.predict_proba_one((f["precio"], f["precio_local"], f["ratio_precio"]), f["plataforma"])
+                for f in filas]
+    np.testing.assert_allclose(obtenido, esperado, atol=1e-6)
+
+
+def test_predict_dumping_uses_compiled_path_when_available():
+    registry = get_registry()
+    assert registry.compiled("xgboost") is not None
+    assert registry.compiled("randomforest") is None
+    assert registry.compiled("isolation") is None
+
+    resultado = predict_dumping(10.0, 40.0, "AliExpress")
+    pipeline = registry.get("xgboost")
+    X = pd.DataFrame([{"precio": 10.0, "precio_local": 40.0, "ratio_precio": 0.25, "plataforma": "AliExpress"}])
+    assert resultado["probabilidad_dumping"] == round(float(pipeline.predict_proba(X)[0, 1]), 3)
+
+
+def test_unsupported_objects_are_not_compiled():
+    with pytest.raises(NotCompilable):
+        CompiledPipeline({"version": 1}, NUMERICAS)
@@ -0,0 +1,46 @@
+import pytest
+
+from benchmarks import corpus, run
+from scraper import block_detection
+from scraper.offline import extract_offline, new_scraper
+
+PAGINAS = list(corpus.paginas())
+
+
+def test_corpus_matches_manifest():
+    assert corpus.verificar() == []
+    assert {meta["plataforma"] for _, meta in PAGINAS} == set(corpus.PLATAFORMAS)
+
+
+@pytest.mark.parametrize("rel, meta", PAGINAS, ids=[rel for rel, _ in PAGINAS])
+def test_offline_extraction_yields_expected_cards(rel, meta):
+    scraper = new_scraper(corpus.scraper_cls(meta["plataforma"]))
+    productos = extract_offline(scraper, corpus.leer(rel), page=3)
+
+    assert len(productos) == meta["cards"]
+    assert all(p["pagina"] == 3 for p in productos)
+    assert all(p["titulo"] and p["titulo"] != "Sin título" for p in productos)
+    assert all(p["precio"] and p["precio"] > 0 for p in productos)
+    assert all(p["link"].startswith("https://") for p in productos)
+
+
+@pytest.mark.parametrize("rel, meta", list(corpus.paginas(bloqueadas=True)))
+def test_captcha_pages_are_detected_from_page_source(rel, meta):
+    class Driver:
+        current_url = "https://example.com/search"
+        page_source = corpus.leer(rel)
+
+    assert block_detection.full_dom_check(Driver())
+
+
+def test_benchmark_report_is_json_comparable():
+    resultado = {"meta": {}, "extraccion": run.bench_extraccion(repeticiones=1)}
+
+    for rel, meta in PAGINAS:
+        fila = resultado["extraccion"][rel]
+        assert fila["cards"] == fila["cards_esperadas"] == meta["cards"]
+        assert fila["cards_por_segundo"] > 0
+        assert fila["memoria_pico_kb"] > 0
+
+    comparacion = run.comparar(resultado, resultado)
+    assert comparacion and all(f["ratio"] == 1.0 for f in comparacion)
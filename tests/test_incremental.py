@@ -0,0 +1,103 @@
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+
+from ml import incremental
+from ml.data_cache import DataCache
+from ml.predict import ModelRegistry
+from ml.training import train_all_models
+
+
+def _particion(directorio, nombre, precios):
+    filas = [{"titulo": f"Camisa slim {i}" if i % 2 else f"Chino pants {i}", "precio": p,
+              "link": f"https://x/{nombre}/{i}", "plataforma": "AliExpress"} for i, p in enumerate(precios)]
+    pd.DataFrame(filas).to_csv(directorio / nombre, sep=";", index=False, encoding="utf-8-sig")
+
+
+@pytest.fixture
+def entorno(tmp_path, dataset_dumping):
+    modelos, crawl = tmp_path / "ml", tmp_path / "crawl"
+    modelos.mkdir()
+    crawl.mkdir()
+    train_all_models(dataset_dumping(), nucleos=1, model_dir=str(modelos))
+    with patch("ml.data_cache._cache", DataCache(str(tmp_path / "cache"))):
+        yield modelos, crawl
+
+
+def test_only_partitions_after_the_watermark_are_ingested(entorno):
+    modelos, crawl = entorno
+    _particion(crawl, "aliexpress_2024-05-01.csv", [5, 8, 90, 120] * 5)
+    _particion(crawl, "temu_2024-05-02.csv", [4, 100] * 5)
+    _particion(crawl, "temu_2024-05-03.csv", [3, 150] * 5)  # "hoy": el crawl aún escribe
+    (crawl / "notas.csv").write_text("x")
+
+    xgb_antes = ModelRegistry(str(modelos)).get("xgboost").named_steps["clf"].get_booster().num_boosted_rounds()
+    resumen = incremental.actualizar(model_dir=str(modelos), directorio=str(crawl), hasta="2024-05-03")
+
+    assert resumen["xgboost"]["estado"] == resumen["randomforest"]["estado"] == "actualizado"
+    assert resumen["xgboost"]["particiones"] == 2 and resumen["xgboost"]["filas"] == 30
+    registry = ModelRegistry(str(modelos))
+    booster = registry.get("xgboost").named_steps["clf"].get_booster()
+    assert booster.num_boosted_rounds() == xgb_antes + incremental.Config.INCREMENTAL_ROUNDS
+    assert len(registry.get("randomforest").named_steps["clf"].estimators_) == 200 + incremental.Config.INCREMENTAL_TREES
+
+    marca = incremental.leer_marca(str(modelos), "xgboost")
+    assert marca["watermark"] == "2024-05-02" and marca["modo"] == "incremental"
+    assert marca["particiones"] == ["aliexpress_2024-05-01.csv", "temu_2024-05-02.csv"]
+
+    # Sin particiones nuevas no se toca nada
+    assert incremental.actualizar(["xgboost"], str(modelos), str(crawl), hasta="2024-05-03")["xgboost"]["estado"] == "al_dia"
+
+
+def test_single_class_batch_does_not_advance_watermark(entorno):
+    modelos, crawl = entorno
+    _particion(crawl, "temu_2024-05-01.csv", [2, 3, 4] * 4)  # todo por debajo del precio nacional
+    antes = (modelos / "model_xgboost.pkl").read_bytes()
+    resumen = incremental.actualizar(["xgboost"], str(modelos), str(crawl), hasta="2024-05-02")
+    assert resumen["xgboost"]["estado"] == "sin_ambas_clases"
+    assert (modelos / "model_xgboost.pkl").read_bytes() == antes
+    assert incremental.leer_marca(str(modelos), "xgboost") == {}
+
+
+def test_full_retrain_consolidates_all_closed_partitions(entorno, dataset_dumping):
+    modelos, crawl = entorno
+    _particion(crawl, "temu_2024-05-01.csv", [5, 100])
+    _particion(crawl, "temu_2024-05-02.csv", [5, 100])
+    with patch("ml.incremental.load_and_clean_data", return_value=dataset_dumping(200)) as cargar:
+        resumen = incremental.consolidar(str(modelos), str(crawl), hasta="2024-05-02", nucleos=1)
+    assert [p.rsplit("/", 1)[-1] for p in cargar.call_args.kwargs["extra"]] == ["temu_2024-05-01.csv"]
+    assert resumen["watermark"] == "2024-05-01"
+    for nombre in incremental.MODELOS:
+        marca = json.loads((modelos / f"model_{nombre}.pkl.meta.json").read_text())
+        assert marca["modo"] == "completo" and marca["watermark"] == "2024-05-01"
+
+
+def test_balanced_weights_are_recomputed_for_every_batch():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 3))
+    clf = RandomForestClassifier(n_estimators=5, class_weight="balanced", random_state=0)
+    clf.fit(X, np.arange(200) % 2)
+    pipeline = Pipeline([("clf", clf)])
+
+    pesos = []
+    for positivos in (20, 100):  # 10 % y luego 50 % de positivos
+        y = (np.arange(200) < positivos).astype(int)
+        with patch.object(RandomForestClassifier, "fit", autospec=True,
+                          side_effect=RandomForestClassifier.fit) as fit:
+            clf = incremental._continuar("randomforest", pipeline, X, y)
+        pesos.append(fit.call_args.kwargs["sample_weight"])
+        assert clf.class_weight == "balanced"
+
+    assert pesos[0][0] == pytest.approx(200 / (2 * 20))
+    assert np.allclose(pesos[1], 1.0)
+
+
+def test_non_incremental_models_are_rejected(entorno):
+    modelos, crawl = entorno
+    with pytest.raises(ValueError):
+        incremental.actualizar(["logistica"], str(modelos), str(crawl))
@@ -0,0 +1,95 @@
+import urllib.request
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from benchmarks.marketplace_standin import StandinConfig, iniciar_en_segundo_plano
+from scraper.aliexpress_scraper import AliExpressScraper
+from scraper.temu_scraper import TemuScraper
+
+
+@pytest.fixture
+def standin():
+    servidores = []
+
+    def arrancar(**kwargs):
+        servidor, base_url = iniciar_en_segundo_plano(StandinConfig(seed=0, **kwargs))
+        servidores.append(servidor)
+        return servidor, base_url
+
+    yield arrancar
+    for servidor in servidores:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def fetch(url):
+    with urllib.request.urlopen(url, timeout=5) as resp:
+        return resp.read().decode("utf-8")
+
+
+def test_serves_paginated_results_with_distinct_products(standin):
+    _, base = standin(paginas=2)
+    p1 = fetch(f"{base}/alibaba/trade/search?SearchText=x&page=1")
+    p2 = fetch(f"{base}/alibaba/trade/search?SearchText=x&page=2")
+    p3 = fetch(f"{base}/alibaba/trade/search?SearchText=x&page=3")
+
+    assert p1.count("fy26-product-card-wrapper") == 60
+    assert "p_1600000000000.html" in p1 and "p_1600000000000.html" not in p2
+    assert "fy26-product-card-wrapper" not in p3
+
+
+def test_injects_captcha_every_n_requests(standin):
+    servidor, base = standin(captcha_cada=2)
+    paginas = [fetch(f"{base}/temu/pe/search.html?search_key=x&page=1") for _ in range(4)]
+
+    assert ["Security Verification" in p for p in paginas] == [False, True, False, True]
+    assert servidor.market.stats["captchas"] == 2
+
+
+def test_lazy_mode_defers_cards_to_template(standin):
+    _, base = standin(lazy=20)
+    html = fetch(f"{base}/madeinchina/productSearch?keyword=x&currentPage=1")
+    visible, _, diferidas = html.partition('<template id="standin-lazy">')
+
+    assert visible.count('class="product-info"') == 20
+    assert diferidas.count('class="product-info"') == 40
+
+
+def test_search_base_resolution(monkeypatch):
+    scraper = TemuScraper.__new__(TemuScraper)
+    monkeypatch.delenv("MARKETPLACE_BASE_URL", raising=False)
+    assert scraper._search_base() == "https://www.temu.com"
+
+    monkeypatch.setenv("MARKETPLACE_BASE_URL", "http://localhost:8765/")
+    assert scraper._search_base() == "http://localhost:8765/temu"
+
+    scraper.base_url = "http://otro:9000/temu/"
+    assert scraper._search_base() == "http://otro:9000/temu"
+
+
+@patch("scraper.aliexpress_scraper.BaseScraper.__init__", return_value=None)
+def test_parse_against_standin_with_base_url_override(mock_base_init, standin):
+    _, base = standin(paginas=2)
+    scraper = AliExpressScraper()
+    driver = MagicMock()
+    driver.execute_script.return_value = None  # fuerza la ruta DOM completa del detector
+
+    def get(url):
+        driver.current_url = url
+        driver.page_source = fetch(url)
+
+    driver.get.side_effect = get
+    scraper.driver = driver
+    scraper.close = MagicMock()
+    scraper.wait_ready = MagicMock()
+    scraper._accept_banners = MagicMock()
+    scraper._human_scroll_until_growth = MagicMock()
+    scraper._find_all_any = MagicMock(return_value=[])
+
+    productos = scraper.parse("auriculares", paginas=3, base_url=f"{base}/aliexpress")
+
+    assert driver.get.call_args_list[0].args[0].startswith(f"{base}/aliexpress/wholesale?SearchText=auriculares")
+    assert len(productos) == 120
+    assert len({p["link"] for p in productos}) == 120
+    assert {p["pagina"] for p in productos} == {1, 2}
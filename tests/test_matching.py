@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml import matching
+from ml.matching import IndiceCatalogo, cargar_o_construir, normalizar_titulo
+from ml.referencias import CatalogoNacional
+
+ARTICULOS = pd.DataFrame({
+    "descripcion": ["CAMISA LINO ML AMIR 9CY437", "CAMISA OXFORD JH", "PIJAMA HOMBRE 100% ALGODÓN",
+                    "PANTALON DRILL CHINO", "CORREAS LINEA CUERO JH", "POLOS PIQUE HOMBRE"],
+    "clase": ["CAMISA", "CAMISA", "PIJAMA", "PANTALON", "CORREA", "POLOS"],
+    "precio_local": [60.0, 40.0, 15.0, 50.0, 45.0, 20.0],
+})
+
+
+@pytest.fixture(scope="module")
+def indice():
+    return IndiceCatalogo.construir(ARTICULOS, fuente_sha256="abc")
+
+
+def test_titles_are_normalized_to_catalog_vocabulary():
+    assert normalizar_titulo("Men's Linen T-Shirt XL 2024") == "hombre lino polo xl"
+    assert normalizar_titulo("Pantalón Chino SKU1LSO84") == "pantalon chino"
+
+
+def test_top_k_neighbours_are_sorted_and_class_filter_applies(indice):
+    indices, similitud = indice.vecinos(["linen shirt", "chino trousers", "leather belt", "xyz"], k=2)
+    assert indices[0, 0] == 0 and indices[1, 0] == 3 and indices[2, 0] == 4
+    assert (np.diff(similitud, axis=1) <= 0).all()
+    assert (indices[3] == -1).all() and (similitud[3] == 0).all()
+
+    # Sin filtro "cotton shirt men" se acerca al pijama de algodón; con la clase, a las camisas
+    assert indice.vecinos(["cotton shirt men"], k=1)[0][0, 0] == 2
+    idx, _ = indice.vecinos(["cotton shirt men"], k=3, clases=["CAMISA"])
+    assert set(idx[0][idx[0] >= 0]) == {0, 1}
+
+    largo = indice.buscar(["linen shirt", "xyz"], k=2)
+    assert list(largo["consulta"]) == [0, 0] and list(largo["rango"]) == [1, 2]
+    assert largo.loc[0, "descripcion"] == "CAMISA LINO ML AMIR 9CY437"
+
+
+def test_large_batches_match_single_queries(indice):
+    titulos = ["linen shirt", "polo pique", "belt"] * 7
+    por_lotes = indice.vecinos(titulos, k=3, lote=4)
+    for i, titulo in enumerate(titulos[:3]):
+        uno = indice.vecinos([titulo], k=3)
+        np.testing.assert_array_equal(por_lotes[0][i], uno[0][0])
+
+
+def test_index_is_persisted_and_rebuilt_only_when_catalog_changes(tmp_path):
+    fuente = tmp_path / "precios.xls"
+    fuente.write_bytes(b"v1")
+    path = str(tmp_path / "indice.joblib")
+    with patch("ml.matching.leer_catalogo", return_value=ARTICULOS) as leer:
+        primero = cargar_o_construir(str(fuente), path)
+        segundo = cargar_o_construir(str(fuente), path)
+        assert leer.call_count == 1
+        np.testing.assert_array_equal(primero.vecinos(["linen shirt"])[0], segundo.vecinos(["linen shirt"])[0])
+
+        fuente.write_bytes(b"v2")
+        cargar_o_construir(str(fuente), path)
+        assert leer.call_count == 2
+
+
+def test_reference_prices_use_nearest_articles_within_class(indice):
+    catalogo = CatalogoNacional(path="no-se-lee.xls", indice=indice)
+    catalogo._precios = pd.Series({"CAMISA": 46.5, "POLOS": 18.7})
+    with patch.object(matching.Config, "MATCHING_MIN_SIMILARITY", 0.2), \
+         patch.object(matching.Config, "MATCHING_TOP_K", 1):
+        ref = catalogo.referencias(["linen shirt white", "camisa", "gadget"], consulta="camisa")
+    assert ref.loc[0, "articulo_nacional"] == "CAMISA LINO ML AMIR 9CY437"
+    assert ref.loc[0, "precio_local"] == 60.0
+    assert ref.loc[2, "articulo_nacional"] is None and ref.loc[2, "precio_local"] == 46.5
@@ -0,0 +1,84 @@
+import os
+import threading
+from unittest.mock import patch
+
+import joblib
+import pytest
+
+from app import app
+from ml import predict
+from ml.predict import ModelRegistry, predict_dumping
+
+
+def _escribir(path, objeto, mtime):
+    joblib.dump(objeto, path)
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path))
+
+
+def test_model_is_loaded_once_and_reloaded_when_content_changes(registry, tmp_path):
+    path = str(tmp_path / "model_xgboost.pkl")
+    _escribir(path, {"version": 1}, 1_000_000_000)
+
+    with patch("ml.predict.joblib.load", wraps=joblib.load) as load:
+        assert registry.get("xgboost") == {"version": 1}
+        assert registry.get("xgboost") == {"version": 1}
+        assert load.call_count == 1
+
+        _escribir(path, {"version": 1}, 2_000_000_000)  # mismo contenido, otro mtime
+        assert registry.get("xgboost") == {"version": 1}
+        assert load.call_count == 1
+
+        _escribir(path, {"version": 2}, 3_000_000_000)
+        assert registry.get("xgboost") == {"version": 2}
+        assert load.call_count == 2
+
+
+def test_unreadable_new_artifact_keeps_serving_previous_model(registry, tmp_path):
+    path = str(tmp_path / "model_logistica.pkl")
+    _escribir(path, "bueno", 1_000_000_000)
+    assert registry.get("logistica") == "bueno"
+
+    with open(path, "wb") as fh:
+        fh.write(b"a medio escribir")
+    assert registry.get("logistica") == "bueno"
+
+
+def test_concurrent_first_access_deserializes_once(registry, tmp_path):
+    _escribir(str(tmp_path / "model_randomforest.pkl"), [1, 2, 3], 1_000_000_000)
+    resultados = []
+    with patch("ml.predict.joblib.load", wraps=joblib.load) as load:
+        hilos = [threading.Thread(target=lambda: resultados.append(registry.get("randomforest")))
+                 for _ in range(8)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+    assert resultados == [[1, 2, 3]] * 8
+    assert load.call_count == 1
+
+
+def test_unknown_model_name_is_rejected(registry):
+    with pytest.raises(ValueError):
+        registry.get("svm")
+    response = app.test_client().post("/api/predict", json={
+        "precio_importado": 10, "precio_local": 30, "modelo": "svm",
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("modelo", ["logistica", "randomforest", "xgboost"])
+def test_predict_dumping_by_model_name(modelo):
+    resultado = predict_dumping(10.0, 40.0, "AliExpress", modelo=modelo)
+    assert resultado["modelo"] == modelo
+    assert 0 <= resultado["probabilidad_dumping"] <= 1
+
+
+def test_isolation_forest_reports_anomaly_score():
+    resultado = predict_dumping(10.0, 40.0, "AliExpress", modelo="isolation")
+    assert set(resultado) == {"modelo", "puntuacion_anomalia", "decision"}
+    assert predict.get_registry().info()  # los artefactos reales quedan en caché
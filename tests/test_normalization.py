@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scraper.normalization import (
+    limpiar_cantidad,
+    limpiar_cantidades,
+    limpiar_precio,
+    limpiar_precios,
+    limpiar_rango_precio,
+    main,
+    normalizar_dataframe,
+)
+
+SAMPLES = [
+    "US $7.99 - 15.99", "€56,78 - 12,34", "1.299,00", "S/ 18,24", "1.234.56",
+    "1.2k", "3 mil", "1,000+ sold", "450 vendidos", "", None, "sin precio",
+]
+
+
+def test_range_policy_per_platform():
+    assert limpiar_precio("€56,78 - 12,34", "aliexpress") == 12.34
+    assert limpiar_precio("€56,78 - 12,34", "temu") == 12.34
+    assert limpiar_precio("€56,78 - 12,34", "alibaba") == 56.78
+
+
+def test_strict_decimal_policy_for_alibaba():
+    assert limpiar_precio("1.234.56", "aliexpress") == 1234.56
+    assert limpiar_precio("1.234.56", "alibaba") == 123456.0
+
+
+def test_quantity_policy_per_platform():
+    assert limpiar_cantidad("1.2k", "aliexpress") == 1200
+    assert limpiar_cantidad("1,200 Pieces (MOQ)", "madeinchina") == 1200
+    assert limpiar_cantidad("1.2k", "madeinchina") == 12
+
+
+def test_range_with_currency():
+    assert limpiar_rango_precio("R$ 2.000,00 - R$ 2.500,00") == (2000.0, 2500.0, "R")
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("US$3.60 - US$5.60", 3.6),
+    ("$1.20-$2.50", 1.2),
+    ("S/ 18,24 - S/ 31,00", 18.24),
+])
+def test_range_with_repeated_currency(texto, esperado):
+    for plataforma in ("madeinchina", "aliexpress", "temu", "alibaba"):
+        assert limpiar_precio(texto, plataforma) == esperado
+
+
+def test_unknown_platform_is_rejected():
+    with pytest.raises(ValueError):
+        limpiar_precio("10", "amazon")
+
+
+@pytest.mark.parametrize("plataforma", ["aliexpress", "alibaba", "temu", "madeinchina"])
+def test_bulk_api_matches_scalar(plataforma):
+    serie = pd.Series(SAMPLES * 50, index=range(100, 100 + len(SAMPLES) * 50))
+
+    precios = limpiar_precios(serie, plataforma)
+    cantidades = limpiar_cantidades(serie, plataforma)
+
+    assert precios.index.equals(serie.index)
+    for texto, precio, cantidad in zip(serie, precios, cantidades):
+        esperado = limpiar_precio(texto, plataforma)
+        assert (np.isnan(precio) and esperado is None) or precio == esperado
+        assert cantidad == limpiar_cantidad(texto, plataforma)
+
+
+def test_bulk_api_accepts_numpy_arrays():
+    precios = limpiar_precios(np.array(["1.299,00", None], dtype=object))
+    assert isinstance(precios, np.ndarray)
+    assert precios[0] == 1299.0 and np.isnan(precios[1])
+
+
+def test_normalizar_dataframe_and_cli(tmp_path):
+    df = pd.DataFrame({"titulo": ["a", "b"], "precio": ["US $7.99 - 15.99", "1.299,00"],
+                       "ventas": ["1.2k", "3 mil"]})
+    out = normalizar_dataframe(df, "aliexpress")
+    assert out["precio"].tolist() == [7.99, 1299.0]
+    assert out["ventas"].tolist() == [1200, 3000]
+
+    path = tmp_path / "productos.csv"
+    df.to_csv(path, sep=";", index=False)
+    main([str(path), "aliexpress"])
+    again = pd.read_csv(path, sep=";", encoding="utf-8-sig")
+    assert again["precio"].tolist() == [7.99, 1299.0]
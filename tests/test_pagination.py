@@ -0,0 +1,103 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from selenium.common.exceptions import TimeoutException
+
+from app import app
+from scraper.alibaba_scraper import AlibabaScraper
+from scraper.offline import new_scraper
+from scraper.pagination import Paginacion
+
+
+def _productos(*ids):
+    return [{"link": f"https://x/{i}", "titulo": f"p{i}"} for i in ids]
+
+
+def test_stops_when_page_brings_mostly_repeated_products():
+    paginacion = Paginacion(min_nuevos=0.5)
+    assert paginacion.registrar(1, _productos(1, 2, 3, 4))
+    assert not paginacion.registrar(2, _productos(1, 2, 3, 5))  # 1 de 4 nuevo
+    assert paginacion.resumen() == {"paginas": 2, "productos_unicos": 5, "motivo": "repetidos"}
+
+
+@pytest.mark.parametrize("productos, bloqueada, motivo", [
+    ([], False, "fin_resultados"),
+    (_productos(9), True, "bloqueo"),
+])
+def test_stops_on_end_of_results_and_blocks(productos, bloqueada, motivo):
+    paginacion = Paginacion()
+    assert paginacion.registrar(1, _productos(1, 2))
+    assert not paginacion.registrar(2, productos, bloqueada)
+    assert paginacion.motivo == motivo
+
+
+def test_max_productos_stops_and_trims():
+    paginacion = Paginacion(max_productos=3)
+    assert not paginacion.registrar(1, _productos(1, 2, 3, 4))
+    assert paginacion.recortar(_productos(1, 2, 3, 4)) == _productos(1, 2, 3)
+    assert paginacion.motivo == "max_productos"
+
+
+@patch("scraper.alibaba_scraper.WebDriverWait")
+def test_parse_skips_remaining_page_loads(mock_wait):
+    scraper = new_scraper(AlibabaScraper)
+    driver = scraper.driver = MagicMock(page_source="<html></html>")
+    scraper._accept_banners = MagicMock()
+    scraper._human_scroll_until_growth = MagicMock()
+    scraper._is_blocked = MagicMock(return_value=False)
+    paginas = {1: _productos(1, 2, 3), 2: _productos(1, 2, 3), 3: _productos(4, 5, 6)}
+    scraper._extract_in_browser = MagicMock(
+        side_effect=lambda: paginas[driver.get.call_count]
+    )
+
+    productos = scraper.parse("camisa", paginas=3)
+
+    assert driver.get.call_count == 2  # la página 3 no se carga
+    assert len(productos) == 6
+    assert scraper.paginacion.resumen()["motivo"] == "repetidos"
+
+
+@pytest.mark.parametrize("captcha, motivo, incidencia", [
+    (False, "fin_resultados", None),
+    (True, "bloqueo", "bloqueo"),
+])
+@patch("scraper.alibaba_scraper.WebDriverWait")
+def test_page_without_cards_stops_without_retries(mock_wait, captcha, motivo, incidencia):
+    scraper = new_scraper(AlibabaScraper)
+    driver = scraper.driver = MagicMock(page_source="<html></html>")
+    scraper._accept_banners = MagicMock()
+    scraper._human_scroll_until_growth = MagicMock()
+    scraper.circuit_breaker = MagicMock(**{"is_open.return_value": False})
+    scraper._is_blocked = MagicMock(side_effect=lambda d: captcha and driver.get.call_count == 2)
+    # La página 2 carga pero las cards no llegan (espera agotada)
+    mock_wait.return_value.until.side_effect = lambda cond: (
+        True if driver.get.call_count == 1 else (_ for _ in ()).throw(TimeoutException())
+    )
+    scraper._extract_in_browser = MagicMock(return_value=_productos(1, 2, 3))
+
+    productos = scraper.parse("camisa", paginas=4)
+
+    assert driver.get.call_count == 2  # sin reintentos ni páginas 3 y 4
+    assert len(productos) == 3
+    assert scraper.paginacion.resumen()["motivo"] == motivo
+    fallos = [c.args for c in scraper.circuit_breaker.record_failure.call_args_list]
+    assert fallos == ([(incidencia,)] if incidencia else [])
+
+
+def test_scrape_endpoint_forwards_pagination_limits():
+    with patch("app.encolar_scrape") as encolar:
+        encolar.return_value.id = "abc"
+        response = app.test_client().post("/api/scrape", json={
+            "producto": "camisa", "plataforma": "temu", "max_productos": 50, "min_nuevos": 0.3,
+        })
+    assert response.status_code == 202
+    encolar.assert_called_once_with("camisa", "temu", "interactive", max_productos=50, min_nuevos=0.3)
+
+
+@pytest.mark.parametrize("cuerpo", [{"max_productos": 0}, {"paginas": "3"}, {"min_nuevos": 2}])
+def test_scrape_endpoint_rejects_invalid_limits(cuerpo):
+    response = app.test_client().post(
+        "/api/scrape", json={"producto": "camisa", "plataforma": "temu", **cuerpo}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,77 @@
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app import app
+from ml.predict import predict_dumping, predict_dumping_batch
+
+
+@pytest.fixture
+def client():
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_batch_matches_single_predictions_in_input_order():
+    importados = [10.0, 20.0, 35.5, 8.0]
+    locales = [40.0, 10.0, 30.0, 12.0]
+    plataformas = ["AliExpress", "Alibaba", "AliExpress", "Alibaba"]
+
+    salida = predict_dumping_batch(importados, locales, plataformas)
+
+    esperado = [predict_dumping(*fila) for fila in zip(importados, locales, plataformas)]
+    assert salida["probabilidad_dumping"].tolist() == [e["probabilidad_dumping"] for e in esperado]
+    assert salida["decision"].tolist() == [e["decision"] for e in esperado]
+
+
+def test_batch_calls_the_model_once_and_flags_invalid_rows():
+    modelo = MagicMock()
+    modelo.predict_proba.side_effect = lambda X: np.tile([0.2, 0.8], (len(X), 1))
+    with patch("ml.predict._registry.get", return_value=modelo):
+        salida = predict_dumping_batch([10, "x", 5, 7], [40, 30, 0, 9], "Temu", modelo="logistica")
+    modelo.predict_proba.assert_called_once()
+    assert len(modelo.predict_proba.call_args[0][0]) == 2
+    assert salida["decision"].tolist() == ["Dumping probable", "Datos inválidos", "Datos inválidos",
+                                           "Dumping probable"]
+    assert np.isnan(salida["probabilidad_dumping"][1])
+
+
+def test_batch_endpoint_accepts_json_arrays(client):
+    response = client.post("/api/predict/lote", json={
+        "precio_importado": [10, 20, -1], "precio_local": [40, 10, 5], "plataforma": "AliExpress",
+    })
+    data = response.get_json()
+    assert response.status_code == 200 and data["total"] == 3
+    assert data["resultados"][2] == {"probabilidad_dumping": None, "decision": "Datos inválidos"}
+
+
+def test_batch_endpoint_streams_uploaded_csv(client):
+    csv = "precio;precio_local;plataforma\n10;40;AliExpress\n20;10;Alibaba\n"
+    response = client.post(
+        "/api/predict/lote?formato=ndjson&modelo=randomforest",
+        data={"archivo": (io.BytesIO(csv.encode("utf-8")), "lote.csv")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    filas = [json.loads(l) for l in response.get_data(as_text=True).splitlines()]
+    assert len(filas) == 2
+    assert filas[0] == {k: v for k, v in predict_dumping(10, 40, "AliExpress", "randomforest").items()
+                        if k != "modelo"}
+
+
+def test_batch_endpoint_requires_price_columns(client):
+    assert client.post("/api/predict/lote", json={"precio_local": [1]}).status_code == 400
+
+
+def test_ndjson_is_sent_in_row_blocks(client):
+    n = 2500
+    with patch("app._NDJSON_BLOQUE", 1000):
+        response = client.post("/api/predict/lote?formato=ndjson",
+                               json={"precio_importado": [10] * n, "precio_local": [40] * n})
+        bloques = list(response.response)
+    assert response.is_streamed
+    assert [b.count(b"\n") for b in bloques] == [1000, 1000, 500]
@@ -0,0 +1,55 @@
+import re
+
+import pandas as pd
+import pytest
+
+from ml.preprocessing import estadisticas_nacionales, preparar_dataset
+from ml.referencias import CatalogoNacional
+
+
+def _nacional():
+    return pd.DataFrame({
+        "DESCRIPCION_ARTICULO": [f"CAMISA {i}" for i in range(5)] + [f"PANTALON {i}" for i in range(6)] + ["CORREA X"],
+        "CLASE": ["CAMISA"] * 5 + ["PANTALON"] * 6 + ["CORREA"],
+        "Val_Act": [10.0, 20.0, 30.0, 40.0, 50.0] + [60.0, 80.0, 100.0, 120.0, 140.0, 0.0] + [30.0],
+        "St_Act": [1] * 10 + [0, 1],
+    })
+
+
+def _intl():
+    return pd.DataFrame({
+        "titulo": ["Men Shirt", "Linen shirt", "Chino Pants", "Trousers", "Lamp", "Camisa barata", "Leather belt"],
+        "precio": [6.0, 60.0, 20.0, "n/a", 5.0, 30.0, 3.0],
+        "plataforma": ["Alibaba", "Alibaba", None, "Alibaba", "Alibaba", "AliExpress", "Alibaba"],
+    })
+
+
+def test_national_stats_have_one_row_per_category():
+    nacional = pd.DataFrame({"categoria": ["a", "a", "a", "b"], "precio_local": [10.0, 20.0, 60.0, -1.0]})
+    stats = estadisticas_nacionales(nacional).set_index("categoria")
+    assert list(stats.index) == ["a"]  # precios no positivos no cuentan
+    assert stats.loc["a", "precio_local"] == 20.0
+    assert stats.loc["a", "n_articulos"] == 3
+    assert stats.loc["a", "precio_local_p25"] == 15.0 and stats.loc["a", "precio_local_p75"] == 40.0
+
+
+def test_dataset_has_one_row_per_product(capsys):
+    df = preparar_dataset([_intl()], _nacional())
+    # "Lamp" no tiene clase, "Trousers" no tiene precio y CORREA no llega a 5 artículos
+    assert sorted(df["titulo"]) == ["camisa barata", "chino pants", "linen shirt", "men shirt"]
+    camisas = df[df["clase_nacional"] == "CAMISA"]
+    assert (camisas["precio_local"] == 30.0).all() and (camisas["n_articulos"] == 5).all()
+    assert df.loc[df["titulo"] == "men shirt", "ratio_precio"].item() == pytest.approx(0.2)
+    assert df.loc[df["titulo"] == "chino pants", "plataforma"].item() == "Desconocida"
+    salida = capsys.readouterr().out
+    assert "el cruce por clase habría generado 28 filas" in salida
+    assert re.search(r"6 filas, [\d.]+ MB en [\d.]+ s .* ~[\d.]+ MB\)", salida)
+
+
+def test_training_reference_matches_scoring_reference():
+    nacional = _nacional()
+    df = preparar_dataset([_intl()], nacional)
+    # Mismo catálogo y misma función que ml.predict.puntuar_productos
+    servido = CatalogoNacional(nacional=nacional).referencias(df["titulo"])
+    assert df["precio_local"].tolist() == servido["precio_local"].tolist()
+    assert df["clase_nacional"].tolist() == servido["clase_nacional"].tolist()
@@ -0,0 +1,168 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from scraper.base import BaseScraper
+from scraper.proxy_pool import ProxyPool
+from scraper.state import MemoryStore, RedisStore
+
+LOCAL_PROXIES = ["http://127.0.0.1:3128", "http://127.0.0.1:3129"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pool(store=None, clock=None):
+    return ProxyPool(
+        LOCAL_PROXIES,
+        store=store or MemoryStore(),
+        quarantine=60,
+        max_quarantine=600,
+        clock=clock or FakeClock(),
+        rng=random.Random(0),
+    )
+
+
+def test_empty_pool_is_rejected():
+    with pytest.raises(ValueError):
+        ProxyPool([], store=MemoryStore())
+
+
+def test_selection_prefers_healthy_proxies():
+    pool = make_pool()
+    good, bad = LOCAL_PROXIES
+    for _ in range(20):
+        pool.record_success(good, latency=1.0)
+        pool.record_failure(bad)
+
+    picks = [pool.select() for _ in range(200)]
+    assert picks.count(good) > picks.count(bad) * 3
+
+
+def test_block_quarantines_proxy_with_growing_backoff():
+    clock = FakeClock()
+    pool = make_pool(clock=clock)
+    blocked, other = LOCAL_PROXIES
+
+    pool.record_block(blocked)
+    assert pool.is_quarantined(blocked)
+    assert {pool.select() for _ in range(20)} == {other}
+
+    clock.now += 61
+    assert not pool.is_quarantined(blocked)
+
+    pool.record_block(blocked)
+    assert pool.stats(blocked)["quarantined_until"] == clock.now + 120
+
+
+def test_scores_are_shared_through_the_store():
+    store = MemoryStore()
+    worker_a = make_pool(store=store)
+    worker_b = make_pool(store=store)
+
+    worker_a.record_success(LOCAL_PROXIES[0], latency=2.0)
+    assert worker_b.stats(LOCAL_PROXIES[0])["successes"] == 1
+    assert worker_b.stats(LOCAL_PROXIES[0])["latency"] == 2.0
+
+
+def test_success_does_not_lift_quarantine():
+    pool = make_pool()
+    proxy = LOCAL_PROXIES[0]
+    pool.record_block(proxy)
+    pool.record_success(proxy, latency=1.0)
+    assert pool.is_quarantined(proxy)
+    assert pool.stats(proxy)["strikes"] == 0
+
+
+class RacingStore(MemoryStore):
+    """Con `barrier` asignada, la primera escritura de cada hilo espera a las de los demás.
+
+    La espera va dentro de ``update_hash``, antes de aplicar los cambios: si el
+    pool calculase los valores a partir de una lectura propia, todos partirían
+    del mismo estado viejo y se perderían incrementos.
+    """
+
+    barrier = None
+
+    def __init__(self):
+        super().__init__()
+        self.esperas = 0
+        self._hilo = threading.local()
+
+    def update_hash(self, key, **cambios):
+        if self.barrier is not None and not getattr(self._hilo, "esperado", False):
+            self._hilo.esperado = True
+            with self._lock:
+                self.esperas += 1
+            self.barrier.wait()
+        return super().update_hash(key, **cambios)
+
+
+def _concurrentes(pool, proxy):
+    acciones = [lambda: pool.record_failure(proxy)] * 10 + [lambda: pool.record_block(proxy)] * 10
+    with ThreadPoolExecutor(len(acciones)) as hilos:
+        list(hilos.map(lambda accion: accion(), acciones))
+
+
+def test_concurrent_outcomes_are_all_counted():
+    store = RacingStore()
+    clock = FakeClock()
+    pool = make_pool(store=store, clock=clock)
+    proxy = LOCAL_PROXIES[0]
+    # Primera escritura de cada hilo (fallo o bloqueo) a la vez
+    store.barrier = threading.Barrier(20, timeout=5)
+    try:
+        _concurrentes(pool, proxy)
+    finally:
+        store.barrier = None
+
+    assert store.esperas == 20
+    stats = pool.stats(proxy)
+    assert (stats["failures"], stats["blocks"], stats["strikes"]) == (10, 10, 10)
+    # La cuarentena es la del décimo bloqueo, aunque otro hilo guardase después la del primero
+    assert stats["quarantined_until"] == clock.now + 600
+
+
+def test_redis_script_applies_concurrent_outcomes_atomically():
+    fakeredis = pytest.importorskip("fakeredis")
+    store = RedisStore.__new__(RedisStore)
+    store.prefix, store._client = "test:", fakeredis.FakeRedis()
+    clock = FakeClock()
+    pool = make_pool(store=store, clock=clock)
+    proxy = LOCAL_PROXIES[0]
+
+    _concurrentes(pool, proxy)
+    pool.record_success(proxy, latency=2.0)
+    pool.record_success(proxy, latency=4.0)
+
+    stats = pool.stats(proxy)
+    assert (stats["failures"], stats["blocks"], stats["successes"], stats["strikes"]) == (10, 10, 2, 0)
+    assert stats["quarantined_until"] == clock.now + 600  # el éxito no la toca
+    assert stats["latency"] == pytest.approx(0.3 * 4.0 + 0.7 * 2.0)
+
+
+@patch("scraper.base.webdriver.Chrome")
+@patch("scraper.base.Service")
+@patch("scraper.base.shutil.which", side_effect=lambda name: f"/usr/bin/{name}")
+def test_driver_uses_selected_proxy_and_reports_outcome(mock_which, mock_service, mock_chrome):
+    pool = make_pool()
+    mock_chrome.return_value = MagicMock()
+
+    with patch("scraper.base.get_proxy_pool", return_value=pool):
+        scraper = BaseScraper()
+
+    options = mock_chrome.call_args.kwargs["options"]
+    assert scraper.proxy in LOCAL_PROXIES
+    assert f"--proxy-server={scraper.proxy}" in options.arguments
+
+    scraper._report_block()
+    assert pool.is_quarantined(scraper.proxy)
+    scraper.close()
@@ -0,0 +1,74 @@
+import csv
+import json
+import os
+
+import pytest
+
+from benchmarks import corpus
+from scraper import snapshots
+from scraper.offline import extract_offline, new_scraper, scraper_cls
+from scraper.replay import diff_productos, replay
+from scraper.snapshots import SnapshotStore
+
+
+def _pagina(plataforma):
+    return corpus.leer(next(corpus.paginas(plataforma=plataforma))[0])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snaps"), retention_days=0, max_mb=0,
+                          dict_samples=0, codec=snapshots.ZLIB)
+    store.esperados = {}
+    for plataforma in ("temu", "alibaba"):
+        html = _pagina(plataforma)
+        productos = extract_offline(new_scraper(scraper_cls(plataforma)), html, 1)
+        store.save(html, plataforma, "q", 1, job_id="job-1", productos=productos)
+        store.esperados[plataforma] = len(productos)
+    return store
+
+
+def test_diff_productos_reports_changes_per_field():
+    antes = [{"link": "a", "precio": 1.0, "ventas": None, "titulo": "x"},
+             {"link": "b", "precio": 2.0, "titulo": "y"}]
+    despues = [{"link": "a", "precio": 1.5, "ventas": 10, "titulo": "x"},
+               {"link": "c", "precio": 3.0, "titulo": "z"}]
+
+    diff = diff_productos(antes, despues)
+
+    assert (diff["emparejados"], diff["solo_original"], diff["solo_nuevo"]) == (1, 1, 1)
+    assert diff["campos"]["precio"] == {"cambiados": 1}
+    assert diff["campos"]["ventas"] == {"nuevos": 1}
+    assert diff["campos"]["titulo"] == {"iguales": 1}
+    assert diff["ejemplos"]["precio"] == [{"clave": "a", "antes": 1.0, "despues": 1.5}]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_replay_writes_new_dataset_version_without_diffs(store, tmp_path, workers):
+    manifest = replay(store, str(tmp_path / "out"), workers=workers, lote=1, version="v1")
+
+    assert manifest["snapshots"] == 2 and manifest["errores"] == []
+    assert manifest["productos"] == store.esperados
+    for plataforma, diff in manifest["diff"].items():
+        assert diff["solo_original"] == diff["solo_nuevo"] == 0
+        assert all(set(estados) == {"iguales"} for estados in diff["campos"].values()), plataforma
+
+    destino = tmp_path / "out" / "v1"
+    with open(destino / "productos_temu.csv", encoding="utf-8-sig") as fh:
+        filas = list(csv.DictReader(fh, delimiter=";"))
+    assert len(filas) == store.esperados["temu"] and filas[0]["plataforma"] == "Temu"
+    assert json.loads((destino / "manifest.json").read_text())["version"] == "v1"
+    assert os.path.exists(destino / "diff.json")
+
+
+def test_replay_detects_fields_changed_by_new_extraction_code(store, tmp_path):
+    # Simula un selector arreglado: el índice guarda precios vacíos de una extracción vieja
+    html = _pagina("temu")
+    viejos = extract_offline(new_scraper(scraper_cls("temu")), html, 2)
+    for p in viejos:
+        p["precio"] = None
+    store.save(html, "temu", "q", 2, job_id="job-2", productos=viejos)
+
+    manifest = replay(store, str(tmp_path / "out"), job_id="job-2", workers=1)
+
+    assert manifest["diff"]["temu"]["campos"]["precio"] == {"nuevos": len(viejos)}
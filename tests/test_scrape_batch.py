@@ -0,0 +1,101 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import tasks
+from app import app
+from scraper.base import BaseScraper
+from tasks import route_task
+
+
+def _scraper_cls(parse):
+    scraper = MagicMock()
+    scraper.paginacion = None
+    scraper.ensure_alive.return_value = True
+    scraper.parse.side_effect = parse
+    scraper_cls = MagicMock()
+    scraper_cls.return_value.__enter__.return_value = scraper
+    return scraper_cls, scraper
+
+
+def test_batch_reuses_one_browser_and_isolates_failures(tmp_path, monkeypatch):
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path))
+
+    def parse(producto, **limites):
+        if producto == "roto":
+            raise RuntimeError("timeout")
+        if producto == "vacio":
+            return []
+        return [{"titulo": producto, "precio": 1.0}]
+
+    scraper_cls, scraper = _scraper_cls(parse)
+    breaker = MagicMock()
+    breaker.allow.return_value = True
+    with patch("tasks.get_circuit_breaker", return_value=breaker), \
+         patch("tasks.get_snapshot_store", return_value=None), \
+         patch.dict(tasks.SCRAPERS, {"temu": (scraper_cls, "productos_temu.csv")}):
+        result = tasks.scrapear_lote.apply(
+            args=(["camisa", "roto", "vacio", "Pantalón corto", "camisa"], "temu"),
+            kwargs={"max_productos": 10},
+        ).get()
+
+    scraper_cls.assert_called_once()
+    assert scraper.keep_session is True
+    assert [r["producto"] for r in result["resultados"]] == ["camisa", "roto", "vacio", "Pantalón corto"]
+    assert [r["success"] for r in result["resultados"]] == [True, False, False, True]
+    assert result["resultados"][1]["message"] == "timeout"
+    assert result["completados"] == 2 and result["success"] is True
+    scraper.parse.assert_any_call("camisa", max_productos=10)
+    archivo = result["resultados"][3]["archivo"]
+    assert os.path.basename(archivo) == "productos_temu_003_pantalón_corto.csv"
+    assert os.path.exists(archivo)
+
+
+def test_batch_terms_with_the_same_slug_keep_separate_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path))
+    scraper_cls, _ = _scraper_cls(lambda producto, **limites: [{"titulo": producto, "precio": 1.0}])
+    breaker = MagicMock()
+    breaker.allow.return_value = True
+    with patch("tasks.get_circuit_breaker", return_value=breaker), \
+         patch("tasks.get_snapshot_store", return_value=None), \
+         patch.dict(tasks.SCRAPERS, {"temu": (scraper_cls, "productos_temu.csv")}):
+        result = tasks.scrapear_lote.apply(args=(["Camisa!", "camisa?", "camisa"], "temu")).get()
+
+    archivos = [r["archivo"] for r in result["resultados"]]
+    assert len(set(archivos)) == 3 and all(os.path.exists(a) for a in archivos)
+
+
+def test_batch_is_routed_to_batch_lane_by_default():
+    assert route_task("scrapear_lote", (["a"], "alibaba"), {}, {}) == {"queue": "scrape.alibaba.batch"}
+    assert route_task("scrapear_lote", (["a"], "temu"), {"prioridad": "interactive"}, {}) == {
+        "queue": "scrape.temu.interactive"
+    }
+
+
+def test_parse_keeps_browser_open_in_batches():
+    scraper = BaseScraper.__new__(BaseScraper)
+    scraper.close = MagicMock()
+    scraper.keep_session = True
+    scraper._end_parse()
+    scraper.close.assert_not_called()
+
+
+def test_batch_endpoint_enqueues_terms():
+    with patch("app.encolar_lote") as encolar:
+        encolar.return_value.id = "lote-1"
+        response = app.test_client().post("/api/scrape/lote", json={
+            "productos": ["camisa", "pantalón"], "plataforma": "alibaba", "paginas": 2,
+        })
+    assert response.status_code == 202
+    assert response.get_json()["cola"] == "scrape.alibaba.batch"
+    encolar.assert_called_once_with(["camisa", "pantalón"], "alibaba", "batch", paginas=2)
+
+
+@pytest.mark.parametrize("cuerpo", [
+    {"productos": [], "plataforma": "temu"},
+    {"productos": "camisa", "plataforma": "temu"},
+    {"productos": ["camisa"], "plataforma": "ebay"},
+])
+def test_batch_endpoint_validates_body(cuerpo):
+    assert app.test_client().post("/api/scrape/lote", json=cuerpo).status_code == 400
@@ -0,0 +1,78 @@
+import csv
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+import tasks
+from ml import predict
+from ml.predict import puntuar_productos
+from ml.referencias import CatalogoNacional, clases_de
+
+PRODUCTOS = [
+    {"titulo": "Men Slim Fit T-Shirt", "precio": 2.5, "plataforma": "AliExpress"},
+    {"titulo": "Camisa de vestir manga larga", "precio": 80.0, "plataforma": "Alibaba"},
+    {"titulo": "Oferta del día", "precio": 9.0, "plataforma": "Temu"},
+    {"titulo": "Gadget USB", "precio": 4.0, "plataforma": "Temu"},
+    {"titulo": "Pantalón chino", "precio": None, "plataforma": "Temu"},
+]
+
+
+def _catalogo():
+    catalogo = CatalogoNacional(path="no-se-lee.xls")
+    catalogo._precios = pd.Series({"CAMISA": 46.5, "POLOS": 18.7, "PANTALON": 50.0})
+    return catalogo
+
+
+def test_titles_map_to_national_classes():
+    assert clases_de(["Men T-Shirt", "Sweatshirt", "CAMISA OXFORD", "Pantalón", "Traje de baño", "lámpara"]).tolist() == [
+        "POLOS", "POLERA", "CAMISA", "PANTALON", "ROPA DE BAÑO", None,
+    ]
+
+
+def test_scrape_results_are_scored_in_one_model_call():
+    with patch("ml.predict.predict_dumping_batch", wraps=predict.predict_dumping_batch) as batch:
+        puntuados = puntuar_productos(PRODUCTOS, consulta="camisa", catalogo=_catalogo())
+    batch.assert_called_once()
+
+    assert [p["clase_nacional"] for p in puntuados] == ["POLOS", "CAMISA", "CAMISA", "CAMISA", "PANTALON"]
+    assert puntuados[0]["precio_local"] == 18.7 and 0 <= puntuados[0]["probabilidad_dumping"] <= 1
+    assert puntuados[1]["decision"] in {"Dumping probable", "Precio competitivo"}
+    assert puntuados[4]["decision"] == "Datos inválidos" and puntuados[4]["probabilidad_dumping"] is None
+    assert puntuados[0]["titulo"] == PRODUCTOS[0]["titulo"] and "decision" not in PRODUCTOS[0]
+
+    sin_consulta = puntuar_productos(PRODUCTOS, catalogo=_catalogo())
+    assert sin_consulta[3]["precio_local"] is None
+    assert sin_consulta[3]["decision"] == "Sin referencia nacional"
+
+
+def _scrapear(tmp_path, monkeypatch, **kwargs):
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path))
+    scraper = MagicMock(paginacion=None)
+    scraper.parse.return_value = [dict(p) for p in PRODUCTOS[:2]]
+    scraper_cls = MagicMock()
+    scraper_cls.return_value.__enter__.return_value = scraper
+    breaker = MagicMock()
+    breaker.allow.return_value = True
+    with patch("tasks.get_circuit_breaker", return_value=breaker), \
+         patch("tasks.get_snapshot_store", return_value=None), \
+         patch("ml.referencias._catalogo", _catalogo()), \
+         patch.dict(tasks.SCRAPERS, {"temu": (scraper_cls, "productos_temu.csv")}):
+        result = tasks.scrapear.apply(args=("camisa", "temu"), kwargs=kwargs).get()
+    with open(result["archivo"], encoding="utf-8-sig") as fh:
+        return result, list(csv.DictReader(fh, delimiter=";"))
+
+
+def test_scrape_task_stores_scored_columns_when_requested(tmp_path, monkeypatch):
+    result, filas = _scrapear(tmp_path, monkeypatch, puntuar=True)
+    assert result["productos"][0]["decision"]
+    assert filas[0]["clase_nacional"] == "POLOS" and filas[0]["decision"] == result["productos"][0]["decision"]
+    assert {"precio_local", "probabilidad_dumping"} <= set(filas[0])
+
+    result, filas = _scrapear(tmp_path, monkeypatch, puntuar=False)
+    assert "decision" not in result["productos"][0] and "decision" not in filas[0]
+
+
+def test_scoring_failure_keeps_unscored_results(tmp_path, monkeypatch):
+    with patch("tasks.puntuar_productos", side_effect=FileNotFoundError("sin modelo")):
+        result, filas = _scrapear(tmp_path, monkeypatch, puntuar=True)
+    assert result["success"] and len(filas) == 2 and "decision" not in filas[0]
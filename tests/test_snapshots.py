@@ -0,0 +1,169 @@
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from benchmarks import corpus
+from scraper import snapshots
+from scraper.offline import new_scraper
+from scraper.snapshots import SnapshotStore
+from scraper.temu_scraper import TemuScraper
+
+CODECS = [snapshots.ZLIB] + ([snapshots.ZSTD] if snapshots.zstandard is not None else [])
+
+
+class Reloj:
+    def __init__(self, t=1_000_000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _paginas(n, plataforma="temu"):
+    base = corpus.leer(next(corpus.paginas(plataforma=plataforma))[0])
+    # Misma plantilla, productos distintos: como páginas sucesivas reales
+    return [base.replace("600000", f"{600000 + i * 7}") for i in range(n)]
+
+
+@pytest.fixture(params=CODECS)
+def store(request, tmp_path):
+    return SnapshotStore(str(tmp_path / "snaps"), retention_days=30, max_mb=0,
+                         dict_samples=5, codec=request.param, clock=Reloj())
+
+
+def test_save_is_content_addressed_and_queryable_by_job(store):
+    html = _paginas(1)[0]
+    sha1 = store.save(html, "temu", "camisa", 1, job_id="job-1", productos=[{"titulo": "a"}])
+    sha2 = store.save(html, "temu", "camisa", 1, job_id="job-2")
+    store.save(_paginas(2)[1], "temu", "camisa", 2, job_id="job-1")
+
+    assert sha1 == sha2 == snapshots.content_key(html)
+    assert store.stats()["blobs"] == 2 and store.stats()["snapshots"] == 3
+    filas = store.by_job("job-1", productos=True)
+    assert [f["pagina"] for f in filas] == [1, 2]
+    assert filas[0]["productos"] == [{"titulo": "a"}] and filas[0]["n_productos"] == 1
+    assert store.load(sha1) == html
+
+
+def test_platform_dictionary_is_trained_and_old_blobs_stay_readable(store):
+    paginas = _paginas(8)
+    shas = [store.save(h, "temu", "q", i + 1, job_id="j") for i, h in enumerate(paginas[:5])]
+    dict_id = store.current_dict("temu")
+    assert dict_id is not None  # entrenado al llegar a dict_samples
+
+    nueva = store.save(paginas[5], "temu", "q", 6, job_id="j")
+    store.train_dictionary("temu")
+    assert store.current_dict("temu") != dict_id
+
+    for sha, html in zip(shas + [nueva], paginas):
+        assert store.load(sha) == html
+    raw = paginas[7].encode("utf-8")
+    assert len(store._compress(raw, store.current_dict("temu"))) < len(store._compress(raw, None))
+
+
+def test_purge_applies_retention_and_removes_orphan_blobs(store):
+    viejo, nuevo = _paginas(2)
+    sha_viejo = store.save(viejo, "temu", "q", 1, job_id="viejo")
+    store.clock.t += 31 * 86400
+    store.purge()  # la purga automática corre como mucho una vez por hora
+    assert store.purge() == {"snapshots": 0, "blobs": 0}
+
+    store.save(nuevo, "temu", "q", 1, job_id="nuevo")
+    assert store.by_job("viejo") == [] and len(store.by_job("nuevo")) == 1
+    assert not os.path.exists(store._blob_path(sha_viejo))
+    with pytest.raises(KeyError):
+        store.load(sha_viejo)
+
+
+class PurgaIntercalada(SnapshotStore):
+    """Lanza un ``purge`` desde otro hilo justo cuando ``save`` inserta el snapshot."""
+
+    hilo = None
+
+    def _connect(self):
+        db = super()._connect()
+
+        def traza(sql):
+            if self.hilo is None and sql.startswith("INSERT INTO snapshots"):
+                self.hilo = threading.Thread(target=self.purge)
+                self.hilo.start()
+                self.hilo.join(0.5)  # con el cerrojo tomado por save, la purga espera
+
+        db.set_trace_callback(traza)
+        return db
+
+
+def test_concurrent_purge_cannot_orphan_a_new_snapshot(tmp_path):
+    store = PurgaIntercalada(str(tmp_path), retention_days=1, max_mb=0, dict_samples=0,
+                             codec=snapshots.ZLIB, clock=Reloj())
+    html = _paginas(1)[0]
+    sha = store.save(html, "temu", "q", 1, job_id="viejo")
+    store.hilo = None
+    # El snapshot viejo caduca: su blob queda huérfano justo cuando save lo reutiliza
+    store.clock.t += 2 * 86400
+    assert store.save(html, "temu", "q", 1, job_id="nuevo") == sha
+    store.hilo.join()
+
+    assert [s["job_id"] for s in store.iter_snapshots()] == ["nuevo"]
+    assert store.load(sha) == html
+
+
+def test_recent_orphan_blobs_survive_purge(tmp_path):
+    store = SnapshotStore(str(tmp_path), retention_days=1, max_mb=0, dict_samples=0,
+                          codec=snapshots.ZLIB, clock=Reloj())
+    sha = store.save(_paginas(1)[0], "temu", "q", 1, job_id="j")
+    with store._immediate() as db:
+        db.execute("DELETE FROM snapshots")
+    assert store.purge()["blobs"] == 0  # puede ser de un save en curso
+    store.clock.t += 3601
+    assert store.purge()["blobs"] == 1
+    assert not os.path.exists(store._blob_path(sha))
+
+
+def test_size_budget_drops_oldest_snapshots(tmp_path):
+    store = SnapshotStore(str(tmp_path), retention_days=0, max_mb=0, dict_samples=0,
+                          codec=snapshots.ZLIB, clock=Reloj())
+    for i, html in enumerate(_paginas(4)):
+        store.clock.t += 60
+        store.save(html, "temu", "q", i + 1, job_id=f"j{i}")
+    por_blob = store.stats()["bytes_disco"] / 4
+    store.max_bytes = int(por_blob * 2.5)
+
+    store.purge()
+    assert [s["job_id"] for s in store.iter_snapshots()] == ["j2", "j3"]
+
+
+def test_scraper_snapshot_records_job_and_products(tmp_path):
+    scraper = new_scraper(TemuScraper)
+    scraper.driver = MagicMock(page_source="<html>p</html>", current_url="http://x/temu?page=3")
+    scraper.snapshots = SnapshotStore(str(tmp_path), codec=snapshots.ZLIB)
+    scraper.job_id = "task-123"
+
+    scraper._snapshot("zapatos", 3, [{"titulo": "x"}])
+
+    [snap] = scraper.snapshots.by_job("task-123", productos=True)
+    assert (snap["plataforma"], snap["query"], snap["pagina"]) == ("temu", "zapatos", 3)
+    assert snap["url"] == "http://x/temu?page=3"
+    assert scraper.snapshots.load(snap["sha256"]) == "<html>p</html>"
+
+
+def test_snapshot_failures_never_break_the_scrape():
+    scraper = new_scraper(TemuScraper)
+    scraper.driver = MagicMock(page_source="<html></html>")
+    scraper.snapshots = MagicMock()
+    scraper.snapshots.save.side_effect = OSError("disco lleno")
+    scraper._snapshot("zapatos", 1, [])  # no lanza
+
+
+def test_snapshots_endpoint_lists_job_pages(tmp_path):
+    from app import app
+
+    store = SnapshotStore(str(tmp_path), codec=snapshots.ZLIB)
+    store.save("<html>1</html>", "temu", "q", 1, job_id="abc")
+    with patch("app.get_snapshot_store", return_value=store):
+        response = app.test_client().get("/api/snapshots/abc")
+    data = response.get_json()
+    assert response.status_code == 200
+    assert [s["pagina"] for s in data["snapshots"]] == [1]
@@ -0,0 +1,37 @@
+import tasks
+from tasks import celery_app, queue_for, route_task, worker_queues
+
+
+def test_each_platform_has_its_own_queues():
+    queues = {q.name for q in celery_app.conf.task_queues}
+    for plataforma in tasks.SCRAPERS:
+        assert queue_for(plataforma) == f"scrape.{plataforma}.interactive"
+        assert queue_for(plataforma, "batch") == f"scrape.{plataforma}.batch"
+        assert queue_for(plataforma) in queues
+        assert queue_for(plataforma, "batch") in queues
+
+
+def test_scrapear_is_routed_by_plataforma_and_priority():
+    assert route_task("scrapear", ("camisa", "alibaba"), {}, {}) == {
+        "queue": "scrape.alibaba.interactive"
+    }
+    assert route_task(
+        "scrapear", ("camisa", "temu"), {"prioridad": "batch"}, {}
+    ) == {"queue": "scrape.temu.batch"}
+    assert route_task("scrapear", ("camisa", "desconocida"), {}, {}) == {"queue": "celery"}
+
+
+def test_worker_queues_list_interactive_lane_first():
+    queues = worker_queues(["alibaba", "temu"])
+    assert queues == [
+        "scrape.alibaba.interactive", "scrape.temu.interactive",
+        "scrape.alibaba.batch", "scrape.temu.batch",
+    ]
+    assert celery_app.conf.broker_transport_options["queue_order_strategy"] == "priority"
+
+
+def test_celery_router_resolves_platform_queue():
+    routes = celery_app.amqp.router.route(
+        {}, "scrapear", ("camisa", "madeinchina"), {"prioridad": "batch"}
+    )
+    assert routes["queue"].name == "scrape.madeinchina.batch"
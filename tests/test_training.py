@@ -0,0 +1,35 @@
+import os
+
+import pandas as pd
+import pytest
+
+from ml.compiled import CompiledPipeline
+from ml.predict import NUMERICAS, ModelRegistry
+from ml.training import MODELOS, reparto_nucleos, train_all_models
+
+
+def test_core_budget_is_never_exceeded():
+    assert reparto_nucleos(1, 4) == (1, 1)
+    assert reparto_nucleos(4, 4) == (4, 1)
+    assert reparto_nucleos(16, 4) == (4, 4)
+    procesos, hilos = reparto_nucleos(6, 4)
+    assert procesos * hilos <= 6
+
+
+@pytest.mark.parametrize("nucleos", [1, 2])
+def test_training_writes_same_artifacts_sequential_or_parallel(tmp_path, nucleos, dataset_dumping):
+    results = train_all_models(dataset_dumping(), nucleos=nucleos, model_dir=str(tmp_path))
+
+    assert sorted(os.listdir(tmp_path)) == sorted([m[2] for m in MODELOS.values()] + ["model_results.csv"])
+    csv = pd.read_csv(tmp_path / "model_results.csv")
+    assert list(csv["Modelo"]) == ["Regresión Logística", "Random Forest", "XGBoost",
+                                   "Isolation Forest (no supervisado)"]
+    assert (csv["AUC"].iloc[:3] > 0.9).all() and results[0][1] == pytest.approx(csv["AUC"][0])
+
+    registry = ModelRegistry(str(tmp_path))
+    xgb_pipeline = registry.get("xgboost")
+    # Los tres supervisados comparten el mismo preprocesador ya ajustado
+    assert xgb_pipeline.named_steps["prep"].transformers_[0][1].mean_ == pytest.approx(
+        registry.get("logistica").named_steps["prep"].transformers_[0][1].mean_)
+    CompiledPipeline(xgb_pipeline, NUMERICAS)  # mismo formato que sirve ml/predict.py
+    assert registry.get("isolation").decision_function(dataset_dumping(5)[NUMERICAS]).shape == (5,)
@@ -0,0 +1,65 @@
+import joblib
+import pandas as pd
+import pytest
+from sklearn.dummy import DummyClassifier
+from sklearn.pipeline import Pipeline
+
+from ml.compiled import CompiledPipeline
+from ml.predict import NUMERICAS, ModelRegistry
+from ml.training import crear_preprocesador, dividir, parametros_ajustados, train_all_models
+from ml.tuning import tune
+
+
+@pytest.fixture
+def df(dataset_dumping):
+    return dataset_dumping(300)
+
+
+def _artefacto_debil(df, path):
+    X_train, _, y_train, _ = dividir(df)
+    modelo = Pipeline([("prep", crear_preprocesador()), ("clf", DummyClassifier(strategy="prior"))])
+    joblib.dump(modelo.fit(X_train, y_train), path)
+
+
+def test_halving_logs_every_trial_and_promotes_the_winner(df, tmp_path):
+    _artefacto_debil(df, tmp_path / "model_xgboost.pkl")
+    resumen = tune(df, modelos=["xgboost"], candidatos=9, cv=2, nucleos=1, max_arboles=75,
+                   model_dir=str(tmp_path))
+
+    pruebas = pd.read_csv(tmp_path / "tuning_results.csv")
+    # 9 configuraciones con 25 árboles, las 3 mejores con 75
+    assert pruebas.groupby("ronda").size().tolist() == [9, 3]
+    assert pruebas.groupby("ronda")["n_estimators"].first().tolist() == [25, 75]
+    assert (pruebas["segundos"] > 0).all() and pruebas["auc_cv"].between(0, 1).all()
+
+    r = resumen["xgboost"]
+    assert r["promovido"] and r["auc_prueba"] > r["auc_prueba_actual"] == 0.5
+    servido = ModelRegistry(str(tmp_path)).get("xgboost")
+    assert servido.named_steps["clf"].n_estimators == r["mejores_params"]["n_estimators"]
+    CompiledPipeline(servido, NUMERICAS)
+
+
+def test_worse_or_unpromoted_search_keeps_current_artifact(df, tmp_path):
+    path = tmp_path / "model_randomforest.pkl"
+    _artefacto_debil(df, path)
+    antes = path.read_bytes()
+    resumen = tune(df, modelos=["randomforest"], candidatos=3, cv=2, nucleos=1, max_arboles=25,
+                   promover=False, model_dir=str(tmp_path))
+    assert not resumen["randomforest"]["promovido"]
+    assert path.read_bytes() == antes
+    assert parametros_ajustados(str(tmp_path)) == {}
+
+
+def test_promoted_params_are_used_by_the_next_training(df, tmp_path):
+    resumen = tune(df, modelos=["randomforest"], candidatos=3, cv=2, nucleos=1, max_arboles=25,
+                   model_dir=str(tmp_path))
+    assert resumen["randomforest"]["promovido"]
+    guardados = parametros_ajustados(str(tmp_path))
+    assert guardados == {"randomforest": resumen["randomforest"]["mejores_params"]}
+
+    train_all_models(df, nucleos=1, model_dir=str(tmp_path))
+    clf = ModelRegistry(str(tmp_path)).get("randomforest").named_steps["clf"]
+    assert clf.get_params() | guardados["randomforest"] == clf.get_params()
+    assert clf.n_estimators == 25  # y no los 200 por defecto
+    # Los modelos sin búsqueda conservan sus valores por defecto
+    assert ModelRegistry(str(tmp_path)).get("xgboost").named_steps["clf"].n_estimators == 300
@@ -0,0 +1,103 @@
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import warmup
+from scraper.base import BaseScraper
+from tasks import SCRAPERS
+
+SCRAPER_CLASSES = [cls for cls, _ in SCRAPERS.values()]
+
+
+def test_compile_selector_tables_covers_all_scrapers():
+    assert warmup.compile_selector_tables(SCRAPER_CLASSES) > 50
+
+
+def test_warm_worker_loads_models_and_signals_ready(tmp_path):
+    with patch.object(warmup.Config, "WORKER_READY_DIR", str(tmp_path)), \
+         patch("ml.predict.preload_models", return_value=["ml/model_xgboost.pkl"]) as mock_preload, \
+         patch.object(BaseScraper, "prewarm") as mock_prewarm:
+        warmup.warm_worker(SCRAPER_CLASSES, browser=True, models=True)
+        assert warmup.is_ready()
+        assert os.path.exists(os.path.join(str(tmp_path), str(os.getpid())))
+        warmup.clear_ready()
+
+    mock_preload.assert_called_once()
+    mock_prewarm.assert_called_once()
+    assert not warmup.is_ready()
+
+
+@patch("scraper.base.shutil.which", return_value=None)
+def test_scraper_adopts_prewarmed_browser(mock_which):
+    warm = BaseScraper.__new__(BaseScraper)
+    warm.driver = MagicMock()
+    warm.proxy = "http://127.0.0.1:3128"
+    warm._tmp_profile = warm._temp_dir = None
+    BaseScraper._warm_session = warm
+    try:
+        scraper = BaseScraper()
+    finally:
+        BaseScraper._warm_session = None
+
+    # No se intentó crear un navegador nuevo
+    mock_which.assert_not_called()
+    assert scraper.proxy == "http://127.0.0.1:3128"
+    assert warm.driver is None
+
+
+@patch("scraper.base.webdriver.Chrome")
+@patch("scraper.base.Service")
+@patch("scraper.base.shutil.which", side_effect=lambda name: f"/usr/bin/{name}")
+def test_dead_prewarmed_browser_is_replaced(mock_which, mock_service, mock_chrome):
+    stale = MagicMock()
+    stale.execute_script.side_effect = Exception("session deleted")
+    warm = BaseScraper.__new__(BaseScraper)
+    warm.driver = stale
+    warm._tmp_profile = warm._temp_dir = None
+    BaseScraper._warm_session = warm
+
+    scraper = BaseScraper()
+
+    stale.quit.assert_called_once()
+    assert scraper.driver is mock_chrome.return_value
+    assert BaseScraper._warm_session is None
+
+
+def test_browser_prewarm_failure_is_not_reported_ready(tmp_path):
+    with patch.object(warmup.Config, "WORKER_READY_DIR", str(tmp_path)), \
+         patch.object(BaseScraper, "prewarm", side_effect=RuntimeError("chrome no arranca")):
+        warmup.warm_worker(SCRAPER_CLASSES, browser=True, models=False)
+        try:
+            assert not warmup.is_ready()
+            assert warmup.readiness() == {"ready": False, "error": "navegador: chrome no arranca"}
+            assert os.listdir(tmp_path) == [f"{os.getpid()}.failed"]
+        finally:
+            warmup.clear_ready()
+    assert os.listdir(tmp_path) == []
+
+
+def test_concurrent_prewarms_start_a_single_browser():
+    arrancado = threading.Event()
+    seguir = threading.Event()
+    arranques = []
+
+    def start_driver(self):
+        arranques.append(self)
+        arrancado.set()
+        seguir.wait(5)
+        self.driver = MagicMock()
+
+    with patch.object(BaseScraper, "_start_driver", start_driver):
+        hilo = threading.Thread(target=BaseScraper.prewarm)
+        hilo.start()
+        try:
+            arrancado.wait(5)
+            BaseScraper.prewarm()  # llega mientras el primero sigue creando Chrome
+        finally:
+            seguir.set()
+            hilo.join(5)
+    try:
+        assert len(arranques) == 1
+        assert BaseScraper._warm_session is arranques[0]
+    finally:
+        BaseScraper._warm_session = None
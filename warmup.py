@@ -0,0 +1,180 @@
+"""Precalentamiento de procesos worker de Celery.
+
+Al arrancar cada proceso (señal ``worker_process_init``) se compilan las
+tablas de selectores CSS y las expresiones regulares de los parsers, se
+deserializan los modelos de ``ml/`` y se crea un navegador listo para la
+primera tarea. Cuando termina, el proceso deja una marca en
+``WORKER_READY_DIR/<pid>`` que sirve como señal de readiness; si el navegador
+no se pudo crear deja ``<pid>.failed`` con el motivo y no se marca listo
+hasta que un precalentamiento posterior lo consiga.
+"""
+import importlib
+import logging
+import os
+import threading
+
+import soupsieve
+
+from config import Config
+from scraper.base import BaseScraper
+
+# Textos representativos para poblar la caché de `re` de cada parser
+_PRICE_SAMPLES = ("US$1,299.50 - 1,599.75", "S/ 18,24", "€1.299,50", "12")
+_QUANTITY_SAMPLES = ("1.2k", "3 mil", "1,000+ sold", "450 vendidos")
+
+_enabled = False
+_ready = threading.Event()
+_failure = None
+
+
+def compile_selector_tables(scraper_classes) -> int:
+    """Compila (y deja en caché de soupsieve) todos los selectores de los scrapers."""
+    total = 0
+    for cls in scraper_classes:
+        for name in dir(cls):
+            if not name.isupper():
+                continue
+            value = getattr(cls, name)
+            selectors = [value] if isinstance(value, str) else value
+            if not isinstance(selectors, (list, tuple)):
+                continue
+            for sel in selectors:
+                if not isinstance(sel, str):
+                    continue
+                try:
+                    soupsieve.compile(sel)
+                    total += 1
+                except Exception:
+                    continue
+            # Las listas también se usan unidas en un solo select_one
+            if isinstance(value, list) and all(isinstance(v, str) for v in value):
+                try:
+                    soupsieve.compile(", ".join(value))
+                except Exception:
+                    pass
+    return total
+
+
+def warm_parsers(scraper_classes):
+    """Ejecuta una vez los limpiadores de cada módulo para compilar sus regex."""
+    for cls in scraper_classes:
+        module = importlib.import_module(cls.__module__)
+        for fn_name, samples in (
+            ("limpiar_precio", _PRICE_SAMPLES),
+            ("limpiar_rango_precio", _PRICE_SAMPLES),
+            ("limpiar_cantidad", _QUANTITY_SAMPLES),
+        ):
+            fn = getattr(module, fn_name, None)
+            if fn is None:
+                continue
+            for sample in samples:
+                try:
+                    fn(sample)
+                except Exception:
+                    pass
+
+
+def _ready_path() -> str:
+    return os.path.join(Config.WORKER_READY_DIR, str(os.getpid()))
+
+
+def _failed_path() -> str:
+    return _ready_path() + ".failed"
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def mark_ready():
+    global _failure
+    os.makedirs(Config.WORKER_READY_DIR, exist_ok=True)
+    _remove(_failed_path())
+    _failure = None
+    with open(_ready_path(), "w") as fh:
+        fh.write("ready\n")
+    _ready.set()
+
+
+def mark_failed(motivo: str):
+    """Deja constancia de un precalentamiento fallido; el proceso no queda listo."""
+    global _failure
+    _ready.clear()
+    _remove(_ready_path())
+    _failure = motivo
+    os.makedirs(Config.WORKER_READY_DIR, exist_ok=True)
+    with open(_failed_path(), "w") as fh:
+        fh.write(motivo + "\n")
+
+
+def clear_ready():
+    global _failure
+    _ready.clear()
+    _failure = None
+    _remove(_ready_path())
+    _remove(_failed_path())
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def readiness() -> dict:
+    return {"ready": is_ready(), "error": _failure}
+
+
+def warm_worker(scraper_classes, browser: bool = Config.WARM_BROWSER, models: bool = Config.WARM_MODELS):
+    """Realiza todo el precalentamiento y marca el proceso como listo."""
+    clear_ready()
+    n = compile_selector_tables(scraper_classes)
+    warm_parsers(scraper_classes)
+    logging.info("Precalentamiento: %s selectores compilados", n)
+
+    if models:
+        try:
+            from ml.predict import preload_models
+            cargados = preload_models()
+            logging.info("Precalentamiento: %s modelos cargados", len(cargados))
+        except Exception as e:
+            logging.warning("No se pudieron precargar los modelos: %s", e)
+
+    if browser:
+        try:
+            BaseScraper.prewarm()
+        except Exception as e:
+            logging.error("No se pudo precalentar el navegador; worker %s no listo: %s", os.getpid(), e)
+            mark_failed(f"navegador: {e}")
+            return
+
+    mark_ready()
+    logging.info("Worker %s caliente y listo", os.getpid())
+
+
+def start(scraper_classes):
+    """Lanza el precalentamiento en segundo plano (Celery limita el init a pocos segundos)."""
+    global _enabled
+    _enabled = True
+    threading.Thread(
+        target=warm_worker, args=(list(scraper_classes),), name="warmup", daemon=True
+    ).start()
+
+
+def rewarm_browser():
+    """Tras cada tarea, deja otro navegador listo para la siguiente."""
+    if not (_enabled and Config.WARM_BROWSER):
+        return
+
+    def _run():
+        try:
+            BaseScraper.prewarm()
+        except Exception as e:
+            logging.warning("No se pudo precalentar el navegador: %s", e)
+            return
+        if _failure is not None:
+            # El navegador ya arranca: el worker recupera la readiness
+            mark_ready()
+
+    threading.Thread(target=_run, name="rewarm", daemon=True).start()